@@ -0,0 +1,332 @@
+"""
+Runtime for generated agents: loads a project's agent.py once and keeps a
+warm ADK runner per (session, project hash) in a bounded LRU, so chat turns
+execute the real agent - tools included - without reloading the module or
+rebuilding prompts. With a ToolSandboxPool, the project's tool functions
+run in sandboxed worker processes rather than in the API process.
+
+With a ChatMemory, each agent's ADK session is held to the memory's budget:
+it is rebuilt from the summary and message window when its events outgrow
+the budget, a newer summary is available, or turns happened elsewhere.
+"""
+
+import asyncio
+import types as pytypes
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+from tool_sandbox import (
+    SANDBOX_GLOBAL, ToolSandboxError, ToolSandboxPool,
+    find_tool_functions, proxy_source, worker_source
+)
+
+if TYPE_CHECKING:
+    from chat_memory import ChatMemory
+
+APP_NAME_PREFIX = "artifex"
+CHAT_USER_ID = "web_user"
+
+def _estimate_tokens(text: str) -> int:
+    # meta_agent is imported on first use, keeping it out of API startup
+    from meta_agent.prompt_budget import estimate_tokens
+    return estimate_tokens(text)
+
+
+class AgentLoadError(Exception):
+    """The generated agent module could not be imported."""
+
+
+class WarmAgent:
+    """A loaded root_agent with its runner and the ADK session used for chat."""
+
+    def __init__(
+        self,
+        key: Tuple[str, str],
+        module: pytypes.ModuleType,
+        runner: Any,
+        adk_session_id: str,
+        sandboxed_tools: Tuple[str, ...] = ()
+    ):
+        self.key = key
+        self.module = module
+        self.runner = runner
+        self.adk_session_id = adk_session_id
+        self.sandboxed_tools = sandboxed_tools
+        self.turns = 0
+        self.summary = ""
+        self.synced = 0   # ChatMemory.count() the ADK session's history corresponds to
+        self.tokens = 0   # Estimated size of the ADK session's events
+        self.lock = asyncio.Lock()  # One turn at a time per conversation
+
+
+def load_agent_module(source: str, module_name: str, namespace: Optional[Dict[str, Any]] = None) -> pytypes.ModuleType:
+    """
+    Execute generated agent.py source as a module.
+
+    Args:
+        source: agent.py source
+        module_name: Name for the module object
+        namespace: Extra globals to seed the module with
+
+    Raises:
+        AgentLoadError: If the source fails to import or defines no root_agent
+    """
+    module = pytypes.ModuleType(module_name)
+    module.__file__ = f"<{module_name}>/agent.py"
+    module.__dict__.update(namespace or {})
+    try:
+        code = compile(source, module.__file__, "exec")
+        exec(code, module.__dict__)
+    except Exception as e:
+        raise AgentLoadError(f"{type(e).__name__}: {e}") from e
+    if not hasattr(module, "root_agent"):
+        raise AgentLoadError("Generated agent.py does not define root_agent")
+    return module
+
+
+class AgentRuntime:
+    """Bounded LRU of warm ADK runners keyed by (session id, project hash)."""
+
+    def __init__(
+        self,
+        max_agents: int = 32,
+        tool_sandbox: Optional[ToolSandboxPool] = None,
+        memory: Optional["ChatMemory"] = None
+    ):
+        """
+        Args:
+            max_agents: Warm agents kept at once
+            tool_sandbox: Where tool functions run; None runs them in-process
+            memory: Chat memory whose context each ADK session is kept to;
+                None lets sessions grow for as long as the agent stays warm
+        """
+        self.max_agents = max_agents
+        self.tool_sandbox = tool_sandbox
+        self.memory = memory
+        self._agents: "OrderedDict[Tuple[str, str], WarmAgent]" = OrderedDict()
+        # Known-bad versions, so a broken project isn't re-imported on every message
+        self._failures: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._loading: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self.loads = 0
+        self.hits = 0
+        self.rebuilds = 0
+
+    async def get(self, session_id: str, project_hash: str, load_source: Callable[[], str]) -> WarmAgent:
+        """
+        Warm agent for a session's current project, loading it on first use.
+
+        Args:
+            session_id: Generator session id
+            project_hash: Hash of the generated project; a regenerated project gets a new runner
+            load_source: Returns the agent.py source (only called on a miss)
+
+        Raises:
+            AgentLoadError: If the agent cannot be loaded
+        """
+        key = (session_id, project_hash)
+        warm = self._agents.get(key)
+        if warm is not None:
+            self._agents.move_to_end(key)
+            self.hits += 1
+            return warm
+        if key in self._failures:
+            raise AgentLoadError(self._failures[key])
+
+        lock = self._loading.setdefault(key, asyncio.Lock())
+        async with lock:
+            warm = self._agents.get(key)
+            if warm is not None:
+                return warm
+            try:
+                warm = await self._load(key, load_source)
+            except AgentLoadError as e:
+                self._failures[key] = str(e)
+                while len(self._failures) > self.max_agents:
+                    self._failures.popitem(last=False)
+                raise
+            finally:
+                self._loading.pop(key, None)
+
+        # Older versions of this session's project are stale now
+        for stale in [k for k in self._agents if k[0] == session_id]:
+            del self._agents[stale]
+        self._agents[key] = warm
+        while len(self._agents) > self.max_agents:
+            self._agents.popitem(last=False)
+        return warm
+
+    async def _load(self, key: Tuple[str, str], load_source: Callable[[], str]) -> WarmAgent:
+        session_id, project_hash = key
+        source = load_source()
+        if not source:
+            raise AgentLoadError("Generated agent.py not found")
+
+        namespace = {}
+        tool_names = []
+        if self.tool_sandbox is not None:
+            try:
+                tool_names = find_tool_functions(source)
+                # Even an agent without tools only gets its wiring loaded here
+                proxy = proxy_source(source, tool_names)
+            except SyntaxError:
+                proxy = source  # Nothing runs; load_agent_module reports it
+            except ToolSandboxError as e:
+                raise AgentLoadError(str(e)) from e
+            if tool_names:
+                sandbox = self.tool_sandbox.get(project_hash, worker_source(source))
+                try:
+                    await sandbox.warm_up()
+                except ToolSandboxError as e:
+                    self.tool_sandbox.discard(project_hash)
+                    raise AgentLoadError(str(e)) from e
+                namespace[SANDBOX_GLOBAL] = sandbox
+            source = proxy
+
+        module = load_agent_module(source, f"generated_agent_{session_id}_{project_hash[:12]}", namespace)
+
+        from google.adk.runners import InMemoryRunner
+
+        app_name = f"{APP_NAME_PREFIX}_{session_id}"
+        try:
+            runner = InMemoryRunner(agent=module.root_agent, app_name=app_name)
+            adk_session = await runner.session_service.create_session(app_name=app_name, user_id=CHAT_USER_ID)
+        except Exception as e:
+            raise AgentLoadError(f"Could not start agent runner: {type(e).__name__}: {e}") from e
+
+        self.loads += 1
+        print(f"[RUNTIME] Loaded agent for session {session_id} ({project_hash[:12]})")
+        return WarmAgent(key, module, runner, adk_session.id, tuple(tool_names))
+
+    async def _sync_history(self, warm: WarmAgent):
+        """
+        Start a fresh ADK session from ChatMemory's summary and window if the
+        current one no longer matches it. Called with warm.lock held; the
+        message being sent is recorded in memory after the turn succeeds.
+        """
+        if self.memory is None:
+            return
+        from google.adk.events import Event
+        from chat_session import to_contents
+
+        session_id = warm.key[0]
+        summary, window = self.memory.context(session_id)
+        history = window
+        synced = self.memory.count(session_id)
+        if warm.summary == summary and warm.synced == synced and warm.tokens <= self.memory.context_tokens:
+            return
+
+        service = warm.runner.session_service
+        app_name = warm.runner.app_name
+        session = await service.create_session(app_name=app_name, user_id=CHAT_USER_ID)
+        for content in to_contents(summary, history):
+            author = "user" if content.role == "user" else warm.module.root_agent.name
+            await service.append_event(session, Event(author=author, content=content))
+        await service.delete_session(app_name=app_name, user_id=CHAT_USER_ID, session_id=warm.adk_session_id)
+        warm.adk_session_id = session.id
+        warm.summary = summary
+        warm.synced = synced
+        warm.tokens = _estimate_tokens(summary) + sum(_estimate_tokens(m["content"]) for m in history)
+        self.rebuilds += 1
+
+    def _count_event(self, warm: WarmAgent, event: Any):
+        """Add a stored event - tool calls and results included - to the session's size."""
+        if self.memory is not None and not event.partial and event.content:
+            warm.tokens += _estimate_tokens(event.content.model_dump_json(exclude_none=True))
+
+    def _finish_turn(self, warm: WarmAgent, message: str, complete: bool):
+        if self.memory is None:
+            return
+        if complete:
+            warm.tokens += _estimate_tokens(message)
+            warm.synced += 2  # The user message and the reply the caller records
+        else:
+            warm.synced = -1  # Failed or abandoned mid-turn: rebuild next time
+
+    async def run_turn(self, warm: WarmAgent, message: str) -> str:
+        """Send one user message through the agent and return its final reply text."""
+        from google.genai import types
+
+        content = types.Content(role="user", parts=[types.Part(text=message)])
+        reply = ""
+        async with warm.lock:
+            await self._sync_history(warm)
+            complete = False
+            try:
+                async for event in warm.runner.run_async(
+                    user_id=CHAT_USER_ID,
+                    session_id=warm.adk_session_id,
+                    new_message=content
+                ):
+                    self._count_event(warm, event)
+                    if event.is_final_response() and event.content and event.content.parts:
+                        text = "".join(part.text for part in event.content.parts if getattr(part, "text", None))
+                        if text:
+                            reply = text
+                complete = True
+            finally:
+                self._finish_turn(warm, message, complete)
+            warm.turns += 1
+        return reply.strip()
+
+    async def stream_turn(self, warm: WarmAgent, message: str) -> AsyncIterator[Tuple[str, str]]:
+        """
+        Like run_turn, but with the model streaming its output.
+
+        Yields:
+            ("delta", text) for each streamed chunk, then ("final", reply) with
+            the same reply run_turn would return
+        """
+        from google.adk.agents.run_config import RunConfig, StreamingMode
+        from google.genai import types
+
+        content = types.Content(role="user", parts=[types.Part(text=message)])
+        reply = ""
+        async with warm.lock:
+            await self._sync_history(warm)
+            streamed = False
+            complete = False
+            try:
+                async for event in warm.runner.run_async(
+                    user_id=CHAT_USER_ID,
+                    session_id=warm.adk_session_id,
+                    new_message=content,
+                    run_config=RunConfig(streaming_mode=StreamingMode.SSE)
+                ):
+                    self._count_event(warm, event)
+                    if not (event.content and event.content.parts):
+                        continue
+                    text = "".join(part.text for part in event.content.parts if getattr(part, "text", None))
+                    if not text:
+                        continue
+                    if event.partial:
+                        streamed = True
+                        yield "delta", text
+                    elif event.is_final_response():
+                        if not streamed:
+                            # Agents that don't stream still produce their reply in one piece
+                            yield "delta", text
+                        reply = text
+                        streamed = False
+                complete = True
+            finally:
+                self._finish_turn(warm, message, complete)
+            warm.turns += 1
+        yield "final", reply.strip()
+
+    def discard(self, session_id: str):
+        """Drop every warm agent and recorded failure for a session."""
+        for key in [k for k in self._agents if k[0] == session_id]:
+            del self._agents[key]
+        for key in [k for k in self._failures if k[0] == session_id]:
+            del self._failures[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "warm_agents": len(self._agents),
+            "max_agents": self.max_agents,
+            "loads": self.loads,
+            "hits": self.hits,
+            "history_rebuilds": self.rebuilds,
+            "failed_versions": len(self._failures),
+            "tool_sandbox": self.tool_sandbox.stats() if self.tool_sandbox is not None else None,
+        }
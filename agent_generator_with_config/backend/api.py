@@ -4,55 +4,110 @@ Production-ready API for frontend integration
 Deploys to Render with Firebase session storage
 """
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, BackgroundTasks
+from fastapi import FastAPI, WebSocket, HTTPException, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, FileResponse
+from fastapi.responses import StreamingResponse, FileResponse, Response, PlainTextResponse, JSONResponse
 from pydantic import BaseModel
-from typing import Optional, Dict, Any, List
+from typing import TYPE_CHECKING, Optional, Dict, Any, List
 import os
 import json
+import hashlib
 import asyncio
+import importlib
+from contextlib import asynccontextmanager
 from datetime import datetime
 import sys
 from pathlib import Path
-import firebase_admin
-from firebase_admin import credentials, firestore
-import importlib.util
 import traceback
-from google import genai
 
 # Add parent directory to path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from meta_agent.orchestrator import MetaAgentOrchestrator
-
-# Initialize Firebase Admin
-try:
-    # Try to load service account from environment variable
-    firebase_creds = os.getenv('FIREBASE_SERVICE_ACCOUNT_JSON')
-    if firebase_creds:
-        # Parse JSON from environment
-        cred_dict = json.loads(firebase_creds)
-        cred = credentials.Certificate(cred_dict)
-        firebase_admin.initialize_app(cred)
-    else:
-        # Use default credentials or service account file
-        firebase_admin.initialize_app()
-    
-    # Get Firestore client
-    firebase_db = firestore.client()
-    FIREBASE_ENABLED = True
-except Exception as e:
-    print(f"Warning: Firebase initialization failed: {e}")
-    print("Continuing without Firebase - using in-memory storage only")
-    firebase_db = None
-    FIREBASE_ENABLED = False
+# Heavy dependencies (firebase_admin, google.genai, the generation pipeline
+# and its settings, which load pydantic_settings) are imported where they are
+# used or by the startup task, not here, so the server starts listening
+# quickly after a cold start
+from artifact_store import ArtifactStore
+from progress_hub import ProgressHub
+from agent_runtime import AgentRuntime, AgentLoadError
+from tool_sandbox import pool_from_env
+from chat_memory import ChatMemory, format_transcript
+from chat_store import FirestoreChatStore, encode_messages
+from graph_layout import GraphCache
+
+if TYPE_CHECKING:
+    from chat_session import PromptChats
+
+# Firebase is connected by the startup task (see lifespan); until then, and
+# when it isn't configured, sessions live in memory only
+firebase_db = None
+FIREBASE_ENABLED = False
+chat_store: Optional[FirestoreChatStore] = None  # Persistent chat history; chat_memory is its hot tail
+_startup_task: Optional[asyncio.Task] = None
+
+
+def _init_firebase():
+    """Connect to Firestore. Slow (credential discovery), so it runs off the event loop."""
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+    
+    try:
+        try:
+            firebase_admin.get_app()
+        except ValueError:
+            # Try to load service account from environment variable
+            firebase_creds = os.getenv('FIREBASE_SERVICE_ACCOUNT_JSON')
+            if firebase_creds:
+                # Parse JSON from environment
+                cred_dict = json.loads(firebase_creds)
+                cred = credentials.Certificate(cred_dict)
+                firebase_admin.initialize_app(cred)
+            else:
+                # Use default credentials or service account file
+                firebase_admin.initialize_app()
+        
+        # Get Firestore client
+        return firestore.client()
+    except Exception as e:
+        print(f"Warning: Firebase initialization failed: {e}")
+        print("Continuing without Firebase - using in-memory storage only")
+        return None
+
+
+async def _startup():
+    """Connect Firebase and load the generation pipeline once the server is up."""
+    global firebase_db, FIREBASE_ENABLED, chat_store
+    firebase_db = await asyncio.to_thread(_init_firebase)
+    FIREBASE_ENABLED = firebase_db is not None
+    chat_store = FirestoreChatStore(firebase_db) if FIREBASE_ENABLED else None
+    # Import the pipeline now so the first agent creation doesn't pay for it
+    await asyncio.to_thread(importlib.import_module, "meta_agent.orchestrator")
+
+
+async def _ensure_ready():
+    """Wait for startup to finish before touching Firebase."""
+    if _startup_task is not None and not _startup_task.done():
+        await asyncio.wait({_startup_task})
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _startup_task
+    _startup_task = asyncio.create_task(_startup())
+    try:
+        yield
+    finally:
+        if not _startup_task.done():
+            _startup_task.cancel()
+        await asyncio.gather(_startup_task, return_exceptions=True)
+
 
 # Initialize FastAPI
 app = FastAPI(
     title="Agent Generator API",
     description="AI-powered agent generation with 6-step workflow",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS for Next.js frontend
@@ -66,7 +121,35 @@ app.add_middleware(
 
 # In-memory storage (replace with Firebase in production)
 sessions: Dict[str, Dict[str, Any]] = {}
-active_websockets: Dict[str, WebSocket] = {}
+
+# Progress events fan out to any number of subscribers per session
+progress_hub = ProgressHub(
+    max_events_per_session=int(os.getenv("PROGRESS_LOG_SIZE", 500)),
+    queue_size=int(os.getenv("PROGRESS_QUEUE_SIZE", 100))
+)
+
+# Generated project files, served from memory. Writing to disk is opt-in.
+artifact_store = ArtifactStore(max_sessions=int(os.getenv("ARTIFACT_STORE_MAX_SESSIONS", 256)))
+EXPORT_TO_DISK_DEFAULT = os.getenv("EXPORT_TO_DISK", "false").lower() in ("1", "true", "yes")
+# Exports and on-disk generation are confined to this directory
+EXPORT_BASE_DIR = Path(os.getenv("EXPORT_BASE_DIR", ".")).resolve()
+
+
+def _export_dir(output_dir: Optional[str], *parts: str) -> str:
+    """
+    A client-supplied output directory (plus sub-folders) resolved under
+    EXPORT_BASE_DIR.
+
+    Raises:
+        HTTPException: 400 if the path is absolute outside the base or climbs out of it
+    """
+    target = EXPORT_BASE_DIR.joinpath(output_dir or "my_generated_agents", *parts).resolve()
+    if EXPORT_BASE_DIR not in target.parents:
+        raise HTTPException(status_code=400, detail="output_dir must be a directory inside the export base directory")
+    return str(target)
+
+# Laid-out architecture graphs, cached per config version
+graph_cache = GraphCache(max_sessions=int(os.getenv("GRAPH_CACHE_MAX_SESSIONS", 256)))
 
 
 # ============================================================================
@@ -76,6 +159,11 @@ active_websockets: Dict[str, WebSocket] = {}
 class CreateAgentRequest(BaseModel):
     description: str
     output_dir: Optional[str] = "my_generated_agents"
+    export_to_disk: Optional[bool] = None  # Defaults to EXPORT_TO_DISK env setting
+
+
+class ExportAgentRequest(BaseModel):
+    output_dir: Optional[str] = "my_generated_agents"
 
 
 class CreateAgentResponse(BaseModel):
@@ -91,6 +179,8 @@ class SessionStatus(BaseModel):
     steps: Dict[str, Any]
     agent_config: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
+    token_usage: Optional[Dict[str, Any]] = None
+    version: Optional[int] = None
 
 
 class AgentConfig(BaseModel):
@@ -109,7 +199,7 @@ class AgentConfig(BaseModel):
 # ============================================================================
 
 async def websocket_progress_callback(session_id: str, step: int, status: str, data: Dict[str, Any]):
-    """Send progress updates via WebSocket."""
+    """Publish progress updates to the session's subscribers."""
     # Create user-friendly message based on step and status
     step_messages = {
         1: {
@@ -140,21 +230,6 @@ async def websocket_progress_callback(session_id: str, step: int, status: str, d
     
     user_message = step_messages.get(step, {}).get(status, data.get("message", f"Step {step}: {status}"))
     
-    # Send to WebSocket
-    if session_id in active_websockets:
-        ws = active_websockets[session_id]
-        try:
-            await ws.send_json({
-                "type": "progress",
-                "step": step,
-                "status": status,
-                "data": data,
-                "message": user_message,
-                "timestamp": datetime.now().isoformat()
-            })
-        except Exception as e:
-            print(f"WebSocket send error: {e}")
-    
     # Update session storage
     if session_id in sessions:
         sessions[session_id]["current_step"] = step
@@ -164,21 +239,32 @@ async def websocket_progress_callback(session_id: str, step: int, status: str, d
             "message": user_message,
             "timestamp": datetime.now().isoformat()
         }
-        
-        # Update Firebase session progress
-        if FIREBASE_ENABLED:
-            try:
-                firebase_db.collection('sessions').document(session_id).update({
-                    "currentStep": step,
+    
+    # Fan out to subscribers (never waits on a slow client). Published after
+    # the session update so anyone woken by the event reads the new state.
+    progress_hub.publish(session_id, {
+        "type": "progress",
+        "step": step,
+        "status": status,
+        "data": data,
+        "message": user_message,
+        "timestamp": datetime.now().isoformat()
+    })
+    
+    # Update Firebase session progress
+    if FIREBASE_ENABLED and session_id in sessions:
+        try:
+            firebase_db.collection('sessions').document(session_id).update({
+                "currentStep": step,
+                "status": status,
+                f"steps.{step}": {
                     "status": status,
-                    f"steps.{step}": {
-                        "status": status,
-                        "message": user_message,
-                        "timestamp": datetime.now()
-                    }
-                })
-            except Exception as e:
-                print(f"Firebase update error: {e}")
+                    "message": user_message,
+                    "timestamp": datetime.now()
+                }
+            })
+        except Exception as e:
+            print(f"Firebase update error: {e}")
 
 
 # ============================================================================
@@ -195,6 +281,41 @@ async def root():
     }
 
 
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 503 until startup (Firebase, pipeline imports) has finished."""
+    if _startup_task is None or not _startup_task.done():
+        return JSONResponse({"status": "starting"}, status_code=503)
+    if not _startup_task.cancelled() and _startup_task.exception() is not None:
+        return JSONResponse({"status": "failed", "error": str(_startup_task.exception())}, status_code=503)
+    return {"status": "ready", "firebase": FIREBASE_ENABLED}
+
+
+@app.get("/api/routing/stats")
+async def routing_stats():
+    """Per-route (step/model) latency, error, fallback and cost stats for meta-agent LLM calls."""
+    from meta_agent.hedging import get_hedge_policy
+    from meta_agent.routing import get_router
+    router = get_router()
+    return {
+        "routes": router.stats(),
+        "hedging": get_hedge_policy().stats(),
+        "step_routes": router.config.STEP_ROUTES,
+        "tiers": {name: tier.model_dump() for name, tier in router.config.MODEL_TIERS.items()}
+    }
+
+
+@app.get("/api/runtime/stats")
+async def runtime_stats():
+    """Warm agent cache, tool sandbox and chat memory stats for /api/chat, plus graph cache stats."""
+    return dict(
+        agent_runtime.stats(),
+        chat_memory=chat_memory.stats(),
+        graph=graph_cache.stats(),
+        prompt_chats=_prompt_chats.stats() if _prompt_chats is not None else None
+    )
+
+
 @app.post("/api/agents/create", response_model=CreateAgentResponse)
 async def create_agent(request: CreateAgentRequest, background_tasks: BackgroundTasks):
     """
@@ -203,6 +324,9 @@ async def create_agent(request: CreateAgentRequest, background_tasks: Background
     """
     import uuid
     
+    output_dir = _export_dir(request.output_dir)
+    await _ensure_ready()
+    
     # Create unique session ID with timestamp + UUID to prevent duplicates
     session_id = f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
     
@@ -233,12 +357,17 @@ async def create_agent(request: CreateAgentRequest, background_tasks: Background
         except Exception as e:
             print(f"Firebase session creation failed: {e}")
     
+    export_to_disk = request.export_to_disk
+    if export_to_disk is None:
+        export_to_disk = EXPORT_TO_DISK_DEFAULT
+    
     # Start background task
     background_tasks.add_task(
         run_agent_creation,
         session_id,
         request.description,
-        request.output_dir
+        output_dir,
+        export_to_disk
     )
     
     return CreateAgentResponse(
@@ -248,24 +377,37 @@ async def create_agent(request: CreateAgentRequest, background_tasks: Background
     )
 
 
-async def run_agent_creation(session_id: str, description: str, output_dir: str):
+async def run_agent_creation(session_id: str, description: str, output_dir: str, export_to_disk: bool = False):
     """Background task to create agent."""
+    orchestrator = None
     try:
         # Create progress callback
         async def progress_cb(step: int, status: str, data: Dict[str, Any]):
             await websocket_progress_callback(session_id, step, status, data)
         
         # Create orchestrator
+        from meta_agent.orchestrator import MetaAgentOrchestrator
         orchestrator = MetaAgentOrchestrator(progress_callback=progress_cb)
         
         # Create agent
-        result = await orchestrator.create_agent(description, output_dir)
+        result = await orchestrator.create_agent(description, output_dir, write_to_disk=export_to_disk)
+        
+        # Keep the generated files in memory for downloads, file views and chat
+        artifact_hash = artifact_store.put(session_id, result.get("file_contents") or {})
         
         # Update session
         sessions[session_id]["status"] = "complete"
         sessions[session_id]["agent_config"] = result.get("config")
         sessions[session_id]["output_directory"] = result.get("output_directory")
         sessions[session_id]["files"] = result.get("files")
+        sessions[session_id]["artifact_hash"] = artifact_hash
+        sessions[session_id]["token_usage"] = result.get("token_usage")
+        progress_hub.publish(session_id, {
+            "type": "status",
+            "status": "complete",
+            "terminal": True,
+            "timestamp": datetime.now().isoformat()
+        })
         
         # Store metadata in Firebase (not the code - just configuration)
         if FIREBASE_ENABLED:
@@ -274,6 +416,7 @@ async def run_agent_creation(session_id: str, description: str, output_dir: str)
                 "description": description,
                 "project_name": result.get("project_name"),
                 "agent_config": result.get("config"),
+                "token_usage": result.get("token_usage"),
                 "created_at": datetime.now(),
                 "status": "complete"
             })
@@ -281,24 +424,180 @@ async def run_agent_creation(session_id: str, description: str, output_dir: str)
     except Exception as e:
         sessions[session_id]["status"] = "error"
         sessions[session_id]["error"] = str(e)
+        if orchestrator is not None:
+            sessions[session_id]["token_usage"] = orchestrator.usage.to_dict()
+        progress_hub.publish(session_id, {
+            "type": "status",
+            "status": "error",
+            "error": str(e),
+            "terminal": True,
+            "timestamp": datetime.now().isoformat()
+        })
         print(f"Error in agent creation: {traceback.format_exc()}")
 
 
+SESSION_FIELDS = tuple(SessionStatus.model_fields)
+MAX_SESSION_WAIT_SECONDS = float(os.getenv("MAX_SESSION_WAIT_SECONDS", 60))
+FINISHED_STATUSES = ("complete", "error")
+
+
+def _session_etag(version: int, fields: Optional[List[str]]) -> str:
+    """ETag for a session representation: the progress version plus the selected fields."""
+    selection = hashlib.sha1(",".join(fields or SESSION_FIELDS).encode("utf-8")).hexdigest()[:8]
+    return f'"{version}-{selection}"'
+
+
+def _session_fields(session_id: str, fields: List[str], version: int) -> Dict[str, Any]:
+    """Build only the requested parts of a session status."""
+    session = sessions[session_id]
+    getters = {
+        "session_id": lambda: session_id,
+        "status": lambda: session["status"],
+        "current_step": lambda: session.get("current_step", 0),
+        "steps": lambda: session.get("steps", {}),
+        "agent_config": lambda: session.get("agent_config"),
+        "error": lambda: session.get("error"),
+        "token_usage": lambda: session.get("token_usage"),
+        "version": lambda: version,
+    }
+    return {field: getters[field]() for field in fields}
+
+
 @app.get("/api/sessions/{session_id}", response_model=SessionStatus)
-async def get_session(session_id: str):
-    """Get session status and progress."""
+async def get_session(
+    session_id: str,
+    request: Request,
+    wait: Optional[float] = None,
+    since: Optional[int] = None,
+    fields: Optional[str] = None
+):
+    """
+    Get session status and progress.
+    
+    - Conditional: the response carries an ETag tied to the session's progress
+      version. A request with a matching If-None-Match (or ?since=<version>)
+      gets 304 Not Modified.
+    - Long-poll: with ?wait=<seconds>, an unchanged session holds the request
+      until the next progress event (or the timeout, then 304).
+    - ?fields=status,current_step returns only those fields (e.g. to skip agent_config).
+    """
     if session_id not in sessions:
         raise HTTPException(status_code=404, detail="Session not found")
     
+    selected = list(SESSION_FIELDS)
+    if fields:
+        selected = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in selected if field not in SESSION_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    
+    client_etags = {tag.strip() for tag in request.headers.get("if-none-match", "").split(",") if tag.strip()}
+    
+    def unchanged(version: int) -> bool:
+        return _session_etag(version, selected) in client_etags or (since is not None and version <= since)
+    
+    version = progress_hub.last_event_id(session_id)
+    if unchanged(version) and wait and sessions[session_id]["status"] not in FINISHED_STATUSES:
+        # Subscribe before re-checking so an event published in between is not missed
+        subscription = progress_hub.subscribe(session_id, replay=False)
+        try:
+            version = progress_hub.last_event_id(session_id)
+            if unchanged(version):
+                try:
+                    await subscription.get(timeout=min(wait, MAX_SESSION_WAIT_SECONDS))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            progress_hub.unsubscribe(subscription)
+        version = progress_hub.last_event_id(session_id)
+    
+    etag = _session_etag(version, selected)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if unchanged(version):
+        return Response(status_code=304, headers=headers)
+    
+    return JSONResponse(_session_fields(session_id, selected, version), headers=headers)
+
+
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", 15))
+
+
+def _format_sse(event: Dict[str, Any]) -> str:
+    """Encode an event (progress or chat) as a Server-Sent Events frame."""
+    return f"id: {event['id']}\nevent: {event.get('type', 'progress')}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+def _finished_event(session_id: str, last_event_id: Optional[int]) -> Optional[Dict[str, Any]]:
+    """
+    Terminal status event for a finished session with nothing left to replay
+    (its log was evicted, or the client already has it), or None.
+    """
     session = sessions[session_id]
+    if session["status"] not in FINISHED_STATUSES or progress_hub.events_since(session_id, last_event_id):
+        return None
+    event = {
+        "id": max(last_event_id or 0, progress_hub.last_event_id(session_id)),
+        "type": "status",
+        "status": session["status"],
+        "terminal": True
+    }
+    if session.get("error"):
+        event["error"] = session["error"]
+    return event
+
+
+@app.get("/api/sessions/{session_id}/events")
+async def stream_session_events(session_id: str, request: Request, last_event_id: Optional[int] = None):
+    """
+    Server-Sent Events stream of a session's progress.
     
-    return SessionStatus(
-        session_id=session_id,
-        status=session["status"],
-        current_step=session.get("current_step", 0),
-        steps=session.get("steps", {}),
-        agent_config=session.get("agent_config"),
-        error=session.get("error")
+    Replays the session's event log, then streams live events, and ends after
+    the terminal (complete / error) event. Browsers resume automatically via
+    the Last-Event-ID header; other clients can pass ?last_event_id=. A
+    finished session with nothing left to replay gets just its terminal event.
+    """
+    if session_id not in sessions:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    header_id = request.headers.get("last-event-id")
+    if header_id and header_id.isdigit():
+        last_event_id = int(header_id)
+    
+    finished = _finished_event(session_id, last_event_id)
+    if finished is not None:
+        # Nothing more will be published, so don't subscribe and wait for it
+        return StreamingResponse(
+            iter(["retry: 3000\n\n", _format_sse(finished)]),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    
+    subscription = progress_hub.subscribe(session_id, last_event_id)
+    
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await subscription.get(timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    # Dropped as a slow consumer - the client reconnects with Last-Event-ID
+                    return
+                yield _format_sse(event)
+                if event.get("terminal"):
+                    return
+        finally:
+            progress_hub.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 
@@ -317,8 +616,15 @@ async def get_agent_config(session_id: str):
 
 
 @app.get("/api/agents/{session_id}/graph")
-async def get_agent_graph(session_id: str):
-    """Get workflow graph data for visualization."""
+async def get_agent_graph(session_id: str, request: Request):
+    """
+    Get workflow graph data for visualization.
+    
+    Nodes come with layered layout positions computed on the server. Graphs
+    are cached by config hash (also the ETag), so unchanged configs cost
+    nothing and edits only rebuild what changed. Edges to tools or agents
+    missing from the config are flagged and point at "missing" placeholders.
+    """
     if session_id not in sessions:
         raise HTTPException(status_code=404, detail="Session not found")
     
@@ -328,55 +634,12 @@ async def get_agent_graph(session_id: str):
     if not config:
         raise HTTPException(status_code=400, detail="Agent config not available")
     
-    # Build graph from config
-    nodes = []
-    edges = []
-    
-    # Add agent nodes
-    for agent_name, agent_data in config.get("agents", {}).items():
-        nodes.append({
-            "id": agent_name,
-            "type": "agent",
-            "data": {
-                "label": agent_name,
-                "description": agent_data.get("description", ""),
-                "agentType": agent_data.get("type", "llm_agent")
-            },
-            "position": {"x": 0, "y": 0}  # Frontend will layout
-        })
-        
-        # Add edges for sub-agents
-        for sub_agent in agent_data.get("sub_agents", []):
-            edges.append({
-                "id": f"{agent_name}-{sub_agent}",
-                "source": agent_name,
-                "target": sub_agent,
-                "type": "sub_agent"
-            })
-        
-        # Add edges for tools
-        for tool in agent_data.get("tools", []):
-            edges.append({
-                "id": f"{agent_name}-{tool}",
-                "source": agent_name,
-                "target": tool,
-                "type": "tool_usage"
-            })
-    
-    # Add tool nodes
-    for tool_name, tool_data in config.get("tools", {}).items():
-        nodes.append({
-            "id": tool_name,
-            "type": "tool",
-            "data": {
-                "label": tool_name,
-                "description": tool_data.get("description", ""),
-                "toolType": tool_data.get("type", "custom_function")
-            },
-            "position": {"x": 0, "y": 0}
-        })
+    graph, config_hash = graph_cache.graph(session_id, config)
+    etag = f'"{config_hash}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
     
-    return {"nodes": nodes, "edges": edges}
+    return JSONResponse(graph, headers={"ETag": etag})
 
 
 @app.post("/api/agents/{session_id}/download")
@@ -390,6 +653,16 @@ async def download_agent_code(session_id: str):
     if session["status"] != "complete":
         raise HTTPException(status_code=400, detail="Agent not ready yet")
     
+    filename = f"{(session.get('agent_config') or {}).get('project_name', 'agent')}.zip"
+    
+    # Serve from memory when the files are in the artifact store
+    if artifact_store.has(session_id):
+        return Response(
+            content=artifact_store.build_zip(session_id),
+            media_type="application/zip",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+    
     output_dir = session.get("output_directory")
     if not output_dir or not os.path.exists(output_dir):
         raise HTTPException(status_code=404, detail="Agent files not found")
@@ -402,23 +675,108 @@ async def download_agent_code(session_id: str):
     return FileResponse(
         zip_path,
         media_type="application/zip",
-        filename=f"{session.get('agent_config', {}).get('project_name', 'agent')}.zip"
+        filename=filename
     )
 
 
+@app.get("/api/agents/{session_id}/files")
+async def list_agent_files(session_id: str):
+    """List generated files with their content hashes and sizes."""
+    if session_id not in sessions:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    if not artifact_store.has(session_id):
+        raise HTTPException(status_code=404, detail="Agent files not found")
+    
+    return {
+        "project_hash": artifact_store.project_hash(session_id),
+        "files": artifact_store.list_files(session_id)
+    }
+
+
+@app.get("/api/agents/{session_id}/files/{name}")
+async def get_agent_file(session_id: str, name: str, request: Request):
+    """Get the content of one generated file (used by the code editor view)."""
+    if session_id not in sessions:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    content = artifact_store.get_file(session_id, name)
+    if content is None:
+        raise HTTPException(status_code=404, detail=f"File '{name}' not found")
+    
+    # Files are content addressed, so the hash doubles as a strong ETag
+    etag = f'"{artifact_store.file_hash(session_id, name)}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    return PlainTextResponse(content, headers={"ETag": etag})
+
+
+@app.post("/api/agents/{session_id}/export")
+async def export_agent_files(session_id: str, request: ExportAgentRequest):
+    """Opt-in export of the generated files to disk."""
+    if session_id not in sessions:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    session = sessions[session_id]
+    
+    if not artifact_store.has(session_id):
+        raise HTTPException(status_code=404, detail="Agent files not found")
+    
+    project_name = (session.get("agent_config") or {}).get("project_name", session_id)
+    output_directory = artifact_store.export(session_id, _export_dir(request.output_dir, project_name))
+    session["output_directory"] = output_directory
+    
+    return {"output_directory": output_directory}
+
+
 @app.websocket("/ws/agents/{session_id}/progress")
-async def websocket_progress(websocket: WebSocket, session_id: str):
-    """WebSocket for real-time progress updates."""
+async def websocket_progress(websocket: WebSocket, session_id: str, last_event_id: Optional[int] = None):
+    """
+    WebSocket for real-time progress updates.
+    
+    Any number of sockets may follow a session. Reconnect with
+    ?last_event_id=<id of the last event received> to replay missed events.
+    A socket that falls too far behind is closed with code 4008 and should
+    reconnect the same way. Unknown sessions are closed with code 4404; a
+    finished session with nothing left to replay sends its terminal event
+    and closes.
+    """
     await websocket.accept()
-    active_websockets[session_id] = websocket
+    if session_id not in sessions:
+        # Checked before subscribing so arbitrary ids never get a hub channel
+        await websocket.close(code=4404, reason="Session not found")
+        return
+    finished = _finished_event(session_id, last_event_id)
+    if finished is not None:
+        await websocket.send_json(finished)
+        await websocket.close()
+        return
+    subscription = progress_hub.subscribe(session_id, last_event_id)
     
-    try:
+    async def sender():
+        while True:
+            event = await subscription.get()
+            if event is None:
+                if subscription.dropped:
+                    await websocket.close(code=4008, reason="Too slow; reconnect with last_event_id")
+                return
+            await websocket.send_json(event)
+    
+    async def receiver():
+        # Keep connection alive and notice disconnects
         while True:
-            # Keep connection alive
             await websocket.receive_text()
-    except WebSocketDisconnect:
-        if session_id in active_websockets:
-            del active_websockets[session_id]
+    
+    sender_task = asyncio.create_task(sender())
+    receiver_task = asyncio.create_task(receiver())
+    try:
+        await asyncio.wait({sender_task, receiver_task}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in (sender_task, receiver_task):
+            task.cancel()
+        await asyncio.gather(sender_task, receiver_task, return_exceptions=True)
+        progress_hub.unsubscribe(subscription)
 
 
 # ============================================================================
@@ -450,20 +808,128 @@ class ChatMessage(BaseModel):
 class ChatResponse(BaseModel):
     response: str
     session_id: str
+    runtime: str = "agent"  # "agent" = generated agent executed; "prompt" = prompt-only fallback
 
 
 # In-memory chat history
-chat_histories: Dict[str, List[Dict[str, str]]] = {}
-# Cache loaded agents to avoid re-loading
-loaded_agents: Dict[str, Any] = {}
+CHAT_SUMMARY_PROMPT = """Update the running summary of a conversation between a user and an AI agent.
+Keep facts, names, numbers, decisions and open questions the agent may need later; drop small talk.
+Reply with the updated summary only, in under {max_words} words.
 
+Current summary:
+{summary}
 
-@app.post("/api/chat/{session_id}", response_model=ChatResponse)
-async def chat_with_agent(session_id: str, message: ChatMessage):
-    """
-    Chat with a created agent.
-    Loads the generated agent code and executes it with Gemini.
-    """
+New messages:
+{transcript}
+"""
+
+
+_genai_client = None
+
+
+def _get_genai_client():
+    """Shared google-genai client, created on first use; None if no API key is configured."""
+    global _genai_client
+    if _genai_client is None:
+        gemini_api_key = os.getenv("GOOGLE_API_KEY")
+        if not gemini_api_key:
+            return None
+        from google import genai
+        _genai_client = genai.Client(api_key=gemini_api_key)
+    return _genai_client
+
+
+async def _summarize_chat(summary: str, messages: List[Dict[str, str]]) -> str:
+    """Fold messages that left the context window into the session's running summary."""
+    from meta_agent.config import get_config
+    client = _get_genai_client()
+    if client is None:
+        raise RuntimeError("Gemini API key not configured")
+    response = await client.aio.models.generate_content(
+        model=get_config().model_for_step("chat_summary"),
+        contents=CHAT_SUMMARY_PROMPT.format(
+            max_words=chat_memory.max_summary_tokens * 3 // 4,
+            summary=summary or "(none)",
+            transcript=format_transcript(messages)
+        )
+    )
+    return response.text or ""
+
+
+chat_memory = ChatMemory(
+    context_tokens=int(os.getenv("CHAT_CONTEXT_TOKENS", 4000)),
+    max_messages=int(os.getenv("CHAT_MAX_MESSAGES", 200)),
+    summarize=_summarize_chat
+)
+CHAT_HISTORY_PAGE_SIZE = 50
+MAX_CHAT_HISTORY_PAGE_SIZE = 200
+# Warm generated agents (module imported, runner ready), keyed by session and project hash
+# Generated tool code runs in sandboxed worker processes unless TOOL_SANDBOX=0;
+# each agent's ADK session is kept to chat_memory's summary and window
+agent_runtime = AgentRuntime(
+    max_agents=int(os.getenv("WARM_AGENT_CACHE_SIZE", 32)),
+    tool_sandbox=pool_from_env(),
+    memory=chat_memory
+)
+
+
+def _agent_source(session_id: str, session: Dict[str, Any]) -> Optional[str]:
+    """Generated agent.py source, from the artifact store or the exported directory."""
+    source = artifact_store.get_file(session_id, "agent.py")
+    if source is None and session.get("output_directory"):
+        path = Path(session["output_directory"]) / "agent.py"
+        if path.exists():
+            source = path.read_text(encoding="utf-8")
+    return source
+
+
+def _agent_version(session_id: str, session: Dict[str, Any]) -> str:
+    """Hash identifying the generated project a session currently has."""
+    if session.get("artifact_hash"):
+        return session["artifact_hash"]
+    return hashlib.sha256((_agent_source(session_id, session) or "").encode("utf-8")).hexdigest()
+
+
+_prompt_chats: Optional["PromptChats"] = None
+
+
+def _get_prompt_chats() -> "PromptChats":
+    """Shared chat sessions for the prompt fallback, created on first use."""
+    global _prompt_chats
+    if _prompt_chats is None:
+        client = _get_genai_client()
+        if client is None:
+            raise HTTPException(status_code=500, detail="Gemini API key not configured")
+        from chat_session import PromptChats
+        _prompt_chats = PromptChats(
+            client,
+            os.getenv("CHAT_MODEL", "gemini-2.0-flash-exp"),
+            chat_memory,
+            api_key=os.getenv("GOOGLE_API_KEY")
+        )
+    return _prompt_chats
+
+
+def _chat_system_prompt(session: Dict[str, Any]) -> str:
+    """System instruction for the prompt fallback; identical across turns so it can be cached."""
+    from meta_agent.prompt_budget import compact_json
+    return f"""You are an AI agent created for the following purpose:
+{session.get("description", "")}
+
+Agent Configuration:
+{compact_json(session.get("agent_config", {}))}
+
+Respond to user queries according to your purpose and capabilities.
+"""
+
+
+async def _prompt_chat_response(session_id: str, session: Dict[str, Any], message: str) -> str:
+    """Fallback when the generated agent can't be loaded: answer from its configuration."""
+    return await _get_prompt_chats().send(session_id, _chat_system_prompt(session), message)
+
+
+def _chat_session(session_id: str) -> Dict[str, Any]:
+    """The session to chat with, once its agent is ready."""
     # Check if session exists
     if session_id not in sessions:
         raise HTTPException(status_code=404, detail="Session not found")
@@ -474,98 +940,185 @@ async def chat_with_agent(session_id: str, message: ChatMessage):
     if session["status"] != "complete":
         raise HTTPException(status_code=400, detail="Agent not ready yet")
     
-    # Get output directory
+    # Generated files live in the artifact store, or on disk when exported
     output_dir = session.get("output_directory")
-    if not output_dir:
+    if not output_dir and not artifact_store.has(session_id):
         raise HTTPException(status_code=500, detail="Agent files not found")
-    
-    try:
-        # Initialize chat history for this session
-        if session_id not in chat_histories:
-            chat_histories[session_id] = []
-        
-        # Add user message to history
-        chat_histories[session_id].append({
-            "role": "user",
-            "content": message.message
-        })
-        
-        # Use Gemini directly to simulate agent response
-        # In a real scenario, you'd load the generated agent code
-        # For now, we'll use Gemini with the agent's purpose
-        agent_config = session.get("agent_config", {})
-        agent_description = session.get("description", "")
-        
-        # Create context for the agent
-        system_context = f"""You are an AI agent created for the following purpose:
-{agent_description}
+    return session
 
-Agent Configuration:
-{json.dumps(agent_config, indent=2)}
 
-Respond to user queries according to your purpose and capabilities.
-"""
-        
-        # Get Gemini API key
-        gemini_api_key = os.getenv("GOOGLE_API_KEY")
-        if not gemini_api_key:
-            raise HTTPException(status_code=500, detail="Gemini API key not configured")
-        
-        # Call Gemini
-        client = genai.Client(api_key=gemini_api_key)
-        
-        # Build conversation history
-        full_context = system_context + "\n\nConversation History:\n"
-        for msg in chat_histories[session_id]:
-            full_context += f"{msg['role']}: {msg['content']}\n"
-        
-        response = client.models.generate_content(
-            model="gemini-2.0-flash-exp",
-            contents=full_context
+async def _load_chat(session_id: str) -> bool:
+    """
+    After a restart, seed chat memory with the session's latest persisted messages.
+
+    Returns:
+        False if the id belongs to no session and has no stored chat (memory is left untouched)
+    """
+    await _ensure_ready()
+    if chat_memory.has(session_id):
+        return True
+    tail = []
+    if chat_store is not None:
+        try:
+            tail = await asyncio.to_thread(chat_store.page, session_id, None, chat_memory.max_messages)
+        except Exception as e:
+            print(f"Error loading chat history from Firebase: {e}")
+            return session_id in sessions  # Try again on the next request rather than restarting the numbering
+    if not tail and session_id not in sessions:
+        return False
+    if not chat_memory.has(session_id):
+        chat_memory.restore(session_id, tail)
+    return True
+
+
+async def _warm_agent(session_id: str, session: Dict[str, Any]):
+    """Warm runner for the session's generated agent, or None to use the prompt fallback."""
+    try:
+        return await agent_runtime.get(
+            session_id,
+            _agent_version(session_id, session),
+            lambda: _agent_source(session_id, session)
         )
+    except AgentLoadError as e:
+        print(f"[RUNTIME] Could not load agent for {session_id}, using prompt fallback: {e}")
+        return None
+
+
+async def _record_chat_turn(session_id: str, message: str, agent_response: str):
+    """Add a completed exchange to history and store it in Firebase."""
+    user_message = chat_memory.append(session_id, "user", message)
+    reply = chat_memory.append(session_id, "assistant", agent_response)
+    
+    if chat_store is not None:
+        try:
+            await asyncio.to_thread(chat_store.save, session_id, [user_message, reply], timestamp=datetime.now())
+        except Exception as e:
+            print(f"Error storing chat in Firebase: {e}")
+
+
+@app.post("/api/chat/{session_id}", response_model=ChatResponse)
+async def chat_with_agent(session_id: str, message: ChatMessage):
+    """
+    Chat with a created agent.
+    Runs the generated root_agent (with its tools) on a warm ADK runner. If
+    the generated code can't be loaded, falls back to a prompt built from
+    the agent's configuration.
+    """
+    session = _chat_session(session_id)
+    await _load_chat(session_id)
+    
+    try:
+        # Run the real agent; its ADK session holds the summary and recent turns
+        warm = await _warm_agent(session_id, session)
+        if warm is not None:
+            runtime = "agent"
+            agent_response = await agent_runtime.run_turn(warm, message.message)
+        else:
+            runtime = "prompt"
+            agent_response = await _prompt_chat_response(session_id, session, message.message)
         
-        agent_response = response.text.strip()
-        
-        # Add assistant response to history
-        chat_histories[session_id].append({
-            "role": "assistant",
-            "content": agent_response
-        })
-        
-        # Store chat in Firebase
-        if FIREBASE_ENABLED:
-            try:
-                chat_ref = firebase_db.collection('chats').document(session_id).collection('messages')
-                chat_ref.add({
-                    "role": "user",
-                    "content": message.message,
-                    "timestamp": datetime.now()
-                })
-                chat_ref.add({
-                    "role": "assistant",
-                    "content": agent_response,
-                    "timestamp": datetime.now()
-                })
-            except Exception as e:
-                print(f"Error storing chat in Firebase: {e}")
+        # Only completed exchanges go into history
+        await _record_chat_turn(session_id, message.message, agent_response)
         
         return ChatResponse(
             response=agent_response,
-            session_id=session_id
+            session_id=session_id,
+            runtime=runtime
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in chat: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
 
 
+@app.post("/api/chat/{session_id}/stream")
+async def stream_chat_with_agent(session_id: str, message: ChatMessage):
+    """
+    Chat with a created agent, streaming the reply as Server-Sent Events.
+    
+    Events: "chunk" ({"text"}) as the model generates, then "done"
+    ({"response", "runtime"}) once the reply is complete and saved, or
+    "error" ({"detail"}). The message and reply are only added to history
+    and Firebase when the reply completes.
+    """
+    session = _chat_session(session_id)
+    await _load_chat(session_id)
+    
+    async def event_stream():
+        event_id = 0
+        
+        def frame(event_type: str, **data) -> str:
+            nonlocal event_id
+            event_id += 1
+            return _format_sse(dict(data, id=event_id, type=event_type))
+        
+        try:
+            warm = await _warm_agent(session_id, session)
+            if warm is not None:
+                runtime = "agent"
+                async for kind, text in agent_runtime.stream_turn(warm, message.message):
+                    if kind == "delta":
+                        yield frame("chunk", text=text)
+                    else:
+                        agent_response = text
+            else:
+                runtime = "prompt"
+                chunks = []
+                async for text in _get_prompt_chats().stream(session_id, _chat_system_prompt(session), message.message):
+                    chunks.append(text)
+                    yield frame("chunk", text=text)
+                agent_response = "".join(chunks).strip()
+        except HTTPException as e:
+            yield frame("error", detail=e.detail)
+            return
+        except Exception as e:
+            print(f"Error in chat stream: {traceback.format_exc()}")
+            yield frame("error", detail=f"Chat error: {str(e)}")
+            return
+        
+        await _record_chat_turn(session_id, message.message, agent_response)
+        yield frame("done", response=agent_response, runtime=runtime, session_id=session_id)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.get("/api/chat/{session_id}/history")
-async def get_chat_history(session_id: str):
-    """Get chat history for a session."""
-    if session_id not in chat_histories:
-        return {"messages": []}
+async def get_chat_history(
+    session_id: str,
+    before: Optional[int] = None,
+    limit: int = CHAT_HISTORY_PAGE_SIZE,
+    compact: bool = False
+):
+    """
+    Get a page of chat history, oldest message first.
     
-    return {"messages": chat_histories[session_id]}
+    Pages are addressed by message seq: with no cursor this returns the latest
+    messages; pass ?before=<next_before> for the page before them. Recent
+    messages come from memory, older ones from Firebase. ?compact=true
+    encodes messages as [seq, "u"|"a", content].
+    """
+    limit = max(1, min(limit, MAX_CHAT_HISTORY_PAGE_SIZE))
+    if not await _load_chat(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    messages, complete = chat_memory.page(session_id, before, limit)
+    if not complete and chat_store is not None:
+        try:
+            messages = await asyncio.to_thread(chat_store.page, session_id, before, limit)
+        except Exception as e:
+            print(f"Error reading chat history from Firebase: {e}")
+    
+    first_seq = messages[0]["seq"] if messages else None
+    return {
+        "messages": encode_messages(messages, compact),
+        "next_before": first_seq if first_seq and first_seq > 1 else None,
+        "has_more": bool(first_seq and first_seq > 1)
+    }
 
 
 # ============================================================================
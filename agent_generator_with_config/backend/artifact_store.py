@@ -0,0 +1,131 @@
+"""
+In-memory artifact store for generated agent projects.
+Keeps generated files keyed by session and content hash so downloads,
+file views and chat can be served without touching the filesystem.
+"""
+
+import hashlib
+import io
+import zipfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Any
+
+
+def content_hash(content: str) -> str:
+    """SHA-256 hex digest of a file's UTF-8 content."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class ArtifactStore:
+    """
+    Session -> {filename: content hash} index over a shared blob table.
+
+    Identical files across sessions (``__init__.py``, ``requirements.txt``)
+    are stored once and reference counted. The oldest sessions are evicted
+    once ``max_sessions`` is exceeded.
+    """
+
+    def __init__(self, max_sessions: int = 256):
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+        self._blobs: Dict[str, str] = {}
+        self._refcounts: Dict[str, int] = {}
+
+    def put(self, session_id: str, files: Dict[str, str]) -> str:
+        """
+        Store a project's files for a session, replacing any previous set.
+
+        Returns:
+            Project hash covering every file name and content hash
+        """
+        if session_id in self._sessions:
+            self.discard(session_id)
+
+        index = {}
+        for name, content in files.items():
+            digest = content_hash(content)
+            if digest not in self._blobs:
+                self._blobs[digest] = content
+            self._refcounts[digest] = self._refcounts.get(digest, 0) + 1
+            index[name] = digest
+
+        self._sessions[session_id] = index
+        while len(self._sessions) > self.max_sessions:
+            oldest = next(iter(self._sessions))
+            self.discard(oldest)
+
+        return self.project_hash(session_id)
+
+    def has(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def project_hash(self, session_id: str) -> Optional[str]:
+        """Stable hash over all (name, content hash) pairs of a session."""
+        index = self._sessions.get(session_id)
+        if index is None:
+            return None
+        digest = hashlib.sha256()
+        for name in sorted(index):
+            digest.update(f"{name}\0{index[name]}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    def list_files(self, session_id: str) -> Dict[str, Dict[str, Any]]:
+        """Return {filename: {"sha256": ..., "size": ...}} for a session."""
+        index = self._sessions.get(session_id, {})
+        return {
+            name: {"sha256": digest, "size": len(self._blobs[digest].encode("utf-8"))}
+            for name, digest in index.items()
+        }
+
+    def get_file(self, session_id: str, name: str) -> Optional[str]:
+        """Return the content of one file, or None if unknown."""
+        digest = self._sessions.get(session_id, {}).get(name)
+        if digest is None:
+            return None
+        self._sessions.move_to_end(session_id)
+        return self._blobs[digest]
+
+    def get_files(self, session_id: str) -> Dict[str, str]:
+        """Return all files of a session as {filename: content}."""
+        index = self._sessions.get(session_id, {})
+        return {name: self._blobs[digest] for name, digest in index.items()}
+
+    def file_hash(self, session_id: str, name: str) -> Optional[str]:
+        return self._sessions.get(session_id, {}).get(name)
+
+    def build_zip(self, session_id: str) -> bytes:
+        """Build a ZIP archive of a session's files entirely in memory."""
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            for name, content in sorted(self.get_files(session_id).items()):
+                archive.writestr(name, content)
+        return buffer.getvalue()
+
+    def export(self, session_id: str, output_dir: str) -> str:
+        """
+        Write a session's files to ``output_dir`` (opt-in disk export).
+
+        Raises:
+            ValueError: If a file name is not a plain name inside output_dir
+        """
+        output_path = Path(output_dir)
+        files = self.get_files(session_id)
+        for name in files:
+            if Path(name).name != name or name in (".", ".."):
+                raise ValueError(f"Refusing to export file outside the output directory: {name!r}")
+        output_path.mkdir(parents=True, exist_ok=True)
+        for name, content in files.items():
+            # The existing file may be a hard link into the shared blob store
+            (output_path / name).unlink(missing_ok=True)
+            (output_path / name).write_text(content, encoding="utf-8")
+        return str(output_path.resolve())
+
+    def discard(self, session_id: str):
+        """Drop a session and release blobs no other session references."""
+        index = self._sessions.pop(session_id, None) or {}
+        for digest in index.values():
+            self._refcounts[digest] -= 1
+            if self._refcounts[digest] <= 0:
+                del self._refcounts[digest]
+                del self._blobs[digest]
@@ -0,0 +1,78 @@
+"""
+Import-time benchmark for the API server's cold start.
+
+Imports a module in fresh interpreters with ``python -X importtime`` and
+reports its median cumulative import time plus the slowest imports under
+it. Exits non-zero when the median is over budget, so it can run in CI:
+
+    python bench_import_time.py                  # import api, 5 runs, 1500 ms budget
+    python bench_import_time.py --runs 10 --budget-ms 800 --top 20
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_BUDGET_MS = 1500
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """(module, self_us, cumulative_us) for each line of -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def measure(module: str) -> Dict[str, int]:
+    """Cumulative import time (us) of every module loaded by one cold import of module."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=Path(__file__).parent,
+        env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1"),
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return {name: cumulative for name, _, cumulative in parse_importtime(result.stderr)}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure cold-start import time of the API server")
+    parser.add_argument("--module", default="api", help="Module to import (default: api)")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to measure (default: 5)")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="Fail above this median")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    args = parser.parse_args(argv)
+
+    runs = [measure(args.module) for _ in range(args.runs)]
+    totals_ms = [run[args.module] / 1000 for run in runs]
+    median_ms = statistics.median(totals_ms)
+
+    # Median per module across runs, for the modules seen in every run
+    common = set.intersection(*(set(run) for run in runs))
+    per_module = {name: statistics.median(run[name] for run in runs) / 1000 for name in common if name != args.module}
+    print(f"Slowest imports under '{args.module}' (cumulative, median of {args.runs} runs):")
+    for name, ms in sorted(per_module.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    print()
+    print(f"import {args.module}: median {median_ms:.1f} ms (min {min(totals_ms):.1f}, max {max(totals_ms):.1f}), "
+          f"budget {args.budget_ms:.0f} ms")
+    if median_ms > args.budget_ms:
+        print("❌ Over budget")
+        return 1
+    print("✅ Within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""
+Conversation memory for /api/chat: per-session message logs with a
+token-budgeted context window.
+
+Each turn sees a rolling summary of older messages plus the newest messages
+that fit in the budget. Messages that slide out of the window are folded
+into the summary by a background task, so summarizing never delays a reply -
+a turn simply uses the latest summary available. Sessions keep a capped
+number of messages, and the number of sessions is LRU-bounded.
+
+Every message gets a seq: its 1-based position in the conversation, kept
+across trims and restarts, used as the history pagination cursor.
+"""
+
+import asyncio
+import sys
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+Message = Dict[str, str]
+Summarizer = Callable[[str, List[Message]], Awaitable[str]]
+
+
+def _estimate_tokens(text: str) -> int:
+    # meta_agent is imported on first use, keeping it out of API startup
+    from meta_agent.prompt_budget import estimate_tokens
+    return estimate_tokens(text)
+
+
+class _Conversation:
+    def __init__(self):
+        self.messages: List[Message] = []
+        self.tokens: List[int] = []
+        self.offset = 0            # Messages trimmed from the front by the cap
+        self.summary = ""
+        self.summarized_upto = 0   # Absolute index: messages before it are in the summary
+        self.summary_task: Optional[asyncio.Task] = None
+
+
+class ChatMemory:
+    """Session -> messages, rolling summary and context window."""
+
+    def __init__(
+        self,
+        context_tokens: int = 4000,
+        max_summary_tokens: int = 500,
+        max_messages: int = 200,
+        max_sessions: int = 1024,
+        summarize: Optional[Summarizer] = None
+    ):
+        """
+        Args:
+            context_tokens: Budget for summary + window on each turn
+            max_summary_tokens: Summaries are cut to this size
+            max_messages: Messages retained per session
+            max_sessions: Sessions retained (least recently used are dropped)
+            summarize: async (previous summary, messages) -> new summary; None disables summaries
+        """
+        self.context_tokens = context_tokens
+        self.max_summary_tokens = max_summary_tokens
+        self.max_messages = max_messages
+        self.max_sessions = max_sessions
+        self.summarize = summarize
+        self._conversations: "OrderedDict[str, _Conversation]" = OrderedDict()
+        self.summaries = 0
+        self.summary_failures = 0
+        self.dropped_unsummarized = 0
+
+    def _conversation(self, session_id: str) -> _Conversation:
+        conversation = self._conversations.get(session_id)
+        if conversation is None:
+            conversation = _Conversation()
+            self._conversations[session_id] = conversation
+            self._evict()
+        else:
+            self._conversations.move_to_end(session_id)
+        return conversation
+
+    def _evict(self):
+        while len(self._conversations) > self.max_sessions:
+            _, evicted = self._conversations.popitem(last=False)
+            if evicted.summary_task:
+                evicted.summary_task.cancel()
+
+    def has(self, session_id: str) -> bool:
+        return session_id in self._conversations
+
+    def append(self, session_id: str, role: str, content: str) -> Message:
+        """Record a message, trimming the oldest past the per-session cap. Returns it with its seq."""
+        conversation = self._conversation(session_id)
+        message = {"seq": conversation.offset + len(conversation.messages) + 1, "role": role, "content": content}
+        conversation.messages.append(message)
+        conversation.tokens.append(_estimate_tokens(content))
+
+        excess = len(conversation.messages) - self.max_messages
+        if excess > 0:
+            del conversation.messages[:excess]
+            del conversation.tokens[:excess]
+            conversation.offset += excess
+            if conversation.summarized_upto < conversation.offset:
+                self.dropped_unsummarized += conversation.offset - conversation.summarized_upto
+                conversation.summarized_upto = conversation.offset
+        return message
+
+    def restore(self, session_id: str, messages: List[Message]):
+        """
+        Start a session from persisted messages (its latest ones, oldest
+        first, with seqs) so numbering and context carry on after a restart.
+        """
+        conversation = _Conversation()
+        messages = messages[-self.max_messages:]
+        conversation.messages = [dict(m) for m in messages]
+        conversation.tokens = [_estimate_tokens(m["content"]) for m in messages]
+        conversation.offset = messages[0]["seq"] - 1 if messages else 0
+        conversation.summarized_upto = conversation.offset
+        previous = self._conversations.pop(session_id, None)
+        if previous and previous.summary_task:
+            previous.summary_task.cancel()
+        self._conversations[session_id] = conversation
+        self._evict()
+
+    def page(self, session_id: str, before: Optional[int] = None, limit: int = 50) -> Tuple[List[Message], bool]:
+        """
+        Up to limit retained messages with seq < before (the latest if None), oldest first.
+
+        Returns:
+            (messages, complete) - complete is False when older messages
+            belonging on this page were trimmed and must come from storage
+        """
+        conversation = self._conversations.get(session_id)
+        if conversation is None:
+            return [], False
+        end = len(conversation.messages) if before is None else max(0, min(before - 1 - conversation.offset, len(conversation.messages)))
+        start = max(0, end - limit)
+        page = conversation.messages[start:end]
+        return list(page), len(page) == limit or conversation.offset == 0
+
+    def messages(self, session_id: str) -> List[Message]:
+        """Retained messages, oldest first."""
+        conversation = self._conversations.get(session_id)
+        return list(conversation.messages) if conversation else []
+
+    def count(self, session_id: str) -> int:
+        """Messages ever appended to a session, including trimmed ones."""
+        conversation = self._conversations.get(session_id)
+        return conversation.offset + len(conversation.messages) if conversation else 0
+
+    def context(self, session_id: str) -> Tuple[str, List[Message]]:
+        """
+        Summary and message window for the next turn.
+
+        The window is the newest messages that fit in the budget after the
+        summary (always at least the latest one). Older messages not yet in
+        the summary are handed to the summarizer in the background.
+
+        Returns:
+            (summary, window messages oldest first)
+        """
+        conversation = self._conversation(session_id)
+        budget = self.context_tokens - _estimate_tokens(conversation.summary)
+        start = len(conversation.messages)
+        used = 0
+        while start > 0:
+            cost = conversation.tokens[start - 1]
+            if used + cost > budget and start < len(conversation.messages):
+                break
+            used += cost
+            start -= 1
+
+        window_start = conversation.offset + start
+        if window_start > conversation.summarized_upto:
+            self._schedule_summary(conversation, window_start)
+        return conversation.summary, list(conversation.messages[start:])
+
+    def _schedule_summary(self, conversation: _Conversation, upto: int):
+        if self.summarize is None:
+            return
+        if conversation.summary_task and not conversation.summary_task.done():
+            return  # The next turn picks up whatever this one leaves behind
+        try:
+            conversation.summary_task = asyncio.get_running_loop().create_task(
+                self._fold(conversation, upto)
+            )
+        except RuntimeError:
+            pass  # No event loop; summaries are best effort
+
+    async def _fold(self, conversation: _Conversation, upto: int):
+        first = conversation.summarized_upto
+        if upto <= first:
+            return
+        pending = conversation.messages[first - conversation.offset:upto - conversation.offset]
+        try:
+            summary = await self.summarize(conversation.summary, pending)
+        except Exception as e:
+            self.summary_failures += 1
+            print(f"[CHAT] Summary failed: {type(e).__name__}: {e}")
+            return
+        if conversation.summarized_upto != first:
+            return  # Trimmed past while we were summarizing
+        from meta_agent.prompt_budget import CHARS_PER_TOKEN
+        conversation.summary = (summary or "").strip()[:self.max_summary_tokens * CHARS_PER_TOKEN]
+        conversation.summarized_upto = upto
+        self.summaries += 1
+
+    async def flush(self, session_id: str):
+        """Wait for a session's in-flight summary, if any."""
+        conversation = self._conversations.get(session_id)
+        if conversation and conversation.summary_task:
+            await asyncio.gather(conversation.summary_task, return_exceptions=True)
+
+    def discard(self, session_id: str):
+        conversation = self._conversations.pop(session_id, None)
+        if conversation and conversation.summary_task:
+            conversation.summary_task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._conversations),
+            "messages": sum(len(c.messages) for c in self._conversations.values()),
+            "summaries": self.summaries,
+            "summary_failures": self.summary_failures,
+            "dropped_unsummarized": self.dropped_unsummarized,
+        }
+
+
+def format_transcript(messages: List[Message]) -> str:
+    """role: content lines, as the prompt and summarizer see them."""
+    return "\n".join(f"{message['role']}: {message['content']}" for message in messages)
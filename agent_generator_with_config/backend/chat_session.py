@@ -0,0 +1,163 @@
+"""
+Native multi-turn chat for the prompt-based chat path.
+
+Each conversation keeps a live google-genai chat whose history is
+structured, role-tagged contents, so a turn sends only the new message
+rather than a re-flattened transcript. The system instruction is built once
+per agent version and goes through PromptAssembler, which puts it in an
+explicit context cache when it is big enough and the model supports it.
+
+The chat is rebuilt from ChatMemory (summary + window) when its history
+outgrows the memory budget, when a newer summary is available, or when
+turns were answered elsewhere (e.g. by the generated agent).
+"""
+
+import asyncio
+import hashlib
+import sys
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+from google.genai import types
+
+sys.path.append(str(Path(__file__).parent.parent))
+from meta_agent.prompt_budget import PromptAssembler, estimate_tokens
+
+from chat_memory import ChatMemory, Message
+
+ROLE_MAP = {"user": "user", "assistant": "model"}
+
+
+def to_contents(summary: str, messages: List[Message]) -> List[types.Content]:
+    """Role-tagged contents for a chat history, led by the summary of older turns."""
+    contents = []
+    if summary:
+        contents.append(types.Content(role="user", parts=[types.Part(text=f"Summary of our earlier conversation:\n{summary}")]))
+        contents.append(types.Content(role="model", parts=[types.Part(text="Understood.")]))
+    for message in messages:
+        contents.append(types.Content(role=ROLE_MAP.get(message["role"], "user"), parts=[types.Part(text=message["content"])]))
+    return contents
+
+
+class _LiveChat:
+    def __init__(self, chat: Any, system_key: str, summary: str, tokens: int, synced: int):
+        self.chat = chat
+        self.system_key = system_key
+        self.summary = summary
+        self.tokens = tokens      # Estimated size of the chat's history
+        self.synced = synced      # ChatMemory.count() the history corresponds to
+
+
+class PromptChats:
+    """Live chats per session, plus their cached system instructions."""
+
+    def __init__(self, client: Any, model: str, memory: ChatMemory, api_key: str = "", max_sessions: int = 256):
+        self.client = client
+        self.model = model
+        self.memory = memory
+        self.max_sessions = max_sessions
+        self.assembler = PromptAssembler(client, model, api_key=api_key)
+        self._chats: "OrderedDict[str, _LiveChat]" = OrderedDict()
+        self._configs: Dict[str, types.GenerateContentConfig] = {}
+        # One turn at a time per conversation; a lock lives while a turn holds or awaits it
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self.rebuilds = 0
+        self.turns = 0
+
+    async def _config(self, system_prompt: str) -> Tuple[str, types.GenerateContentConfig]:
+        key = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+        config = self._configs.get(key)
+        if config is None:
+            config = await self.assembler.build_config(system_prompt)
+            self._configs[key] = config
+            while len(self._configs) > self.max_sessions:
+                self._configs.pop(next(iter(self._configs)))
+        return key, config
+
+    async def _chat_for(self, session_id: str, system_prompt: str) -> _LiveChat:
+        """The session's live chat, rebuilt from memory if it no longer matches it."""
+        key, config = await self._config(system_prompt)
+        summary, window = self.memory.context(session_id)
+        history = window
+        live = self._chats.get(session_id)
+        if live is not None and (
+            live.system_key != key
+            or live.summary != summary
+            or live.synced != self.memory.count(session_id)
+            or live.tokens > self.memory.context_tokens
+        ):
+            live = None
+        if live is None:
+            chat = self.client.aio.chats.create(model=self.model, config=config, history=to_contents(summary, history))
+            tokens = estimate_tokens(summary) + sum(estimate_tokens(m["content"]) for m in history)
+            live = _LiveChat(chat, key, summary, tokens, self.memory.count(session_id))
+            self.rebuilds += 1
+        self._chats[session_id] = live
+        self._chats.move_to_end(session_id)
+        while len(self._chats) > self.max_sessions:
+            self._chats.popitem(last=False)
+        return live
+
+    def _lock(self, session_id: str) -> asyncio.Lock:
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+        return lock
+
+    async def send(self, session_id: str, system_prompt: str, message: str) -> str:
+        """
+        Answer a user message.
+
+        Once it succeeds, the caller appends the message and the reply to
+        ChatMemory.
+        """
+        async with self._lock(session_id):
+            live = await self._chat_for(session_id, system_prompt)
+            try:
+                response = await live.chat.send_message(message)
+            except Exception as e:
+                self._failed(session_id, system_prompt, e)
+                raise
+            reply = (response.text or "").strip()
+            self._finished(live, message, reply)
+        return reply
+
+    async def stream(self, session_id: str, system_prompt: str, message: str) -> AsyncIterator[str]:
+        """Like send, yielding the reply in chunks as the model generates it."""
+        async with self._lock(session_id):
+            live = await self._chat_for(session_id, system_prompt)
+            chunks = []
+            complete = False
+            try:
+                async for chunk in await live.chat.send_message_stream(message):
+                    if chunk.text:
+                        chunks.append(chunk.text)
+                        yield chunk.text
+                complete = True
+            except Exception as e:
+                self._failed(session_id, system_prompt, e)
+                raise
+            finally:
+                if not complete:
+                    # Abandoned mid-stream: the chat's history is in an unknown state
+                    self._chats.pop(session_id, None)
+            self._finished(live, message, "".join(chunks).strip())
+
+    def _finished(self, live: _LiveChat, message: str, reply: str):
+        live.tokens += estimate_tokens(message) + estimate_tokens(reply)
+        live.synced += 2
+        self.turns += 1
+
+    def _failed(self, session_id: str, system_prompt: str, error: Exception):
+        self._chats.pop(session_id, None)
+        if "cache" in str(error).lower():
+            self.assembler.invalidate(system_prompt)
+            self._configs.clear()
+
+    def discard(self, session_id: str):
+        self._chats.pop(session_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"live_chats": len(self._chats), "turns": self.turns, "rebuilds": self.rebuilds}
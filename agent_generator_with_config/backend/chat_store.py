@@ -0,0 +1,122 @@
+"""
+Persistent chat history in Firestore.
+
+Messages live at chats/{session_id}/messages/{seq:010d}, where seq is the
+message's position in the conversation (1-based). Zero-padded ids keep
+documents in conversation order, make writes idempotent, and let a page
+be read with one indexed query (seq < before, newest first, limit n).
+
+Messages stored before seqs existed have auto-generated ids and no seq.
+The first time a session is read or written, such messages are renumbered
+into place (by timestamp) and the session is marked as migrated.
+"""
+
+import threading
+from datetime import datetime, timezone
+from typing import Any, List, Optional, Set
+
+from chat_memory import Message
+
+
+# Firestore allows 500 writes per batch
+MAX_BATCH_WRITES = 400
+_EPOCH = datetime.min.replace(tzinfo=timezone.utc)
+
+
+def _doc_id(seq: int) -> str:
+    return f"{seq:010d}"
+
+
+def _sort_time(value: Any) -> datetime:
+    """Timestamps as aware datetimes, so stored and naive ones compare."""
+    if not isinstance(value, datetime):
+        return _EPOCH
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class FirestoreChatStore:
+    """Chat messages of every session, in a Firestore database."""
+
+    def __init__(self, db: Any, collection: str = "chats"):
+        self.db = db
+        self.collection = collection
+        self._migrated: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def _messages(self, session_id: str):
+        return self.db.collection(self.collection).document(session_id).collection("messages")
+
+    def _ensure_migrated(self, session_id: str):
+        """Number the session's seq-less messages, once per session."""
+        if session_id in self._migrated:
+            return
+        with self._lock:
+            if session_id in self._migrated:
+                return
+            session_ref = self.db.collection(self.collection).document(session_id)
+            snapshot = session_ref.get()
+            if not (snapshot.exists and (snapshot.to_dict() or {}).get("seq_migrated")):
+                self._migrate(session_id)
+                session_ref.set({"seq_migrated": True}, merge=True)
+            self._migrated.add(session_id)
+
+    def _migrate(self, session_id: str):
+        docs = list(self._messages(session_id).stream())
+        if all("seq" in doc.to_dict() for doc in docs):
+            return
+        # Legacy messages predate seqs, so they sort first at equal times
+        ordered = sorted(docs, key=lambda doc: (
+            _sort_time(doc.to_dict().get("timestamp")), doc.to_dict().get("seq", 0), doc.id
+        ))
+        writes = []
+        for seq, doc in enumerate(ordered, start=1):
+            data = dict(doc.to_dict(), seq=seq)
+            if doc.id != _doc_id(seq) or doc.to_dict().get("seq") != seq:
+                writes.append(("set", self._messages(session_id).document(_doc_id(seq)), data))
+        renumbered = {_doc_id(seq) for seq in range(1, len(ordered) + 1)}
+        writes += [("delete", doc.reference, None) for doc in docs if doc.id not in renumbered]
+        for start in range(0, len(writes), MAX_BATCH_WRITES):
+            batch = self.db.batch()
+            for op, ref, data in writes[start:start + MAX_BATCH_WRITES]:
+                if op == "set":
+                    batch.set(ref, data)
+                else:
+                    batch.delete(ref)
+            batch.commit()
+        print(f"[CHAT] Numbered {len(ordered)} stored messages of {session_id}")
+
+    def save(self, session_id: str, messages: List[Message], timestamp: Any = None):
+        """Write messages (each with a seq) in one batch."""
+        self._ensure_migrated(session_id)
+        batch = self.db.batch()
+        ref = self._messages(session_id)
+        for message in messages:
+            data = {"seq": message["seq"], "role": message["role"], "content": message["content"]}
+            if timestamp is not None:
+                data["timestamp"] = timestamp
+            batch.set(ref.document(_doc_id(message["seq"])), data)
+        batch.commit()
+
+    def page(self, session_id: str, before: Optional[int] = None, limit: int = 50) -> List[Message]:
+        """Up to limit messages with seq < before (the latest if None), oldest first."""
+        self._ensure_migrated(session_id)
+        query = self._messages(session_id)
+        if before is not None:
+            query = query.where("seq", "<", before)
+        query = query.order_by("seq", direction="DESCENDING").limit(limit)
+        messages = []
+        for doc in query.stream():
+            data = doc.to_dict()
+            messages.append({"seq": data["seq"], "role": data["role"], "content": data["content"]})
+        messages.reverse()
+        return messages
+
+
+def encode_messages(messages: List[Message], compact: bool = False) -> List[Any]:
+    """
+    Messages for the history API. Compact form is [seq, "u"|"a", content]
+    rows, which is much smaller for long conversations.
+    """
+    if not compact:
+        return [{"seq": m["seq"], "role": m["role"], "content": m["content"]} for m in messages]
+    return [[m["seq"], "u" if m["role"] == "user" else "a", m["content"]] for m in messages]
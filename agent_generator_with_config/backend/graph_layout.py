@@ -0,0 +1,364 @@
+"""
+Architecture graph for the frontend, laid out and cached on the server.
+
+The graph of a project config (agents, tools, sub-agent and tool-usage
+edges) is laid out with a layered, Sugiyama-style algorithm:
+
+1. cycle removal - back edges are reversed for layering only
+2. layering - longest path from the roots, so the main agent is on top
+3. long edges get dummy nodes, one per layer they cross
+4. crossing reduction - barycenter sweeps, seeded with the previous order
+5. coordinates - nodes pulled toward their neighbours, kept apart by spacing
+
+Layouts depend only on the structure (names and edges), so they are cached
+by structure hash and shared between sessions; projects built from the same
+template reuse one layout. Node data (descriptions, types) is cached per
+node, so an edited description rebuilds just that node and a structural
+change to one agent re-runs the layout seeded with the previous ordering,
+which keeps the rest of the graph where it was.
+
+Edges to tools or sub-agents that aren't in the config point at placeholder
+nodes flagged "missing" instead of at nothing.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+NODE_SPACING = 260   # Minimum horizontal distance between node centres
+LAYER_SPACING = 150  # Vertical distance between layers
+SWEEPS = 4           # Barycenter sweeps (each one down and one up)
+
+Layers = List[List[str]]
+
+
+def _hash(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def structure_of(config: Dict[str, Any]) -> Dict[str, Any]:
+    """The parts of a config the layout depends on."""
+    agents = config.get("agents") or {}
+    return {
+        "main_agent": config.get("main_agent"),
+        "agents": {
+            name: {"sub_agents": list(agent.get("sub_agents") or []), "tools": list(agent.get("tools") or [])}
+            for name, agent in agents.items()
+        },
+        "tools": sorted(config.get("tools") or {}),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Layout
+# ---------------------------------------------------------------------------
+
+def _acyclic(nodes: List[str], edges: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """Edges with back edges (found by DFS in node order) reversed."""
+    successors: Dict[str, List[str]] = {node: [] for node in nodes}
+    for source, target in edges:
+        successors[source].append(target)
+    state: Dict[str, int] = {}  # 1 = on the DFS stack, 2 = done
+    back = set()
+    for root in nodes:
+        if root in state:
+            continue
+        stack = [(root, iter(successors[root]))]
+        state[root] = 1
+        while stack:
+            node, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                state[node] = 2
+                stack.pop()
+            elif state.get(child) == 1:
+                back.add((node, child))
+            elif child not in state:
+                state[child] = 1
+                stack.append((child, iter(successors[child])))
+    return [(target, source) if (source, target) in back else (source, target) for source, target in edges]
+
+
+def _assign_layers(nodes: List[str], edges: List[Tuple[str, str]]) -> Dict[str, int]:
+    """Longest path from the sources (edges must be acyclic)."""
+    predecessors: Dict[str, List[str]] = {node: [] for node in nodes}
+    indegree = {node: 0 for node in nodes}
+    successors: Dict[str, List[str]] = {node: [] for node in nodes}
+    for source, target in edges:
+        predecessors[target].append(source)
+        successors[source].append(target)
+        indegree[target] += 1
+    layer = {}
+    ready = [node for node in nodes if indegree[node] == 0]
+    while ready:
+        node = ready.pop(0)
+        layer[node] = max((layer[p] + 1 for p in predecessors[node]), default=0)
+        for child in successors[node]:
+            indegree[child] -= 1
+            if indegree[child] == 0:
+                ready.append(child)
+    return layer
+
+
+def _crossings(upper: List[str], lower: List[str], edges: List[Tuple[str, str]]) -> int:
+    upper_index = {node: i for i, node in enumerate(upper)}
+    lower_index = {node: i for i, node in enumerate(lower)}
+    pairs = sorted(
+        (upper_index[source], lower_index[target]) for source, target in edges
+        if source in upper_index and target in lower_index
+    )
+    return sum(1 for i, (_, a) in enumerate(pairs) for _, b in pairs[i + 1:] if b < a)
+
+
+def _reorder(layer: List[str], fixed: List[str], neighbours: Dict[str, List[str]]) -> List[str]:
+    """Sort a layer by the mean position of each node's neighbours in the fixed layer."""
+    position = {node: i for i, node in enumerate(fixed)}
+
+    def barycenter(item):
+        index, node = item
+        linked = [position[n] for n in neighbours.get(node, []) if n in position]
+        return (sum(linked) / len(linked)) if linked else index * len(fixed) / max(len(layer), 1)
+
+    return [node for _, node in sorted(enumerate(layer), key=lambda item: (barycenter(item), item[0]))]
+
+
+def _place(order: List[str], desired: Dict[str, float]) -> Dict[str, float]:
+    """x for a layer's nodes, in order, as close to desired as spacing allows."""
+    left, right = [], []
+    for node in order:
+        x = desired[node]
+        left.append(x if not left else max(x, left[-1] + NODE_SPACING))
+    for node in reversed(order):
+        x = desired[node]
+        right.append(x if not right else min(x, right[-1] - NODE_SPACING))
+    right.reverse()
+    return {node: (a + b) / 2 for node, a, b in zip(order, left, right)}
+
+
+def layered_layout(
+    nodes: List[str],
+    edges: List[Tuple[str, str]],
+    previous: Optional[Layers] = None
+) -> Tuple[Dict[str, Tuple[float, float]], Layers]:
+    """
+    Lay out a directed graph in layers.
+
+    Args:
+        nodes: Node ids, in a stable order (it breaks ties)
+        edges: (source, target) pairs
+        previous: Per-layer order of an earlier layout of a similar graph,
+                  used as the starting order so unchanged parts stay put
+
+    Returns:
+        ({node: (x, y)}, per-layer node order, excluding dummy nodes)
+    """
+    edges = [(s, t) for s, t in dict.fromkeys(edges) if s != t]
+    edges = _acyclic(nodes, edges)
+    layer_of = _assign_layers(nodes, edges)
+
+    # Split long edges with a dummy node on each layer they cross
+    short_edges = []
+    for source, target in edges:
+        previous_node = source
+        for layer in range(layer_of[source] + 1, layer_of[target]):
+            dummy = f"\0{source}\0{target}\0{layer}"
+            layer_of[dummy] = layer
+            short_edges.append((previous_node, dummy))
+            previous_node = dummy
+        short_edges.append((previous_node, target))
+
+    depth = max(layer_of.values(), default=-1) + 1
+    seed = {node: (i, j) for i, layer in enumerate(previous or []) for j, node in enumerate(layer)}
+    layers: Layers = [[] for _ in range(depth)]
+    for node in list(nodes) + [n for n in layer_of if n.startswith("\0")]:
+        layers[layer_of[node]].append(node)
+    for i, layer in enumerate(layers):
+        # Nodes from the previous layout keep their relative order; new ones follow
+        known = sorted((n for n in layer if seed.get(n, (None,))[0] == i), key=lambda n: seed[n][1])
+        layers[i] = known + [n for n in layer if n not in known]
+
+    up: Dict[str, List[str]] = {}
+    down: Dict[str, List[str]] = {}
+    for source, target in short_edges:
+        down.setdefault(source, []).append(target)
+        up.setdefault(target, []).append(source)
+
+    def total_crossings(candidate: Layers) -> int:
+        return sum(_crossings(candidate[i], candidate[i + 1], short_edges) for i in range(len(candidate) - 1))
+
+    best, best_crossings = [list(layer) for layer in layers], total_crossings(layers)
+    for _ in range(SWEEPS):
+        if best_crossings == 0:
+            break
+        for i in range(1, depth):
+            layers[i] = _reorder(layers[i], layers[i - 1], up)
+        for i in range(depth - 2, -1, -1):
+            layers[i] = _reorder(layers[i], layers[i + 1], down)
+        crossings = total_crossings(layers)
+        if crossings < best_crossings:
+            best, best_crossings = [list(layer) for layer in layers], crossings
+    layers = best
+
+    # Start centred, then pull each node toward its neighbours in both directions
+    x: Dict[str, float] = {}
+    for layer in layers:
+        offset = (len(layer) - 1) * NODE_SPACING / 2
+        for j, node in enumerate(layer):
+            x[node] = j * NODE_SPACING - offset
+    for _ in range(SWEEPS):
+        for index_range, neighbours in ((range(1, depth), up), (range(depth - 2, -1, -1), down)):
+            for i in index_range:
+                desired = {
+                    node: (sum(x[n] for n in neighbours[node]) / len(neighbours[node])) if neighbours.get(node) else x[node]
+                    for node in layers[i]
+                }
+                x.update(_place(layers[i], desired))
+
+    real = [node for node in nodes if node in layer_of]
+    shift = min((x[node] for node in real), default=0.0)
+    positions = {node: (round(x[node] - shift, 1), float(layer_of[node] * LAYER_SPACING)) for node in real}
+    return positions, [[node for node in layer if not node.startswith("\0")] for layer in layers]
+
+
+# ---------------------------------------------------------------------------
+# Graph building and caching
+# ---------------------------------------------------------------------------
+
+def _graph_elements(config: Dict[str, Any]) -> Tuple[List[Tuple[str, str, Dict[str, Any]]], List[Dict[str, Any]]]:
+    """([(node_id, node_type, data)], edges) for a config, with placeholders for missing targets."""
+    agents = config.get("agents") or {}
+    tools = config.get("tools") or {}
+    main_agent = config.get("main_agent")
+
+    # Main agent first: it seeds the DFS and tops the layout
+    names = sorted(agents, key=lambda name: (name != main_agent, name))
+    nodes = [
+        (name, "agent", {
+            "label": name,
+            "description": agents[name].get("description", ""),
+            "agentType": agents[name].get("type", "llm_agent"),
+            "isMain": name == main_agent,
+        })
+        for name in names
+    ]
+    nodes += [
+        (name, "tool", {
+            "label": name,
+            "description": tool.get("description", ""),
+            "toolType": tool.get("type", "custom_function"),
+        })
+        for name, tool in sorted(tools.items())
+    ]
+
+    edges = []
+    missing = {}
+    for name in names:
+        for kind, targets, known, node_type in (
+            ("sub_agent", agents[name].get("sub_agents") or [], agents, "agent"),
+            ("tool_usage", agents[name].get("tools") or [], tools, "tool"),
+        ):
+            for target in targets:
+                edge = {"id": f"{name}-{target}", "source": name, "target": target, "type": kind}
+                if target not in known:
+                    edge["missing"] = True
+                    missing.setdefault(target, node_type)
+                edges.append(edge)
+    nodes += [(name, node_type, {"label": name, "missing": True}) for name, node_type in missing.items()]
+    return nodes, edges
+
+
+class _SessionGraph:
+    def __init__(self, config_hash: str, structure_hash: str, layers: Layers, nodes: Dict[str, Tuple[str, Dict[str, Any]]], graph: Dict[str, Any]):
+        self.config_hash = config_hash
+        self.structure_hash = structure_hash
+        self.layers = layers
+        self.nodes = nodes    # node id -> (data hash, node dict)
+        self.graph = graph
+
+
+class GraphCache:
+    """Laid-out graphs per session, plus layouts shared by structure."""
+
+    def __init__(self, max_sessions: int = 256, max_layouts: int = 256):
+        self.max_sessions = max_sessions
+        self.max_layouts = max_layouts
+        self._sessions: "OrderedDict[str, _SessionGraph]" = OrderedDict()
+        self._layouts: "OrderedDict[str, Tuple[Dict[str, Tuple[float, float]], Layers]]" = OrderedDict()
+        self.hits = 0
+        self.node_updates = 0
+        self.layouts = 0
+        self.shared_layouts = 0
+
+    def _layout(self, structure_hash: str, nodes: List[str], edges: Iterable[Tuple[str, str]], previous: Optional[Layers]):
+        cached = self._layouts.get(structure_hash)
+        if cached is not None:
+            self._layouts.move_to_end(structure_hash)
+            self.shared_layouts += 1
+            return cached
+        cached = layered_layout(nodes, list(edges), previous)
+        self.layouts += 1
+        self._layouts[structure_hash] = cached
+        while len(self._layouts) > self.max_layouts:
+            self._layouts.popitem(last=False)
+        return cached
+
+    def graph(self, session_id: str, config: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+        """
+        The session's graph for this config, and its hash (usable as an ETag).
+
+        Unchanged configs are served from cache; description-only edits
+        rebuild just the changed nodes; structural edits re-run the layout
+        starting from the previous ordering.
+        """
+        config_hash = _hash(config)
+        entry = self._sessions.get(session_id)
+        if entry is not None and entry.config_hash == config_hash:
+            self._sessions.move_to_end(session_id)
+            self.hits += 1
+            return entry.graph, config_hash
+
+        structure_hash = _hash(structure_of(config))
+        elements, edges = _graph_elements(config)
+        positions, layers = self._layout(
+            structure_hash,
+            [node_id for node_id, _, _ in elements],
+            ((edge["source"], edge["target"]) for edge in edges),
+            entry.layers if entry is not None else None,
+        )
+
+        nodes = {}
+        for node_id, node_type, data in elements:
+            x, y = positions[node_id]
+            data_hash = _hash([node_type, data, x, y])
+            previous = entry.nodes.get(node_id) if entry is not None else None
+            if previous is not None and previous[0] == data_hash:
+                nodes[node_id] = previous
+                continue
+            nodes[node_id] = (data_hash, {"id": node_id, "type": node_type, "data": data, "position": {"x": x, "y": y}})
+            self.node_updates += 1
+
+        graph = {
+            "nodes": [node for _, node in nodes.values()],
+            "edges": edges,
+            "layers": layers,
+            "missing": sorted(node_id for node_id, _, data in elements if data.get("missing")),
+        }
+        self._sessions[session_id] = _SessionGraph(config_hash, structure_hash, layers, nodes, graph)
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return graph, config_hash
+
+    def discard(self, session_id: str):
+        self._sessions.pop(session_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._sessions),
+            "layouts_cached": len(self._layouts),
+            "hits": self.hits,
+            "layouts": self.layouts,
+            "shared_layouts": self.shared_layouts,
+            "node_updates": self.node_updates,
+        }
@@ -0,0 +1,158 @@
+"""
+Progress hub: per-session pub/sub for agent creation progress events.
+Publishing never blocks - every subscriber has a bounded queue, and a
+subscriber that falls behind is dropped (it can reconnect and replay from
+its last event id). Each session keeps a bounded event log for replay.
+"""
+
+import asyncio
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Set
+
+
+class Subscription:
+    """One subscriber (a WebSocket or SSE stream) on a session."""
+
+    def __init__(self, session_id: str, queue_size: int):
+        self.session_id = session_id
+        self.queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+        self.closed = False
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Next event, or None once the subscription is dropped or closed.
+
+        Raises:
+            asyncio.TimeoutError: If timeout elapses with no event
+        """
+        if self.closed:
+            return None
+        if timeout is None:
+            event = await self.queue.get()
+        else:
+            event = await asyncio.wait_for(self.queue.get(), timeout)
+        if event is None:
+            self.closed = True
+        return event
+
+    def _offer(self, event: Dict[str, Any]) -> bool:
+        """Queue an event without waiting. Returns False if the queue is full."""
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def _close(self):
+        """Wake the consumer with the end-of-stream marker, discarding anything queued."""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class _SessionChannel:
+    def __init__(self, max_events: int):
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=max_events)
+        self.subscribers: Set[Subscription] = set()
+        self.next_id = 1
+
+
+class ProgressHub:
+    """
+    Session -> event log + subscribers.
+
+    Event ids are integers increasing per session, so a reconnecting client
+    passes the last id it saw and receives only what it missed.
+    """
+
+    def __init__(self, max_events_per_session: int = 500, queue_size: int = 100, max_sessions: int = 1024):
+        self.max_events_per_session = max_events_per_session
+        self.queue_size = queue_size
+        self.max_sessions = max_sessions
+        self._channels: "OrderedDict[str, _SessionChannel]" = OrderedDict()
+        self.dropped_subscribers = 0
+
+    def _channel(self, session_id: str) -> _SessionChannel:
+        channel = self._channels.get(session_id)
+        if channel is None:
+            channel = _SessionChannel(self.max_events_per_session)
+            self._channels[session_id] = channel
+            self._evict()
+        else:
+            self._channels.move_to_end(session_id)
+        return channel
+
+    def _evict(self):
+        """Forget the oldest sessions that nobody is listening to."""
+        for session_id in list(self._channels):
+            if len(self._channels) <= self.max_sessions:
+                break
+            if not self._channels[session_id].subscribers:
+                del self._channels[session_id]
+
+    def publish(self, session_id: str, event: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Append an event to the session log and fan it out. Never blocks.
+
+        Returns:
+            The event with its assigned "id"
+        """
+        channel = self._channel(session_id)
+        event = dict(event, id=channel.next_id)
+        channel.next_id += 1
+        channel.events.append(event)
+
+        for subscription in list(channel.subscribers):
+            if not subscription._offer(event):
+                # Slow consumer: drop it rather than hold up generation
+                subscription.dropped = True
+                channel.subscribers.discard(subscription)
+                subscription._close()
+                self.dropped_subscribers += 1
+        return event
+
+    def events_since(self, session_id: str, last_event_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Logged events after last_event_id (all retained events if None)."""
+        channel = self._channels.get(session_id)
+        if channel is None:
+            return []
+        if last_event_id is None:
+            return list(channel.events)
+        return [event for event in channel.events if event["id"] > last_event_id]
+
+    def last_event_id(self, session_id: str) -> int:
+        """Id of the latest event for a session (0 if none)."""
+        channel = self._channels.get(session_id)
+        return channel.next_id - 1 if channel else 0
+
+    def subscribe(self, session_id: str, last_event_id: Optional[int] = None, replay: bool = True) -> Subscription:
+        """
+        Add a subscriber. Missed events (after last_event_id, or all retained
+        events when it is None) are queued first when replay is True.
+        """
+        channel = self._channel(session_id)
+        backlog = self.events_since(session_id, last_event_id) if replay else []
+        subscription = Subscription(session_id, max(self.queue_size, len(backlog) + self.queue_size))
+        for event in backlog:
+            subscription._offer(event)
+        channel.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        channel = self._channels.get(subscription.session_id)
+        if channel is not None:
+            channel.subscribers.discard(subscription)
+
+    def subscriber_count(self, session_id: str) -> int:
+        channel = self._channels.get(session_id)
+        return len(channel.subscribers) if channel else 0
+
+    def close_session(self, session_id: str):
+        """End every subscription on a session; the log stays available for replay."""
+        channel = self._channels.get(session_id)
+        if channel is None:
+            return
+        for subscription in list(channel.subscribers):
+            subscription._close()
+        channel.subscribers.clear()
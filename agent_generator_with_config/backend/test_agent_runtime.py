@@ -0,0 +1,167 @@
+"""
+Test the warm generated-agent runtime used by /api/chat.
+"""
+
+import asyncio
+
+from agent_runtime import AgentRuntime, AgentLoadError
+from chat_memory import ChatMemory
+
+ECHO_AGENT_SOURCE = '''
+from google.adk.agents import BaseAgent
+from google.adk.events import Event
+from google.genai import types
+
+
+class Echo(BaseAgent):
+    async def _run_async_impl(self, ctx):
+        turn = len([event for event in ctx.session.events if event.author == "user"])
+        text = ctx.user_content.parts[0].text
+        yield Event(author=self.name, content=types.Content(role="model", parts=[types.Part(text=f"{turn}: {text}")]))
+
+
+root_agent = Echo(name="echo")
+'''
+
+STREAMING_AGENT_SOURCE = '''
+from google.adk.agents import BaseAgent
+from google.adk.events import Event
+from google.genai import types
+
+
+class Streamer(BaseAgent):
+    async def _run_async_impl(self, ctx):
+        words = ctx.user_content.parts[0].text.split()
+        for word in words:
+            yield Event(author=self.name, partial=True, content=types.Content(role="model", parts=[types.Part(text=word + " ")]))
+        yield Event(author=self.name, content=types.Content(role="model", parts=[types.Part(text=" ".join(words))]))
+
+
+root_agent = Streamer(name="streamer")
+'''
+
+
+def test_warm_agent_reused_across_turns():
+    """The module is loaded once; later turns reuse the runner and its conversation."""
+    loads = []
+
+    def load_source():
+        loads.append(1)
+        return ECHO_AGENT_SOURCE
+
+    async def run():
+        runtime = AgentRuntime(max_agents=2)
+        replies = []
+        for message in ("hello", "again"):
+            warm = await runtime.get("session", "hash-1", load_source)
+            replies.append(await runtime.run_turn(warm, message))
+        return runtime, replies
+
+    runtime, replies = asyncio.run(run())
+    assert replies == ["1: hello", "2: again"]
+    assert len(loads) == 1
+    assert runtime.stats()["hits"] == 1
+    print("✓ Warm agent reused")
+
+
+def test_broken_agent_fails_once():
+    """A project that can't be imported raises AgentLoadError and is not re-imported."""
+    loads = []
+
+    def load_source():
+        loads.append(1)
+        return "import module_that_does_not_exist\n"
+
+    async def run():
+        runtime = AgentRuntime()
+        for _ in range(2):
+            try:
+                await runtime.get("session", "hash-2", load_source)
+                assert False, "expected AgentLoadError"
+            except AgentLoadError as e:
+                assert "module_that_does_not_exist" in str(e)
+
+    asyncio.run(run())
+    assert len(loads) == 1
+    print("✓ Broken agent reported once")
+
+
+def test_stream_turn():
+    """Streamed chunks arrive as deltas; the final reply matches run_turn."""
+    async def run():
+        runtime = AgentRuntime()
+        items = []
+        for source, key in ((STREAMING_AGENT_SOURCE, "hash-s"), (ECHO_AGENT_SOURCE, "hash-e")):
+            warm = await runtime.get(key, key, lambda source=source: source)
+            items.append([item async for item in runtime.stream_turn(warm, "one two three")])
+        return items
+
+    streaming, echo = asyncio.run(run())
+    assert streaming == [("delta", "one "), ("delta", "two "), ("delta", "three "), ("final", "one two three")]
+    # An agent that doesn't stream still yields its reply as one chunk
+    assert echo == [("delta", "1: one two three"), ("final", "1: one two three")]
+    print("✓ Streamed turn yields deltas then the final reply")
+
+
+HISTORY_AGENT_SOURCE = '''
+from google.adk.agents import BaseAgent
+from google.adk.events import Event
+from google.genai import types
+
+
+class History(BaseAgent):
+    async def _run_async_impl(self, ctx):
+        seen = [event.content.parts[0].text for event in ctx.session.events if event.author == "user"]
+        yield Event(author=self.name, content=types.Content(role="model", parts=[types.Part(text="|".join(seen))]))
+
+
+root_agent = History(name="history")
+'''
+
+
+def test_adk_session_kept_to_memory_window():
+    """The ADK session is rebuilt from chat memory instead of growing without bound."""
+    async def run():
+        memory = ChatMemory(context_tokens=40)
+        runtime = AgentRuntime(memory=memory)
+        replies = []
+        for i in range(8):
+            message = f"message {i} " + "x" * 20  # ~8 tokens; the reply is longer
+            warm = await runtime.get("s", "hash-h", lambda: HISTORY_AGENT_SOURCE)
+            reply = await runtime.run_turn(warm, message)
+            memory.append("s", "user", message)
+            memory.append("s", "assistant", reply)
+            replies.append(reply)
+        return runtime, replies
+
+    runtime, replies = asyncio.run(run())
+    assert replies[0] == "message 0 " + "x" * 20
+    seen = [reply.split("|") for reply in replies]
+    assert max(len(messages) for messages in seen) <= 3
+    assert seen[-1][-1].startswith("message 7")
+    assert runtime.stats()["history_rebuilds"] > 0
+    print("✓ ADK session history kept to the memory window")
+
+
+def test_adk_session_restored_from_memory():
+    """After a restart the agent sees the conversation restored into memory."""
+    async def run():
+        memory = ChatMemory()
+        memory.restore("s", [
+            {"seq": 1, "role": "user", "content": "earlier"},
+            {"seq": 2, "role": "assistant", "content": "noted"},
+        ])
+        runtime = AgentRuntime(memory=memory)
+        warm = await runtime.get("s", "hash-r", lambda: HISTORY_AGENT_SOURCE)
+        return await runtime.run_turn(warm, "now")
+
+    assert asyncio.run(run()) == "earlier|now"
+    print("✓ ADK session seeded from restored memory")
+
+
+if __name__ == "__main__":
+    test_warm_agent_reused_across_turns()
+    test_broken_agent_fails_once()
+    test_stream_turn()
+    test_adk_session_kept_to_memory_window()
+    test_adk_session_restored_from_memory()
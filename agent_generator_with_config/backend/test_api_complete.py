@@ -3,7 +3,6 @@ Complete API Test - Test agent creation before connecting to Next.js frontend
 """
 import requests
 import json
-import time
 from datetime import datetime
 
 BASE_URL = "http://localhost:8000"
@@ -54,8 +53,8 @@ def test_create_agent(description):
         print(f"❌ Error: {e}")
         return None
 
-def test_check_progress(session_id, max_attempts=20):
-    """Test 3: Monitor Progress"""
+def test_check_progress(session_id, timeout=300):
+    """Test 3: Monitor Progress (one Server-Sent Events stream instead of polling)"""
     print_section(f"TEST 3: Monitor Progress - Session: {session_id}")
     
     step_names = {
@@ -67,35 +66,35 @@ def test_check_progress(session_id, max_attempts=20):
         6: "Code Generation"
     }
     
-    for attempt in range(max_attempts):
-        try:
-            response = requests.get(f"{BASE_URL}/api/sessions/{session_id}")
-            status = response.json()
-            
-            current_step = status.get("current_step", 0)
-            step_status = status.get("status", "unknown")
-            
-            step_name = step_names.get(current_step, f"Step {current_step}")
-            
-            print(f"\n[{datetime.now().strftime('%H:%M:%S')}] Step {current_step}/6: {step_name}")
-            print(f"   Status: {step_status}")
-            
-            if step_status == "complete":
-                print("\n" + "🎉" * 40)
-                print("✅ AGENT CREATED SUCCESSFULLY!")
-                print("🎉" * 40)
-                return status
-            elif step_status == "error":
-                print(f"\n❌ Error: {status.get('error')}")
-                return None
-            
-            time.sleep(3)  # Wait 3 seconds before next check
-            
-        except Exception as e:
-            print(f"❌ Error checking progress: {e}")
-            time.sleep(3)
-    
-    print("\n⏱️  Timeout: Agent creation took too long")
+    try:
+        with requests.get(f"{BASE_URL}/api/sessions/{session_id}/events", stream=True, timeout=timeout) as response:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data: "):
+                    continue  # ids, event names, retry hints and keep-alives
+                event = json.loads(line[len("data: "):])
+                
+                if event.get("type") == "progress":
+                    current_step = event.get("step", 0)
+                    step_name = step_names.get(current_step, f"Step {current_step}")
+                    print(f"\n[{datetime.now().strftime('%H:%M:%S')}] Step {current_step}/6: {step_name}")
+                    print(f"   Status: {event.get('status')}")
+                
+                if event.get("terminal"):
+                    break
+        
+        status = requests.get(f"{BASE_URL}/api/sessions/{session_id}").json()
+        if status.get("status") == "complete":
+            print("\n" + "🎉" * 40)
+            print("✅ AGENT CREATED SUCCESSFULLY!")
+            print("🎉" * 40)
+            return status
+        print(f"\n❌ Error: {status.get('error')}")
+        return None
+        
+    except requests.exceptions.Timeout:
+        print("\n⏱️  Timeout: Agent creation took too long")
+    except Exception as e:
+        print(f"❌ Error checking progress: {e}")
     return None
 
 def test_get_config(session_id):
@@ -0,0 +1,137 @@
+"""
+Test the in-memory artifact store and the file endpoints it serves.
+"""
+
+import io
+import os
+import tempfile
+import zipfile
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+import api
+from artifact_store import ArtifactStore, content_hash
+
+FILES = {"agent.py": "root_agent = None\n", "__init__.py": "from . import agent\n", "requirements.txt": "google-adk\n"}
+
+
+def test_shared_blobs_and_hash():
+    """Identical files are stored once; the project hash covers names and contents."""
+    store = ArtifactStore()
+    first = store.put("a", FILES)
+    second = store.put("b", dict(FILES))
+    assert first == second
+    assert len(store._blobs) == 3 and store._refcounts[content_hash(FILES["agent.py"])] == 2
+    assert store.list_files("a")["agent.py"] == {"sha256": content_hash(FILES["agent.py"]), "size": 18}
+
+    changed = store.put("b", dict(FILES, **{"agent.py": "root_agent = 1\n"}))
+    assert changed != first and store.get_file("b", "agent.py") == "root_agent = 1\n"
+    assert store._refcounts[content_hash(FILES["agent.py"])] == 1
+    print("✓ Blobs shared and reference counted")
+
+
+def test_eviction_releases_blobs():
+    """The least recently used session is evicted; reading a file counts as use."""
+    store = ArtifactStore(max_sessions=2)
+    store.put("a", {"agent.py": "a = 1\n"})
+    store.put("b", {"agent.py": "b = 1\n"})
+    assert store.get_file("a", "agent.py") == "a = 1\n"
+    store.put("c", {"agent.py": "c = 1\n"})
+    assert store.has("a") and not store.has("b") and store.has("c")
+    assert content_hash("b = 1\n") not in store._blobs
+    assert store.get_file("b", "agent.py") is None and store.project_hash("b") is None
+    print("✓ Oldest session evicted with its blobs")
+
+
+def test_zip_and_export():
+    store = ArtifactStore()
+    store.put("s", FILES)
+    with zipfile.ZipFile(io.BytesIO(store.build_zip("s"))) as archive:
+        assert sorted(archive.namelist()) == sorted(FILES)
+        assert archive.read("agent.py").decode() == FILES["agent.py"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        target = Path(tmp) / "out" / "project"
+        assert store.export("s", str(target)) == str(target.resolve())
+        assert {path.name: path.read_text() for path in target.iterdir()} == FILES
+
+        store.put("bad", {"../escape.py": "x = 1\n"})
+        try:
+            store.export("bad", str(target))
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+        assert not (Path(tmp) / "out" / "escape.py").exists()
+    print("✓ ZIP built in memory; export writes plain file names only")
+
+
+def _complete_session(session_id: str, project_name: str = "demo_project"):
+    api.sessions[session_id] = {
+        "id": session_id, "status": "complete", "steps": {}, "current_step": 6,
+        "agent_config": {"project_name": project_name}, "created_at": "2025-01-01T00:00:00",
+    }
+    api.artifact_store.put(session_id, FILES)
+
+
+def test_file_endpoints():
+    """/files lists hashes, /files/{name} serves content with an ETag, /download zips."""
+    client = TestClient(api.app)
+    _complete_session("files_session")
+
+    listing = client.get("/api/agents/files_session/files").json()
+    assert listing["project_hash"] == api.artifact_store.project_hash("files_session")
+    assert set(listing["files"]) == set(FILES)
+
+    response = client.get("/api/agents/files_session/files/agent.py")
+    assert response.status_code == 200 and response.text == FILES["agent.py"]
+    etag = response.headers["etag"]
+    assert client.get("/api/agents/files_session/files/agent.py", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/api/agents/files_session/files/missing.py").status_code == 404
+    assert client.get("/api/agents/unknown_session/files").status_code == 404
+
+    download = client.post("/api/agents/files_session/download")
+    assert download.headers["content-disposition"] == 'attachment; filename="demo_project.zip"'
+    with zipfile.ZipFile(io.BytesIO(download.content)) as archive:
+        assert sorted(archive.namelist()) == sorted(FILES)
+    print("✓ File list, file content and download endpoints")
+
+
+def test_export_endpoint_stays_in_base_dir():
+    """Exports land under EXPORT_BASE_DIR; paths that leave it are rejected."""
+    client = TestClient(api.app)
+    _complete_session("export_session")
+    original = api.EXPORT_BASE_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        api.EXPORT_BASE_DIR = Path(tmp).resolve()
+        try:
+            response = client.post("/api/agents/export_session/export", json={"output_dir": "agents"})
+            assert response.status_code == 200
+            exported = Path(response.json()["output_directory"])
+            assert exported == api.EXPORT_BASE_DIR / "agents" / "demo_project"
+            assert sorted(os.listdir(exported)) == sorted(FILES)
+
+            for output_dir in ("../../etc", "/etc", "agents/../.."):
+                response = client.post("/api/agents/export_session/export", json={"output_dir": output_dir})
+                assert response.status_code == 400, output_dir
+
+            # A hostile project name can't climb out either
+            _complete_session("export_session_2", project_name="../../escaped")
+            response = client.post("/api/agents/export_session_2/export", json={"output_dir": "agents"})
+            assert response.status_code == 400
+            assert not (Path(tmp).parent / "escaped").exists()
+
+            assert client.post("/api/agents/create", json={"description": "x", "output_dir": "/tmp"}).status_code == 400
+        finally:
+            api.EXPORT_BASE_DIR = original
+    print("✓ Export confined to the export base directory")
+
+
+if __name__ == "__main__":
+    print("Testing artifact store...\n")
+    test_shared_blobs_and_hash()
+    test_eviction_releases_blobs()
+    test_zip_and_export()
+    test_file_endpoints()
+    test_export_endpoint_stays_in_base_dir()
+    print("\n✅ All artifact store tests passed!")
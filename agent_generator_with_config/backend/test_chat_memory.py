@@ -0,0 +1,107 @@
+"""
+Test token-budgeted chat memory with background summaries.
+"""
+
+import asyncio
+
+from chat_memory import ChatMemory, format_transcript
+
+
+def test_window_fits_budget():
+    """Only the newest messages that fit are sent; the latest always is."""
+    memory = ChatMemory(context_tokens=30)
+    for i in range(10):
+        memory.append("s", "user", f"message {i} " + "x" * 36)  # ~12 tokens each
+    summary, window = memory.context("s")
+    assert summary == ""
+    assert [m["content"][:9] for m in window] == ["message 8", "message 9"]
+
+    memory.append("s", "user", "y" * 1000)
+    _, window = memory.context("s")
+    assert len(window) == 1 and window[0]["content"] == "y" * 1000
+    print("✓ Context window stays within the token budget")
+
+
+def test_summary_runs_in_background():
+    """Messages leaving the window are summarized without blocking context()."""
+    calls = []
+    release = asyncio.Event()
+
+    async def summarize(previous, messages):
+        calls.append((previous, [m["content"] for m in messages]))
+        await release.wait()
+        return f"{previous}+{len(messages)}".lstrip("+")
+
+    async def run():
+        memory = ChatMemory(context_tokens=10, summarize=summarize)
+        for i in range(4):
+            memory.append("s", "user" if i % 2 == 0 else "assistant", f"turn {i} " + "z" * 20)
+        summary, window = memory.context("s")
+        assert summary == "" and len(window) == 1  # Summary still pending, reply not delayed
+        release.set()
+        await memory.flush("s")
+        summary, _ = memory.context("s")
+        return memory, summary
+
+    memory, summary = asyncio.run(run())
+    assert calls[0] == ("", [f"turn {i} " + "z" * 20 for i in range(3)])
+    assert summary == "3"
+    assert memory.stats()["summaries"] == 1
+    print("✓ Older turns folded into a background summary")
+
+
+def test_session_caps():
+    """Per-session message cap and LRU session cap."""
+    memory = ChatMemory(max_messages=3, max_sessions=2)
+    for i in range(5):
+        memory.append("a", "user", str(i))
+    assert [m["content"] for m in memory.messages("a")] == ["2", "3", "4"]
+    assert memory.stats()["dropped_unsummarized"] == 2
+
+    memory.append("b", "user", "hi")
+    memory.append("c", "user", "hi")
+    assert not memory.has("a") and memory.has("b") and memory.has("c")
+    print("✓ Per-session and session-count caps applied")
+
+
+def test_seq_and_pages():
+    """Messages are numbered; pages come from the retained tail when it covers them."""
+    memory = ChatMemory(max_messages=5)
+    for i in range(8):
+        assert memory.append("s", "user", str(i))["seq"] == i + 1
+
+    page, complete = memory.page("s", limit=3)
+    assert [m["seq"] for m in page] == [6, 7, 8] and complete
+    page, complete = memory.page("s", before=6, limit=2)
+    assert [m["seq"] for m in page] == [4, 5] and complete
+    # Seqs 1-3 were trimmed: the page has to come from storage
+    page, complete = memory.page("s", before=5, limit=3)
+    assert [m["seq"] for m in page] == [4] and not complete
+    print("✓ Seq numbering and tail pagination")
+
+
+def test_restore_continues_numbering():
+    memory = ChatMemory()
+    memory.restore("s", [{"seq": 41, "role": "user", "content": "a"}, {"seq": 42, "role": "assistant", "content": "b"}])
+    assert memory.append("s", "user", "c")["seq"] == 43
+    assert memory.count("s") == 43
+    _, window = memory.context("s")
+    assert [m["content"] for m in window] == ["a", "b", "c"]
+    print("✓ Restored sessions continue their numbering")
+
+
+def test_format_transcript():
+    assert format_transcript([{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}]) == \
+        "user: hi\nassistant: hello"
+    print("✓ Transcript formatting")
+
+
+if __name__ == "__main__":
+    print("Testing chat memory...\n")
+    test_window_fits_budget()
+    test_summary_runs_in_background()
+    test_session_caps()
+    test_seq_and_pages()
+    test_restore_continues_numbering()
+    test_format_transcript()
+    print("\n✅ All chat memory tests passed!")
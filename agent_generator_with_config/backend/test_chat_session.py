@@ -0,0 +1,171 @@
+"""
+Test the native multi-turn chat layer used by the prompt-based chat path.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from chat_memory import ChatMemory
+from chat_session import PromptChats, to_contents
+from meta_agent.prompt_budget import estimate_tokens
+
+
+class FakeChat:
+    def __init__(self, config, history):
+        self.config = config
+        self.history = list(history)
+        self.sent = []
+
+    async def send_message(self, message):
+        self.sent.append(message)
+        return SimpleNamespace(text=f"reply {len(self.history) + 2 * len(self.sent) - 1}")
+
+    async def send_message_stream(self, message):
+        self.sent.append(message)
+
+        async def chunks():
+            for word in ("streamed", " ", "reply"):
+                yield SimpleNamespace(text=word)
+        return chunks()
+
+
+class SlowChat(FakeChat):
+    in_flight = 0
+    most_in_flight = 0
+
+    async def send_message(self, message):
+        SlowChat.in_flight += 1
+        SlowChat.most_in_flight = max(SlowChat.most_in_flight, SlowChat.in_flight)
+        await asyncio.sleep(0.01)
+        SlowChat.in_flight -= 1
+        return await super().send_message(message)
+
+
+class FakeClient:
+    def __init__(self, chat_class=FakeChat):
+        self.created = []
+        self.chat_class = chat_class
+        self.aio = SimpleNamespace(chats=SimpleNamespace(create=self._create))
+
+    def _create(self, model, config, history):
+        chat = self.chat_class(config, history)
+        self.created.append(chat)
+        return chat
+
+
+async def _turn(chats, memory, session_id, text, system="You are a test agent."):
+    reply = await chats.send(session_id, system, text)
+    memory.append(session_id, "user", text)
+    memory.append(session_id, "assistant", reply)
+    return reply
+
+
+def test_to_contents():
+    contents = to_contents("earlier stuff", [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}])
+    assert [c.role for c in contents] == ["user", "model", "user", "model"]
+    assert "earlier stuff" in contents[0].parts[0].text
+    assert contents[3].parts[0].text == "hello"
+    print("✓ Structured, role-tagged contents")
+
+
+def test_chat_reused_across_turns():
+    """One live chat per session; each turn sends only the new message with a system instruction."""
+    async def run():
+        client, memory = FakeClient(), ChatMemory()
+        chats = PromptChats(client, "test-model", memory)
+        replies = [await _turn(chats, memory, "s", text) for text in ("one", "two", "three")]
+        return client, chats, replies
+
+    client, chats, replies = asyncio.run(run())
+    assert len(client.created) == 1
+    chat = client.created[0]
+    assert chat.sent == ["one", "two", "three"]
+    assert chat.config.system_instruction == "You are a test agent."
+    assert replies == ["reply 1", "reply 3", "reply 5"]
+    assert chats.stats() == {"live_chats": 1, "turns": 3, "rebuilds": 1}
+    print("✓ Live chat reused; per-turn payload is just the new message")
+
+
+def test_chat_rebuilt_when_out_of_sync():
+    """Turns answered elsewhere, or a new system prompt, rebuild the chat from memory."""
+    async def run():
+        client, memory = FakeClient(), ChatMemory()
+        chats = PromptChats(client, "test-model", memory)
+        await _turn(chats, memory, "s", "one")
+        # A turn handled by the generated agent
+        memory.append("s", "user", "two")
+        memory.append("s", "assistant", "agent reply")
+        await _turn(chats, memory, "s", "three")
+        await _turn(chats, memory, "s", "four", system="Updated agent.")
+        return client
+
+    client = asyncio.run(run())
+    assert len(client.created) == 3
+    assert [c.parts[0].text for c in client.created[1].history] == ["one", "reply 1", "two", "agent reply"]
+    assert client.created[2].config.system_instruction == "Updated agent."
+    print("✓ Chat rebuilt from memory when history diverges")
+
+
+def test_chat_rebuilt_over_budget():
+    """A chat whose history outgrows the memory budget restarts from the window."""
+    async def run():
+        client, memory = FakeClient(), ChatMemory(context_tokens=20)
+        chats = PromptChats(client, "test-model", memory)
+        for i in range(4):
+            await _turn(chats, memory, "s", f"message {i} " + "x" * 40)
+        return client
+
+    client = asyncio.run(run())
+    assert len(client.created) > 1
+    assert all(sum(estimate_tokens(c.parts[0].text) for c in chat.history) <= 20 for chat in client.created)
+    print("✓ Chat history kept within the memory budget")
+
+
+def test_stream_keeps_chat_in_sync():
+    """A completed stream counts as a turn; an abandoned one forces a rebuild."""
+    async def run():
+        client, memory = FakeClient(), ChatMemory()
+        chats = PromptChats(client, "test-model", memory)
+        chunks = [text async for text in chats.stream("s", "You are a test agent.", "one")]
+        memory.append("s", "user", "one")
+        memory.append("s", "assistant", "".join(chunks))
+        await _turn(chats, memory, "s", "two")
+
+        stream = chats.stream("s", "You are a test agent.", "three")
+        await stream.__anext__()
+        await stream.aclose()
+        await _turn(chats, memory, "s", "four")
+        return client, chunks
+
+    client, chunks = asyncio.run(run())
+    assert chunks == ["streamed", " ", "reply"]
+    assert len(client.created) == 2
+    assert client.created[0].sent == ["one", "two", "three"]
+    print("✓ Streaming keeps the live chat consistent")
+
+
+def test_concurrent_turns_serialized():
+    """Overlapping turns on one session each send their own message, one at a time."""
+    async def run():
+        client, memory = FakeClient(SlowChat), ChatMemory()
+        chats = PromptChats(client, "test-model", memory)
+        await asyncio.gather(_turn(chats, memory, "s", "one"), _turn(chats, memory, "s", "two"))
+        await _turn(chats, memory, "other", "three")
+        return client, chats
+
+    client, chats = asyncio.run(run())
+    assert sorted(message for chat in client.created for message in chat.sent) == ["one", "three", "two"]
+    assert SlowChat.most_in_flight == 1
+    assert len(chats._locks) == 0
+    print("✓ Concurrent turns serialized per session")
+
+
+if __name__ == "__main__":
+    print("Testing chat sessions...\n")
+    test_to_contents()
+    test_chat_reused_across_turns()
+    test_chat_rebuilt_when_out_of_sync()
+    test_chat_rebuilt_over_budget()
+    test_stream_keeps_chat_in_sync()
+    test_concurrent_turns_serialized()
+    print("\n✅ All chat session tests passed!")
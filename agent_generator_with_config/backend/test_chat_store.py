@@ -0,0 +1,153 @@
+"""
+Test Firestore-backed chat history against an in-memory stand-in.
+"""
+
+from datetime import datetime, timedelta
+
+from chat_store import FirestoreChatStore, encode_messages
+
+
+class FakeQuery:
+    def __init__(self, docs, filters=(), order=None, limit=None):
+        self.docs, self.filters, self.order, self._limit = docs, filters, order, limit
+
+    def where(self, field, op, value):
+        assert op == "<"
+        return FakeQuery(self.docs, self.filters + ((field, value),), self.order, self._limit)
+
+    def order_by(self, field, direction="ASCENDING"):
+        return FakeQuery(self.docs, self.filters, (field, direction), self._limit)
+
+    def limit(self, n):
+        return FakeQuery(self.docs, self.filters, self.order, n)
+
+    def stream(self):
+        rows = sorted(self.docs.items())
+        for field, value in self.filters:
+            rows = [(doc_id, row) for doc_id, row in rows if row[field] < value]
+        if self.order:
+            rows.sort(key=lambda item: item[1][self.order[0]], reverse=self.order[1] == "DESCENDING")
+        for doc_id, row in rows[:self._limit]:
+            yield FakeSnapshot(self.docs, doc_id, row)
+
+
+class FakeSnapshot:
+    def __init__(self, docs, doc_id, row):
+        self.id, self.exists, self._row = doc_id, row is not None, row
+        self.reference = FakeDocument(type("Parent", (), {"docs": docs})(), doc_id)
+
+    def to_dict(self):
+        return dict(self._row) if self._row is not None else None
+
+
+class FakeCollection(FakeQuery):
+    def __init__(self):
+        super().__init__({})
+        self.children = {}
+        self.streams = 0
+
+    def document(self, doc_id):
+        return FakeDocument(self, doc_id)
+
+    def stream(self):
+        self.streams += 1
+        return super().stream()
+
+
+class FakeDocument:
+    def __init__(self, parent, doc_id):
+        self.parent, self.doc_id = parent, doc_id
+
+    def collection(self, name):
+        return self.parent.children.setdefault((self.doc_id, name), FakeCollection())
+
+    def get(self):
+        return FakeSnapshot(self.parent.docs, self.doc_id, self.parent.docs.get(self.doc_id))
+
+    def set(self, data, merge=False):
+        self.parent.docs[self.doc_id] = dict(self.parent.docs.get(self.doc_id) or {}, **data) if merge else data
+
+
+class FakeBatch:
+    def __init__(self):
+        self.writes = []
+
+    def set(self, ref, data):
+        self.writes.append((ref, data))
+
+    def delete(self, ref):
+        self.writes.append((ref, None))
+
+    def commit(self):
+        for ref, data in self.writes:
+            if data is None:
+                ref.parent.docs.pop(ref.doc_id, None)
+            else:
+                ref.parent.docs[ref.doc_id] = data
+
+
+class FakeDB:
+    def __init__(self):
+        self.root = FakeCollection()
+
+    def collection(self, name):
+        return self.root
+
+    def batch(self):
+        return FakeBatch()
+
+
+def test_save_and_page():
+    """Pages are read newest-first by seq and returned oldest-first."""
+    store = FirestoreChatStore(FakeDB())
+    messages = [{"seq": i, "role": "user" if i % 2 else "assistant", "content": f"m{i}"} for i in range(1, 13)]
+    store.save("s", messages[:10])
+    store.save("s", messages[10:])
+    # Writes are idempotent: the same seq lands on the same document
+    store.save("s", messages[10:])
+
+    assert [m["seq"] for m in store.page("s", limit=4)] == [9, 10, 11, 12]
+    assert [m["seq"] for m in store.page("s", before=9, limit=4)] == [5, 6, 7, 8]
+    assert [m["seq"] for m in store.page("s", before=3, limit=4)] == [1, 2]
+    assert store.page("other") == []
+    print("✓ Cursor pages from Firestore")
+
+
+def test_legacy_messages_numbered():
+    """Messages stored without a seq are numbered by timestamp on first access, once."""
+    db = FakeDB()
+    messages = db.root.document("old").collection("messages")
+    start = datetime(2025, 1, 1, 12, 0)
+    legacy = [("user", "hi"), ("assistant", "hello"), ("user", "weather?"), ("assistant", "sunny")]
+    for index, (role, content) in enumerate(legacy):
+        # Auto ids don't follow conversation order
+        messages.docs[f"auto{(7 * index) % 5}x"] = {"role": role, "content": content,
+                                                   "timestamp": start + timedelta(seconds=index)}
+
+    store = FirestoreChatStore(db)
+    page = store.page("old")
+    assert [(m["seq"], m["content"]) for m in page] == [(1, "hi"), (2, "hello"), (3, "weather?"), (4, "sunny")]
+    assert sorted(messages.docs) == [f"{seq:010d}" for seq in range(1, 5)]
+    assert messages.docs["0000000001"]["timestamp"] == start
+
+    # New turns continue the numbering; the session isn't scanned again
+    store.save("old", [{"seq": 5, "role": "user", "content": "thanks"}], timestamp=start + timedelta(minutes=1))
+    assert [m["seq"] for m in store.page("old", limit=2)] == [4, 5]
+    assert messages.streams == 1
+    assert FirestoreChatStore(db).page("old", before=3) == page[:2] and messages.streams == 1
+    print("✓ Legacy messages migrated into seq order")
+
+
+def test_compact_encoding():
+    messages = [{"seq": 1, "role": "user", "content": "hi"}, {"seq": 2, "role": "assistant", "content": "hello"}]
+    assert encode_messages(messages, compact=True) == [[1, "u", "hi"], [2, "a", "hello"]]
+    assert encode_messages(messages)[1] == {"seq": 2, "role": "assistant", "content": "hello"}
+    print("✓ Compact message encoding")
+
+
+if __name__ == "__main__":
+    print("Testing chat store...\n")
+    test_save_and_page()
+    test_legacy_messages_numbered()
+    test_compact_encoding()
+    print("\n✅ All chat store tests passed!")
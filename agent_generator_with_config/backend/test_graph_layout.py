@@ -0,0 +1,106 @@
+"""
+Test the server-side architecture graph layout and its cache.
+"""
+
+import copy
+
+from graph_layout import LAYER_SPACING, NODE_SPACING, GraphCache, layered_layout
+
+CONFIG = {
+    "project_name": "demo",
+    "main_agent": "root",
+    "agents": {
+        "root": {"type": "llm_agent", "description": "Coordinator", "sub_agents": ["research", "writer"], "tools": ["calc"]},
+        "research": {"type": "llm_agent", "description": "Finds sources", "sub_agents": [], "tools": ["google_search"]},
+        "writer": {"type": "llm_agent", "description": "Writes", "sub_agents": [], "tools": ["calc", "ghost_tool"]},
+    },
+    "tools": {
+        "google_search": {"type": "builtin", "description": "Search"},
+        "calc": {"type": "custom_function", "description": "Maths"},
+    },
+}
+
+
+def _positions(graph):
+    return {node["id"]: (node["position"]["x"], node["position"]["y"]) for node in graph["nodes"]}
+
+
+def test_layers_and_spacing():
+    """Main agent on top, sub-agents below, tools under their users; no overlaps."""
+    graph, _ = GraphCache().graph("s", CONFIG)
+    positions = _positions(graph)
+    assert positions["root"][1] == 0
+    assert positions["research"][1] == positions["writer"][1] == LAYER_SPACING
+    assert positions["google_search"][1] > positions["research"][1]
+
+    for layer in graph["layers"]:
+        xs = sorted(positions[node][0] for node in layer)
+        assert all(b - a >= NODE_SPACING - 1e-6 for a, b in zip(xs, xs[1:]))
+    print(f"✓ {len(graph['nodes'])} nodes laid out in {len(graph['layers'])} layers")
+
+
+def test_missing_tools_flagged():
+    graph, _ = GraphCache().graph("s", CONFIG)
+    assert graph["missing"] == ["ghost_tool"]
+    edge = next(e for e in graph["edges"] if e["target"] == "ghost_tool")
+    assert edge["missing"] is True
+    node = next(n for n in graph["nodes"] if n["id"] == "ghost_tool")
+    assert node["type"] == "tool" and node["data"]["missing"] is True
+    assert all(e["target"] in _positions(graph) for e in graph["edges"])
+    print("✓ Edges to missing tools point at flagged placeholders")
+
+
+def test_crossings_removed():
+    """Barycenter ordering untangles a crossed two-layer graph."""
+    positions, layers = layered_layout(["a", "b", "x", "y"], [("a", "y"), ("b", "x")])
+    assert layers == [["a", "b"], ["y", "x"]]
+    assert positions["a"][0] < positions["b"][0] and positions["y"][0] < positions["x"][0]
+
+    positions, _ = layered_layout(["p", "q"], [("p", "q"), ("q", "p")])  # Cycles don't break layering
+    assert positions["p"][1] != positions["q"][1]
+    print("✓ Crossings minimized and cycles tolerated")
+
+
+def test_cache_reuse():
+    """Same config is a hit; description edits keep the layout; structure is shared across sessions."""
+    cache = GraphCache()
+    graph, etag = cache.graph("s", CONFIG)
+    again, same_etag = cache.graph("s", copy.deepcopy(CONFIG))
+    assert again is graph and same_etag == etag
+
+    edited = copy.deepcopy(CONFIG)
+    edited["agents"]["writer"]["description"] = "Writes reports"
+    updates = cache.node_updates
+    graph2, etag2 = cache.graph("s", edited)
+    assert etag2 != etag and cache.node_updates == updates + 1
+    assert _positions(graph2) == _positions(graph)
+
+    cache.graph("other", edited)
+    assert cache.stats()["layouts"] == 1 and cache.stats()["shared_layouts"] >= 1
+    print(f"✓ Graph cache: {cache.stats()}")
+
+
+def test_incremental_layout_keeps_order():
+    """Adding an agent re-runs the layout but keeps existing nodes' order."""
+    cache = GraphCache()
+    graph, _ = cache.graph("s", CONFIG)
+    grown = copy.deepcopy(CONFIG)
+    grown["agents"]["editor"] = {"type": "llm_agent", "description": "Edits", "sub_agents": [], "tools": []}
+    grown["agents"]["root"]["sub_agents"].append("editor")
+    grown_graph, _ = cache.graph("s", grown)
+
+    before = graph["layers"][1]
+    after = [node for node in grown_graph["layers"][1] if node in before]
+    assert after == before
+    assert "editor" in grown_graph["layers"][1]
+    print("✓ Structural edits keep the previous ordering")
+
+
+if __name__ == "__main__":
+    print("Testing graph layout...\n")
+    test_layers_and_spacing()
+    test_missing_tools_flagged()
+    test_crossings_removed()
+    test_cache_reuse()
+    test_incremental_layout_keeps_order()
+    print("\n✅ All graph layout tests passed!")
@@ -0,0 +1,54 @@
+"""
+Test the progress hub: fan-out, replay on reconnect and slow-consumer dropping.
+"""
+
+import asyncio
+
+from progress_hub import ProgressHub
+
+
+def test_fan_out_and_replay():
+    """Every subscriber gets every event; a reconnect replays only what it missed."""
+    async def run():
+        hub = ProgressHub()
+        first = hub.subscribe("session")
+        second = hub.subscribe("session")
+        for step in range(1, 4):
+            hub.publish("session", {"type": "progress", "step": step})
+
+        assert [(await first.get())["id"] for _ in range(3)] == [1, 2, 3]
+        assert [(await second.get())["id"] for _ in range(3)] == [1, 2, 3]
+
+        reconnect = hub.subscribe("session", last_event_id=2)
+        assert (await reconnect.get())["step"] == 3
+        assert hub.last_event_id("session") == 3
+        assert hub.subscriber_count("session") == 3
+
+    asyncio.run(run())
+    print("✓ Events fanned out and replayed")
+
+
+def test_slow_consumer_dropped():
+    """A full subscriber queue drops that subscriber without blocking the publisher."""
+    async def run():
+        hub = ProgressHub(queue_size=5)
+        slow = hub.subscribe("session")
+        fast = hub.subscribe("session")
+        for step in range(5):
+            hub.publish("session", {"step": step})
+            await fast.get()
+        hub.publish("session", {"step": 5})
+
+        assert slow.dropped
+        assert await slow.get() is None
+        assert (await fast.get())["step"] == 5
+        assert hub.subscriber_count("session") == 1
+        assert hub.dropped_subscribers == 1
+
+    asyncio.run(run())
+    print("✓ Slow consumer dropped")
+
+
+if __name__ == "__main__":
+    test_fan_out_and_replay()
+    test_slow_consumer_dropped()
@@ -0,0 +1,251 @@
+"""
+Test the session status endpoint (conditional requests, long-polling, field
+selection), the Server-Sent Events progress stream, the progress WebSocket
+and chat history bookkeeping.
+"""
+
+import asyncio
+import json
+import time
+
+import httpx
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+import api
+
+
+def _running_session(session_id: str):
+    api.sessions[session_id] = {
+        "id": session_id, "status": "running", "steps": {}, "current_step": 0,
+        "agent_config": {"project_name": "demo_project"}, "created_at": "2025-01-01T00:00:00",
+    }
+    api.progress_hub.close_session(session_id)
+
+
+def test_etag_and_since():
+    """Unchanged sessions answer 304 to a matching ETag or ?since; progress changes the ETag."""
+    client = TestClient(api.app)
+    _running_session("etag_session")
+    url = "/api/sessions/etag_session"
+
+    first = client.get(url)
+    assert first.status_code == 200 and first.json()["version"] == 0
+    etag = first.headers["etag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(url, params={"since": 0}).status_code == 304
+
+    asyncio.run(api.websocket_progress_callback("etag_session", 1, "analyzing", {}))
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert changed.json()["version"] == 1 and changed.json()["current_step"] == 1
+    assert client.get(url, params={"since": 0}).status_code == 200
+    assert client.get(url, params={"since": 1}).status_code == 304
+    assert client.get("/api/sessions/unknown_session").status_code == 404
+    print("✓ ETag and since answer 304 until the session changes")
+
+
+def test_fields():
+    """?fields returns only those fields, with its own ETag; unknown fields are a 400."""
+    client = TestClient(api.app)
+    _running_session("fields_session")
+    url = "/api/sessions/fields_session"
+
+    response = client.get(url, params={"fields": "status, current_step"})
+    assert response.status_code == 200
+    assert response.json() == {"status": "running", "current_step": 0}
+    assert response.headers["etag"] != client.get(url).headers["etag"]
+    assert client.get(url, params={"fields": "status"}, headers={"If-None-Match": response.headers["etag"]}).status_code == 200
+
+    rejected = client.get(url, params={"fields": "status,secret,other"})
+    assert rejected.status_code == 400 and "secret, other" in rejected.json()["detail"]
+    print("✓ Field selection and unknown-field rejection")
+
+
+def test_long_poll():
+    """?wait holds an unchanged session until the next event, or 304 after the timeout."""
+    async def run():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            _running_session("wait_session")
+            url = "/api/sessions/wait_session"
+
+            started = time.monotonic()
+            timed_out = await client.get(url, params={"since": 0, "wait": 0.2})
+            assert timed_out.status_code == 304 and time.monotonic() - started >= 0.2
+
+            async def progress_later():
+                await asyncio.sleep(0.1)
+                await api.websocket_progress_callback("wait_session", 2, "designing", {})
+
+            started = time.monotonic()
+            publisher = asyncio.create_task(progress_later())
+            woken = await client.get(url, params={"since": 0, "wait": 30, "fields": "current_step,version"})
+            await publisher
+            assert woken.status_code == 200 and woken.json() == {"current_step": 2, "version": 1}
+            assert time.monotonic() - started < 5
+            assert api.progress_hub.subscriber_count("wait_session") == 0
+
+            # Finished sessions never hold the request
+            api.sessions["wait_session"]["status"] = "complete"
+            started = time.monotonic()
+            assert (await client.get(url, params={"since": 1, "wait": 30})).status_code == 304
+            assert time.monotonic() - started < 5
+
+    asyncio.run(run())
+    print("✓ Long-poll wakes on progress and times out with 304")
+
+
+def _sse_events(body: str):
+    """(id, event type, data) for each frame of an SSE body."""
+    frames = []
+    for block in body.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line and not line.startswith(":"))
+        if "id" in fields:
+            frames.append((int(fields["id"]), fields["event"], json.loads(fields["data"])))
+    return frames
+
+
+def test_event_stream_replay_and_resume():
+    """The stream replays the log up to the terminal event; Last-Event-ID resumes after it."""
+    client = TestClient(api.app)
+    _running_session("sse_session")
+
+    async def publish():
+        await api.websocket_progress_callback("sse_session", 1, "analyzing", {})
+        await api.websocket_progress_callback("sse_session", 1, "complete", {})
+        await api.websocket_progress_callback("sse_session", 2, "designing", {})
+        api.progress_hub.publish("sse_session", {"type": "status", "status": "complete", "terminal": True})
+
+    asyncio.run(publish())
+    url = "/api/sessions/sse_session/events"
+
+    response = client.get(url)
+    assert response.status_code == 200 and response.headers["content-type"].startswith("text/event-stream")
+    assert response.text.startswith("retry: 3000")
+    events = _sse_events(response.text)
+    assert [(event_id, kind) for event_id, kind, _ in events] == [
+        (1, "progress"), (2, "progress"), (3, "progress"), (4, "status")
+    ]
+    assert events[2][2]["step"] == 2 and events[3][2]["terminal"]
+
+    resumed = _sse_events(client.get(url, headers={"Last-Event-ID": "2"}).text)
+    assert [event_id for event_id, _, _ in resumed] == [3, 4]
+    assert [event_id for event_id, _, _ in _sse_events(client.get(url, params={"last_event_id": 3}).text)] == [4]
+    assert api.progress_hub.subscriber_count("sse_session") == 0
+    assert client.get("/api/sessions/unknown_session/events").status_code == 404
+    print("✓ SSE replays from the start and resumes from Last-Event-ID")
+
+
+def test_websocket_replay_and_unknown_session():
+    """The socket replays missed events; unknown ids are closed with 4404 and never reach the hub."""
+    client = TestClient(api.app)
+    _running_session("ws_session")
+    asyncio.run(api.websocket_progress_callback("ws_session", 1, "analyzing", {}))
+    asyncio.run(api.websocket_progress_callback("ws_session", 2, "designing", {}))
+
+    with client.websocket_connect("/ws/agents/ws_session/progress?last_event_id=1") as websocket:
+        event = websocket.receive_json()
+        assert event["id"] == 2 and event["step"] == 2
+        # Let the handler see the disconnect and unsubscribe before the client tears down its loop
+        websocket.close()
+        deadline = time.monotonic() + 5
+        while api.progress_hub.subscriber_count("ws_session") and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert api.progress_hub.subscriber_count("ws_session") == 0
+
+    channels = len(api.progress_hub._channels)
+    try:
+        with client.websocket_connect("/ws/agents/unknown_ws_session/progress") as websocket:
+            websocket.receive_json()
+        assert False, "expected the socket to be closed"
+    except WebSocketDisconnect as closed:
+        assert closed.code == 4404
+    assert len(api.progress_hub._channels) == channels
+    assert "unknown_ws_session" not in api.progress_hub._channels
+    print("✓ WebSocket replays events and rejects unknown sessions")
+
+
+def test_finished_session_streams_terminal_event():
+    """Once a finished session's log is gone (or fully seen), streams end with its outcome at once."""
+    client = TestClient(api.app)
+    _running_session("done_session")
+    asyncio.run(api.websocket_progress_callback("done_session", 1, "analyzing", {}))
+    api.sessions["done_session"].update(status="error", error="planning failed")
+    api.progress_hub.publish("done_session", {"type": "status", "status": "error", "terminal": True})
+    url = "/api/sessions/done_session/events"
+
+    # Reconnecting after the terminal event gets it again instead of keep-alives
+    assert [(event_id, kind) for event_id, kind, _ in _sse_events(client.get(url, headers={"Last-Event-ID": "2"}).text)] == [(2, "status")]
+
+    # The hub evicted the session's channel
+    del api.progress_hub._channels["done_session"]
+    events = _sse_events(client.get(url).text)
+    assert len(events) == 1
+    event_id, kind, data = events[0]
+    assert kind == "status" and data["terminal"] and data["status"] == "error" and data["error"] == "planning failed"
+    assert [event_id for event_id, _, _ in _sse_events(client.get(url, params={"last_event_id": 7}).text)] == [7]
+    assert "done_session" not in api.progress_hub._channels
+
+    with client.websocket_connect("/ws/agents/done_session/progress") as websocket:
+        assert websocket.receive_json()["status"] == "error"
+        try:
+            websocket.receive_json()
+            assert False, "expected the socket to be closed"
+        except WebSocketDisconnect:
+            pass
+    assert "done_session" not in api.progress_hub._channels
+    print("✓ Finished sessions end the stream with their outcome")
+
+
+class FakePromptChats:
+    def __init__(self):
+        self.fail = True
+
+    async def send(self, session_id, system_prompt, message):
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        return f"echo {message}"
+
+    def stats(self):
+        return {}
+
+
+def test_chat_history_only_completed_turns():
+    """A failed turn leaves no history; unknown sessions 404 without creating chat memory."""
+    client = TestClient(api.app)
+    api.sessions["chat_session"] = {
+        "id": "chat_session", "status": "complete", "steps": {}, "current_step": 6,
+        "agent_config": {"project_name": "demo_project"}, "created_at": "2025-01-01T00:00:00",
+    }
+    # An agent that can't be loaded, so turns take the prompt fallback
+    api.artifact_store.put("chat_session", {"agent.py": "raise RuntimeError('broken')\n"})
+    original, api._prompt_chats = api._prompt_chats, FakePromptChats()
+    try:
+        assert client.post("/api/chat/chat_session", json={"message": "hi"}).status_code == 500
+        assert api.chat_memory.count("chat_session") == 0
+        assert client.get("/api/chat/chat_session/history").json()["messages"] == []
+
+        api._prompt_chats.fail = False
+        response = client.post("/api/chat/chat_session", json={"message": "hi"})
+        assert response.status_code == 200 and response.json()["response"] == "echo hi"
+        messages = client.get("/api/chat/chat_session/history").json()["messages"]
+        assert [(m["seq"], m["role"], m["content"]) for m in messages] == [(1, "user", "hi"), (2, "assistant", "echo hi")]
+    finally:
+        api._prompt_chats = original
+
+    assert client.get("/api/chat/unknown_chat_session/history").status_code == 404
+    assert not api.chat_memory.has("unknown_chat_session")
+    print("✓ Chat history records completed turns only")
+
+
+if __name__ == "__main__":
+    print("Testing session status endpoints...\n")
+    test_etag_and_since()
+    test_fields()
+    test_long_poll()
+    test_event_stream_replay_and_resume()
+    test_websocket_replay_and_unknown_session()
+    test_finished_session_streams_terminal_event()
+    test_chat_history_only_completed_turns()
+    print("\n✅ All session endpoint tests passed!")
@@ -0,0 +1,61 @@
+"""
+Test deferred startup: light imports, lifespan initialization, readiness probe.
+"""
+
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+import api
+from bench_import_time import parse_importtime
+
+
+def test_import_skips_heavy_modules():
+    """Importing the API loads neither ADK, the genai SDK, Firebase nor the pipeline's settings."""
+    code = (
+        "import sys, api\n"
+        "heavy = [m for m in ('google.adk', 'google.genai', 'firebase_admin', 'meta_agent.orchestrator', "
+        "'meta_agent.config', 'meta_agent.routing', 'meta_agent.prompt_budget', 'pydantic_settings') "
+        "if m in sys.modules]\n"
+        "print(','.join(heavy))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).parent,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip().splitlines()[-1:] in ([], [""]), result.stdout
+    print("✓ Heavy modules are not imported with the API")
+
+
+def test_ready_after_lifespan():
+    """/ is live immediately; /ready reports ready once startup has finished."""
+    with TestClient(api.app) as client:
+        assert client.get("/").status_code == 200
+        for _ in range(300):
+            response = client.get("/ready")
+            if response.status_code != 503 or response.json()["status"] != "starting":
+                break
+            time.sleep(0.05)
+        assert response.status_code == 200, response.json()
+        assert response.json()["status"] == "ready"
+        assert "meta_agent.orchestrator" in sys.modules
+    print("✓ Readiness probe reports ready after startup")
+
+
+def test_parse_importtime():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   json.decoder\n"
+        "import time:       300 |        420 | json\n"
+    )
+    assert parse_importtime(stderr) == [("json.decoder", 120, 120), ("json", 300, 420)]
+    print("✓ -X importtime output parsed")
+
+
+if __name__ == "__main__":
+    print("Testing startup...\n")
+    test_import_skips_heavy_modules()
+    test_ready_after_lifespan()
+    test_parse_importtime()
+    print("\n✅ All startup tests passed!")
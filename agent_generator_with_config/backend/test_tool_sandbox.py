@@ -0,0 +1,233 @@
+"""
+Test sandboxed execution of generated tool functions.
+"""
+
+import ast
+import asyncio
+import inspect
+import os
+import tempfile
+
+from agent_runtime import AgentRuntime
+from tool_sandbox import (
+    ToolSandbox, ToolSandboxError, ToolSandboxPool, find_tool_functions, proxy_source, worker_source
+)
+
+AGENT_SOURCE = '''"""
+demo: generated
+"""
+
+from google.adk.agents.llm_agent import LlmAgent
+from google.adk.tools.function_tool import FunctionTool
+from google.adk.tools.tool_context import ToolContext
+from typing import List, Dict, Any, Optional
+import math
+import os
+import tool_extras as tx
+
+SCALE = 2
+
+
+# Tool: Hypotenuse of a right triangle
+def hypotenuse(a: float, b: float, tool_context: ToolContext) -> float:
+    """Length of the hypotenuse.
+
+    Args:
+        a: First side
+        b: Second side
+    """
+    return math.hypot(a, b) * SCALE
+
+
+# Tool: Process id of whoever runs the tool
+def whoami(tag: str, table: tx.Table = None) -> Dict[str, Any]:
+    """Report the process running this tool."""
+    return {"pid": os.getpid(), "tag": tag}
+
+
+# Tool: Misbehaving tool
+def misbehave(mode: str) -> str:
+    """Raise, spin or allocate."""
+    if mode == "raise":
+        raise ValueError("bad input")
+    if mode == "spin":
+        while True:
+            pass
+    if mode == "allocate":
+        return str(len(bytearray(2 * 1024 ** 3)))
+    return "fine"
+
+
+main_agent = LlmAgent(
+    name="main_agent",
+    model="gemini-2.5-flash",
+    instruction="Help.",
+    tools=[FunctionTool(hypotenuse), FunctionTool(whoami), FunctionTool(func=misbehave)]
+)
+
+root_agent = main_agent
+'''
+
+
+def test_find_tool_functions():
+    assert find_tool_functions(AGENT_SOURCE) == ["hypotenuse", "whoami", "misbehave"]
+    print("✓ Tool functions found from FunctionTool(...) calls")
+
+
+def test_proxy_source():
+    """Tools become async proxies with the same signature; their-only imports go."""
+    source = proxy_source(AGENT_SOURCE, find_tool_functions(AGENT_SOURCE))
+    tree = ast.parse(source)
+    stubs = {node.name: node for node in tree.body if isinstance(node, ast.AsyncFunctionDef)}
+    assert set(stubs) == {"hypotenuse", "whoami", "misbehave"}
+    assert ast.get_docstring(stubs["hypotenuse"]).startswith("Length of the hypotenuse.")
+    assert [arg.arg for arg in stubs["hypotenuse"].args.args] == ["a", "b", "tool_context"]
+
+    assert "import math" not in source
+    assert "tool_extras" not in source
+    assert "from typing import Dict, Any" in source
+    # tx.Table can't be resolved without the tool's import
+    assert ast.unparse(stubs["whoami"].args.args[1].annotation) == "Any"
+    assert ast.unparse(stubs["whoami"].returns) == "Dict[str, Any]"
+    print("✓ Proxy source keeps signatures and drops tool-only imports")
+
+
+def test_worker_source():
+    """The worker gets the tools and their imports, not the agents."""
+    source = worker_source(AGENT_SOURCE)
+    assert "LlmAgent" not in source
+    assert "root_agent" not in source
+    assert "google.adk" not in source
+    assert "import math" in source and "SCALE = 2" in source
+    assert source.splitlines()[3] == "from __future__ import annotations"
+    compile(source, "agent_tools.py", "exec")
+    print("✓ Worker source strips agent definitions")
+
+
+SIDE_EFFECT_SOURCE = '''
+from google.adk.agents.llm_agent import LlmAgent
+from google.adk.tools.function_tool import FunctionTool
+import os
+
+MARK_PATH = {path!r}
+MARK = open(MARK_PATH, "a").write(f"{{os.getpid()}}\\n")
+MODEL: str = "gemini-2.5-flash"
+
+
+def _started():
+    return os.getpid()
+
+
+class Helper:
+    pid = os.getpid()
+
+
+def worker_pid(started: int = _started()) -> dict:
+    """Pid of the worker and the pid its default was computed in."""
+    return {{"pid": os.getpid(), "started": started}}
+
+
+root_agent = LlmAgent(name="main", model=MODEL, instruction="Help.", tools=[FunctionTool(worker_pid)])
+'''
+
+
+def test_proxy_runs_no_generated_code():
+    """Top-level code, helpers and non-literal defaults only run in the worker, never in this process."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "mark")
+        source = SIDE_EFFECT_SOURCE.format(path=path)
+        proxy = proxy_source(source, find_tool_functions(source))
+        assert "open(" not in proxy and "_started" not in proxy and "Helper" not in proxy
+        assert "MODEL = 'gemini-2.5-flash'" in proxy
+
+        async def run():
+            runtime = AgentRuntime(tool_sandbox=ToolSandboxPool(timeout=5))
+            warm = await runtime.get("session", "hash-side-effect", lambda: source)
+            result = await warm.module.worker_pid()
+            await runtime.tool_sandbox.shutdown()
+            return result
+
+        result = asyncio.run(run())
+        with open(path) as f:
+            marked = {int(line) for line in f.read().split()}
+    assert os.getpid() not in marked and result["pid"] in marked
+    assert result["started"] == result["pid"]  # The real default, computed in the worker
+    print("✓ Generated top-level code never runs in the API process")
+
+
+def test_proxy_rejects_unsafe_wiring():
+    """Agent definitions that would call into generated or arbitrary code are refused."""
+    source = '''
+from google.adk.agents.llm_agent import LlmAgent
+import os
+
+def pick_model():
+    return "gemini-2.5-flash"
+
+root_agent = LlmAgent(name="main", model=pick_model(), instruction=os.environ["X"])
+'''
+    try:
+        proxy_source(source, [])
+    except ToolSandboxError as e:
+        assert "os, pick_model" in str(e)
+    else:
+        raise AssertionError("unsafe agent definition accepted")
+    print("✓ Agent definitions calling other code are rejected")
+
+
+def test_sandbox_calls_and_limits():
+    """Results come back from the worker; errors, timeouts and memory blowups are contained."""
+    async def run():
+        sandbox = ToolSandbox(worker_source(AGENT_SOURCE), timeout=2, cpu_seconds=5, memory_mb=512)
+        await sandbox.warm_up()
+        try:
+            results = {
+                "hypotenuse": await sandbox.call("hypotenuse", [], {"a": 3, "b": 4}),
+                "whoami": await sandbox.call("whoami", [], {"tag": "x"}),
+                "raise": await sandbox.call("misbehave", [], {"mode": "raise"}),
+                "spin": await sandbox.call("misbehave", [], {"mode": "spin"}),
+                "allocate": await sandbox.call("misbehave", [], {"mode": "allocate"}),
+                "after": await sandbox.call("misbehave", [], {"mode": "ok"}),
+            }
+        finally:
+            await sandbox.shutdown()
+        return sandbox, results
+
+    sandbox, results = asyncio.run(run())
+    assert results["hypotenuse"] == 10.0
+    assert results["whoami"]["pid"] != os.getpid()
+    assert results["raise"] == {"error": "ValueError: bad input"}
+    assert "did not finish" in results["spin"]["error"]
+    assert "error" in results["allocate"]
+    assert results["after"] == "fine"
+    assert sandbox.counts["timeouts"] == 1
+    print("✓ Sandbox contains errors, timeouts and memory limits")
+
+
+def test_runtime_runs_tools_in_sandbox():
+    """The warm agent's tools are proxies that execute in a worker process."""
+    async def run():
+        runtime = AgentRuntime(tool_sandbox=ToolSandboxPool(timeout=5))
+        warm = await runtime.get("session", "hash-1", lambda: AGENT_SOURCE)
+        assert inspect.iscoroutinefunction(warm.module.whoami)
+        assert warm.module.root_agent.name == "main_agent"
+        result = await warm.module.whoami(tag="t")
+        await runtime.tool_sandbox.shutdown()
+        return warm, result
+
+    warm, result = asyncio.run(run())
+    assert warm.sandboxed_tools == ("hypotenuse", "whoami", "misbehave")
+    assert result["tag"] == "t" and result["pid"] != os.getpid()
+    print("✓ Runtime routes tool calls through the sandbox")
+
+
+if __name__ == "__main__":
+    print("Testing tool sandbox...\n")
+    test_find_tool_functions()
+    test_proxy_source()
+    test_worker_source()
+    test_proxy_runs_no_generated_code()
+    test_proxy_rejects_unsafe_wiring()
+    test_sandbox_calls_and_limits()
+    test_runtime_runs_tools_in_sandbox()
+    print("\n✅ All tool sandbox tests passed!")
@@ -0,0 +1,591 @@
+"""
+Sandboxed execution of generated tool functions.
+
+LLM-written tool code never runs in the API process. The agent module loaded
+for chat is cut down to its imports, literal constants and agent definitions,
+with async proxy stubs in place of its FunctionTool functions (same names,
+signatures and docstrings, so ADK builds the same schemas); each call is
+forwarded to a warm worker subprocess that has the real functions
+loaded under CPU, memory and wall-clock limits. Workers are kept per project
+and reused across calls; one that crashes, times out or uses up its call
+budget is replaced.
+"""
+
+import ast
+import asyncio
+import builtins
+import json
+import os
+import sys
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set
+
+TOOL_WORKER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tool_worker.py")
+SANDBOX_GLOBAL = "__tool_sandbox__"
+CONTEXT_PARAM = "tool_context"
+
+
+class ToolSandboxError(Exception):
+    """The tool worker could not be started or could not load the tools."""
+
+
+# --- Source transforms -------------------------------------------------------
+
+def find_tool_functions(source: str) -> List[str]:
+    """Top-level functions in agent.py that are wrapped in FunctionTool(...)."""
+    tree = ast.parse(source)
+    defined = {
+        node.name for node in tree.body
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+    }
+    names = []
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "FunctionTool"):
+            continue
+        targets = list(node.args[:1]) + [kw.value for kw in node.keywords if kw.arg == "func"]
+        for target in targets:
+            if isinstance(target, ast.Name) and target.id in defined and target.id not in names:
+                names.append(target.id)
+    return names
+
+
+def _bound_names(node: ast.stmt) -> Set[str]:
+    """Module-level names a statement binds."""
+    if isinstance(node, (ast.Import, ast.ImportFrom)):
+        return {(alias.asname or alias.name).split(".")[0] for alias in node.names}
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return {node.name}
+    names = set()
+    for child in ast.walk(node):
+        if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Store):
+            names.add(child.id)
+    return names
+
+
+def _referenced_names(nodes: List[ast.AST], skip_annotations: bool = False) -> Set[str]:
+    names = set()
+
+    def visit(node: ast.AST):
+        if skip_annotations and isinstance(node, ast.arg):
+            return
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load):
+            names.add(node.id)
+        for field, value in ast.iter_fields(node):
+            if skip_annotations and field in ("returns", "annotation"):
+                continue
+            for child in value if isinstance(value, list) else [value]:
+                if isinstance(child, ast.AST):
+                    visit(child)
+
+    for node in nodes:
+        visit(node)
+    return names
+
+
+def _prune_imports(body: List[ast.stmt], keep: Set[str]) -> List[ast.stmt]:
+    """Drop top-level imports none of whose names are in keep."""
+    pruned = []
+    for node in body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)) and getattr(node, "module", None) != "__future__" \
+                and not any(alias.name == "*" for alias in node.names):
+            aliases = [alias for alias in node.names if (alias.asname or alias.name).split(".")[0] in keep]
+            if not aliases:
+                continue
+            node.names = aliases
+        pruned.append(node)
+    return pruned
+
+
+def _importable_here(node: ast.stmt) -> bool:
+    """Standard library or google.* imports, which the API process already has."""
+    modules = [node.module or ""] if isinstance(node, ast.ImportFrom) else [alias.name for alias in node.names]
+    return all(
+        module.split(".")[0] in sys.stdlib_module_names or module.startswith("google.")
+        for module in modules
+    ) and not (isinstance(node, ast.ImportFrom) and node.level)
+
+
+def _docstring(node: ast.AST) -> List[ast.stmt]:
+    body = getattr(node, "body", [])
+    if body and isinstance(body[0], ast.Expr) and isinstance(getattr(body[0], "value", None), ast.Constant) \
+            and isinstance(body[0].value.value, str):
+        return [body[0]]
+    return []
+
+
+def _is_literal(node: Optional[ast.expr]) -> bool:
+    try:
+        ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return False
+    return True
+
+
+def _as_assignment(node: ast.stmt) -> Optional[ast.Assign]:
+    """node as a plain assignment (an annotation would be evaluated, so it is dropped), or None."""
+    if isinstance(node, ast.Assign):
+        return node
+    if isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name) and node.value is not None:
+        return ast.Assign(targets=[node.target], value=node.value, lineno=node.lineno)
+    return None
+
+
+def _literal_assignment(node: ast.stmt) -> Optional[ast.Assign]:
+    """node as NAME = <literal>, or None if it is anything else."""
+    assignment = _as_assignment(node)
+    if assignment is None or not all(isinstance(target, ast.Name) for target in assignment.targets):
+        return None
+    return assignment if _is_literal(assignment.value) else None
+
+
+def _adk_names(tree: ast.Module) -> Set[str]:
+    names = set()
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and (node.module or "").startswith("google.adk"):
+            names |= _bound_names(node)
+    return names
+
+
+def _agent_wiring(body: List[ast.stmt], adk_names: Set[str]) -> List[ast.stmt]:
+    """Top-level statements that build the agents: ones using ADK names, directly or via another such statement."""
+    wired = adk_names | {"root_agent"}
+    wiring = []
+    for node in body:
+        lazy = isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Import, ast.ImportFrom))
+        if not lazy and _referenced_names([node], skip_annotations=True) & wired:
+            wired |= _bound_names(node)
+            wiring.append(node)
+    return wiring
+
+
+def _safe_expression(node: ast.expr, allowed: Set[str]) -> bool:
+    """Names, attribute lookups and subscripts of allowed names only - nothing that calls out."""
+    for child in ast.walk(node):
+        if isinstance(child, ast.Name):
+            if child.id not in allowed:
+                return False
+        elif isinstance(child, ast.Attribute):
+            if child.attr.startswith("__"):
+                return False
+        elif isinstance(child, ast.BinOp):
+            if not isinstance(child.op, ast.BitOr):
+                return False
+        elif not isinstance(child, (ast.Subscript, ast.Tuple, ast.List, ast.Constant, ast.Load, ast.BitOr)):
+            return False
+    return True
+
+
+def _proxy_stub(func: ast.FunctionDef) -> ast.AsyncFunctionDef:
+    """
+    async def with func's signature and docstring whose body forwards the call to the sandbox.
+
+    Defaults that aren't literals would run tool code here, so they become None
+    and the stub leaves such an argument out while it is None, letting the
+    worker apply the real default.
+    """
+    arguments = func.args
+    positional = arguments.posonlyargs + arguments.args
+    deferred = []
+    for i, default in enumerate(arguments.defaults):
+        if not _is_literal(default):
+            arguments.defaults[i] = ast.Constant(None)
+            deferred.append(positional[len(positional) - len(arguments.defaults) + i].arg)
+    for i, default in enumerate(arguments.kw_defaults):
+        if default is not None and not _is_literal(default):
+            arguments.kw_defaults[i] = ast.Constant(None)
+            deferred.append(arguments.kwonlyargs[i].arg)
+
+    keys, values = [], []
+    for arg in positional + arguments.kwonlyargs:
+        if arg.arg != CONTEXT_PARAM:
+            keys.append(ast.Constant(arg.arg))
+            values.append(ast.Name(arg.arg, ast.Load()))
+    if arguments.kwarg:
+        keys.append(None)
+        values.append(ast.Name(arguments.kwarg.arg, ast.Load()))
+    kwargs = ast.Dict(keys, values)
+    if deferred:
+        kwargs = ast.parse(
+            f"{{_key: _value for _key, _value in {ast.unparse(kwargs)}.items() "
+            f"if _value is not None or _key not in {tuple(deferred)!r}}}",
+            mode="eval"
+        ).body
+    args = (
+        ast.List([ast.Starred(ast.Name(arguments.vararg.arg, ast.Load()), ast.Load())], ast.Load())
+        if arguments.vararg else ast.List([], ast.Load())
+    )
+    call = ast.Await(ast.Call(
+        func=ast.Attribute(ast.Name(SANDBOX_GLOBAL, ast.Load()), "call", ast.Load()),
+        args=[ast.Constant(func.name), args, kwargs],
+        keywords=[]
+    ))
+    return ast.AsyncFunctionDef(
+        name=func.name,
+        args=arguments,
+        body=_docstring(func) + [ast.Return(call)],
+        decorator_list=[],
+        returns=func.returns,
+        type_comment=None,
+        **({"type_params": []} if sys.version_info >= (3, 12) else {})
+    )
+
+
+def _resolve_annotations(stub: ast.AsyncFunctionDef, known: Set[str]):
+    """Replace annotations that aren't plain references to names the module defines with Any."""
+    def resolved(annotation: Optional[ast.expr]) -> Optional[ast.expr]:
+        if annotation is None:
+            return None
+        if isinstance(annotation, ast.Constant) or not _safe_expression(annotation, known):
+            return ast.Name("Any", ast.Load())
+        return annotation
+
+    arguments = stub.args
+    for arg in arguments.posonlyargs + arguments.args + arguments.kwonlyargs + [arguments.vararg, arguments.kwarg]:
+        if arg is not None:
+            arg.annotation = resolved(arg.annotation)
+    stub.returns = resolved(stub.returns)
+
+
+def proxy_source(source: str, tool_names: List[str]) -> str:
+    """
+    The agent module the API process loads: imports, a sandbox proxy per tool
+    function, literal constants and the agent wiring - nothing else.
+
+    Helper functions, classes and any other top-level code only go to the
+    worker (see worker_source), so generated code never runs here. Only
+    standard library and google.* imports are kept; annotations that need
+    anything else become Any.
+
+    Raises:
+        ToolSandboxError: If the agent wiring uses anything besides ADK/genai
+            names, the tools, literal constants and other agents
+    """
+    tree = ast.parse(source)
+    docstring = _docstring(tree)
+    imports = [
+        node for node in tree.body
+        if isinstance(node, (ast.Import, ast.ImportFrom)) and _importable_here(node)
+        and (not any(alias.name == "*" for alias in node.names) or (getattr(node, "module", "") or "").startswith("google."))
+    ]
+    stubs = {
+        node.name: _proxy_stub(node) for node in tree.body
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name in tool_names
+    }
+    constants = {id(node): _literal_assignment(node) for node in tree.body}
+    wiring = _agent_wiring(tree.body, _adk_names(tree))
+
+    allowed = set(stubs)
+    for node in imports:
+        if isinstance(node, ast.ImportFrom) and (node.module or "").startswith("google.") or \
+                isinstance(node, ast.Import) and all(alias.name.startswith("google.") for alias in node.names):
+            allowed |= _bound_names(node)
+    for node in tree.body:
+        if constants[id(node)] is not None:
+            allowed |= _bound_names(node)
+    checked = {}
+    for node in wiring:
+        statement = _as_assignment(node)
+        if statement is None:
+            raise ToolSandboxError(f"Unsupported agent definition at line {node.lineno}")
+        local = _bound_names(statement) | {arg.arg for arg in ast.walk(statement) if isinstance(arg, ast.arg)}
+        unknown = _referenced_names([statement]) - allowed - local
+        dunder = any(isinstance(child, ast.Attribute) and child.attr.startswith("__") for child in ast.walk(statement))
+        if unknown or dunder:
+            raise ToolSandboxError(
+                f"Agent definition at line {node.lineno} uses {', '.join(sorted(unknown)) or 'a dunder attribute'}, "
+                "which can't be evaluated outside the tool sandbox"
+            )
+        allowed |= _bound_names(statement)
+        checked[id(node)] = statement
+
+    body = []
+    for node in tree.body:
+        if node in docstring or node in imports:
+            body.append(node)
+        elif id(node) in checked:
+            body.append(checked[id(node)])
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name in stubs:
+            body.append(stubs.pop(node.name))
+        elif constants[id(node)] is not None:
+            body.append(constants[id(node)])
+
+    stub_nodes = [node for node in body if isinstance(node, ast.AsyncFunctionDef)]
+    keep = _referenced_names([node for node in body if not isinstance(node, (ast.Import, ast.ImportFrom))],
+                             skip_annotations=True)
+    # Annotations keep their imports (typing, ToolContext, ...) - these are all safe to load here
+    keep |= _referenced_names(stub_nodes)
+    body = _prune_imports(body, keep)
+
+    known = set(dir(builtins)) | {SANDBOX_GLOBAL}
+    for node in body:
+        known |= _bound_names(node)
+    if "Any" not in known:
+        body.insert(len(docstring), ast.ImportFrom("typing", [ast.alias("Any")], 0))
+        known.add("Any")
+    for stub in stub_nodes:
+        _resolve_annotations(stub, known)
+
+    tree.body = body
+    return ast.unparse(ast.fix_missing_locations(tree))
+
+
+def worker_source(source: str) -> str:
+    """
+    The part of agent.py the tool worker needs: everything except the agent
+    definitions (see _agent_wiring) and the imports only they used.
+    """
+    tree = ast.parse(source)
+    wiring = _agent_wiring(tree.body, _adk_names(tree))
+    body = [node for node in tree.body if not any(node is agent for agent in wiring)]
+    others = [node for node in body if not isinstance(node, (ast.Import, ast.ImportFrom))]
+    # Annotations aren't evaluated in the worker, so e.g. ToolContext needn't import the ADK
+    body = _prune_imports(body, _referenced_names(others, skip_annotations=True))
+    docstring = _docstring(tree)
+    body = [node for node in body if node not in docstring and not (isinstance(node, ast.ImportFrom) and node.module == "__future__")]
+    future = ast.ImportFrom("__future__", [ast.alias("annotations")], 0)
+    tree.body = docstring + [future] + body
+    return ast.unparse(ast.fix_missing_locations(tree))
+
+
+# --- Worker pool -------------------------------------------------------------
+
+class _Worker:
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+        self.calls = 0
+
+
+class ToolSandbox:
+    """Warm tool workers for one project."""
+
+    def __init__(
+        self,
+        source: str,
+        size: int = 1,
+        timeout: float = 30.0,
+        cpu_seconds: int = 10,
+        memory_mb: int = 1024,
+        max_calls: int = 100,
+        startup_timeout: float = 30.0
+    ):
+        """
+        Args:
+            source: Tools module source (see worker_source)
+            size: Max concurrent workers
+            timeout: Wall-clock seconds per call before the worker is killed
+            cpu_seconds: CPU seconds per call (0 for no limit)
+            memory_mb: Address-space limit per worker (0 for no limit)
+            max_calls: Calls a worker serves before it is recycled
+            startup_timeout: Seconds for a worker to load the tools
+        """
+        self.source = source
+        self.size = size
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.max_calls = max_calls
+        self.startup_timeout = startup_timeout
+        self._idle: List[_Worker] = []
+        self._spawned = 0
+        self._loop = None
+        self._available = None
+        self.counts = {"calls": 0, "errors": 0, "timeouts": 0, "crashes": 0, "spawns": 0}
+
+    def _bind_loop(self):
+        """Workers are tied to an event loop - start fresh if the loop changed."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self.close()
+            self._loop = loop
+            self._available = asyncio.Condition()
+
+    async def _spawn(self) -> _Worker:
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-u", TOOL_WORKER_PATH,
+            str(self.cpu_seconds), str(self.memory_mb), str(self.max_calls),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        self.counts["spawns"] += 1
+        try:
+            process.stdin.write((json.dumps({"source": self.source}) + "\n").encode("utf-8"))
+            await process.stdin.drain()
+            line = await asyncio.wait_for(process.stdout.readline(), self.startup_timeout)
+        except (asyncio.TimeoutError, ConnectionError) as e:
+            process.kill()
+            raise ToolSandboxError(f"Tool worker did not start: {type(e).__name__}") from e
+        reply = json.loads(line) if line else {"message": "worker exited during startup"}
+        if not reply.get("ready"):
+            if process.returncode is None:
+                process.kill()
+            raise ToolSandboxError(f"Tools failed to load: {reply.get('error_type', '')}: {reply.get('message')}")
+        return _Worker(process)
+
+    async def _acquire(self) -> _Worker:
+        async with self._available:
+            while True:
+                while self._idle:
+                    worker = self._idle.pop()
+                    if worker.process.returncode is None:
+                        return worker
+                    self._spawned -= 1
+                if self._spawned < self.size:
+                    self._spawned += 1
+                    break
+                await self._available.wait()
+        try:
+            return await self._spawn()
+        except BaseException:
+            async with self._available:
+                self._spawned -= 1
+                self._available.notify()
+            raise
+
+    async def _release(self, worker: _Worker, healthy: bool):
+        async with self._available:
+            if healthy and worker.process.returncode is None and worker.calls < self.max_calls:
+                self._idle.append(worker)
+            else:
+                if worker.process.returncode is None:
+                    try:
+                        worker.process.kill()
+                    except ProcessLookupError:
+                        pass
+                self._spawned -= 1
+            self._available.notify()
+
+    async def warm_up(self):
+        """
+        Start the workers ahead of the first call.
+
+        Raises:
+            ToolSandboxError: If the tools can't be loaded in a worker
+        """
+        self._bind_loop()
+        workers = []
+        try:
+            for _ in range(self.size - len(self._idle)):
+                workers.append(await self._acquire())
+        finally:
+            for worker in workers:
+                await self._release(worker, True)
+
+    async def call(self, tool: str, args: List[Any], kwargs: Dict[str, Any]) -> Any:
+        """
+        Run a tool in a worker.
+
+        Returns:
+            The tool's result, or {"error": ...} if it failed, so the model sees what went wrong
+        """
+        self._bind_loop()
+        self.counts["calls"] += 1
+        try:
+            worker = await self._acquire()
+        except ToolSandboxError as e:
+            self.counts["errors"] += 1
+            return {"error": str(e)}
+
+        healthy = False
+        try:
+            request = json.dumps({"tool": tool, "args": args, "kwargs": kwargs}, default=str)
+            worker.process.stdin.write((request + "\n").encode("utf-8"))
+            await worker.process.stdin.drain()
+            worker.calls += 1
+            line = await asyncio.wait_for(worker.process.stdout.readline(), self.timeout)
+            if not line:
+                await worker.process.wait()
+                self.counts["crashes"] += 1
+                self.counts["errors"] += 1
+                return {"error": f"Tool {tool} crashed or exceeded its resource limits (exit code {worker.process.returncode})"}
+            healthy = True
+            reply = json.loads(line)
+            if not reply.get("ok"):
+                self.counts["errors"] += 1
+                return {"error": f"{reply.get('error_type')}: {reply.get('message')}"}
+            return reply.get("result")
+        except asyncio.TimeoutError:
+            self.counts["timeouts"] += 1
+            self.counts["errors"] += 1
+            return {"error": f"Tool {tool} did not finish within {self.timeout}s"}
+        except ConnectionError:
+            self.counts["crashes"] += 1
+            self.counts["errors"] += 1
+            return {"error": f"Tool {tool} worker exited"}
+        finally:
+            await self._release(worker, healthy)
+
+    def close(self):
+        """Kill idle workers. The sandbox stays usable - the next call spawns a fresh one."""
+        for worker in self._idle:
+            if worker.process.returncode is None:
+                try:
+                    worker.process.kill()
+                except Exception:
+                    pass  # Already gone, or its loop is closed
+        self._idle = []
+        self._spawned = 0
+
+    async def shutdown(self):
+        """Kill idle workers and wait for them to exit."""
+        workers = list(self._idle)
+        self.close()
+        for worker in workers:
+            await worker.process.wait()
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.counts, idle_workers=len(self._idle))
+
+
+class ToolSandboxPool:
+    """Per-project sandboxes, LRU-bounded so idle projects don't hold workers forever."""
+
+    def __init__(self, max_projects: int = 16, **sandbox_options: Any):
+        self.max_projects = max_projects
+        self.sandbox_options = sandbox_options
+        self._sandboxes: "OrderedDict[str, ToolSandbox]" = OrderedDict()
+
+    def get(self, project_hash: str, source: str) -> ToolSandbox:
+        """Sandbox for a project, given its tools module source."""
+        sandbox = self._sandboxes.get(project_hash)
+        if sandbox is not None:
+            self._sandboxes.move_to_end(project_hash)
+            return sandbox
+        sandbox = ToolSandbox(source, **self.sandbox_options)
+        self._sandboxes[project_hash] = sandbox
+        while len(self._sandboxes) > self.max_projects:
+            _, evicted = self._sandboxes.popitem(last=False)
+            evicted.close()
+        return sandbox
+
+    def discard(self, project_hash: str):
+        sandbox = self._sandboxes.pop(project_hash, None)
+        if sandbox is not None:
+            sandbox.close()
+
+    async def shutdown(self):
+        sandboxes = list(self._sandboxes.values())
+        self._sandboxes.clear()
+        for sandbox in sandboxes:
+            await sandbox.shutdown()
+
+    def stats(self) -> Dict[str, Any]:
+        totals = {"projects": len(self._sandboxes)}
+        for sandbox in self._sandboxes.values():
+            for name, value in sandbox.stats().items():
+                totals[name] = totals.get(name, 0) + value
+        return totals
+
+
+def pool_from_env() -> Optional[ToolSandboxPool]:
+    """Sandbox pool configured from TOOL_* environment variables, or None if TOOL_SANDBOX=0."""
+    if os.getenv("TOOL_SANDBOX", "1").lower() in ("0", "false", "no"):
+        return None
+    return ToolSandboxPool(
+        max_projects=int(os.getenv("TOOL_SANDBOX_PROJECTS", 16)),
+        size=int(os.getenv("TOOL_WORKERS_PER_PROJECT", 1)),
+        timeout=float(os.getenv("TOOL_TIMEOUT_SECONDS", 30)),
+        cpu_seconds=int(os.getenv("TOOL_CPU_SECONDS", 10)),
+        memory_mb=int(os.getenv("TOOL_MEMORY_MB", 1024)),
+        max_calls=int(os.getenv("TOOL_MAX_CALLS_PER_WORKER", 100))
+    )
@@ -0,0 +1,131 @@
+"""
+Tool sandbox worker, run as a long-lived subprocess by ToolSandbox.
+
+Usage: python tool_worker.py <cpu_seconds> <memory_mb> <max_calls>
+
+Protocol (one JSON object per line):
+    stdin:  {"source": "<tools module source>"}            (first line only)
+    stdout: {"ready": true} or {"ready": false, "error_type": ..., "message": ...}
+    stdin:  {"tool": "<name>", "args": [...], "kwargs": {...}}
+    stdout: {"ok": true, "result": ...} or {"ok": false, "error_type": ..., "message": ...}
+
+Resource limits are applied before any generated code runs. Each call gets
+cpu_seconds of CPU time on top of what the worker has used so far; going
+over kills the worker with SIGXCPU and the pool replaces it. The hard CPU
+limit covers max_calls calls, so tool code can't lift its own limit.
+"""
+
+import asyncio
+import inspect
+import json
+import math
+import os
+import sys
+import types
+
+GENERATED_FILENAME = "agent_tools.py"
+LOAD_CPU_SECONDS = 30  # Allowance for importing the tools' dependencies
+
+
+def _cpu_used() -> int:
+    """CPU seconds used so far, rounded up so a new limit never starts in the past."""
+    usage = os.times()
+    return math.ceil(usage.user + usage.system)
+
+
+def _apply_limits(cpu_seconds: int, memory_mb: int, max_calls: int):
+    try:
+        import resource
+    except ImportError:
+        return  # Not available on this platform; the pool's wall-clock timeout still applies
+    if memory_mb > 0:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    if cpu_seconds > 0:
+        hard = _cpu_used() + LOAD_CPU_SECONDS + cpu_seconds * max_calls + 1
+        resource.setrlimit(resource.RLIMIT_CPU, (_cpu_used() + LOAD_CPU_SECONDS, hard))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+
+def _set_call_cpu_limit(cpu_seconds: int):
+    if cpu_seconds <= 0:
+        return
+    try:
+        import resource
+    except ImportError:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = _cpu_used() + cpu_seconds
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _error(e: BaseException) -> dict:
+    return {"ok": False, "error_type": type(e).__name__, "message": str(e)}
+
+
+def _load(source: str) -> types.ModuleType:
+    module = types.ModuleType("_artifex_tools")
+    module.__file__ = GENERATED_FILENAME
+    sys.modules[module.__name__] = module
+    exec(compile(source, GENERATED_FILENAME, "exec"), module.__dict__)
+    return module
+
+
+def _call(module: types.ModuleType, request: dict) -> dict:
+    func = getattr(module, request["tool"], None)
+    if not callable(func):
+        return {"ok": False, "error_type": "UnknownTool", "message": f"No tool named {request['tool']!r}"}
+    kwargs = dict(request.get("kwargs") or {})
+    # ToolContext only exists in the API process
+    if "tool_context" in inspect.signature(func).parameters:
+        kwargs.setdefault("tool_context", None)
+    result = func(*(request.get("args") or []), **kwargs)
+    if inspect.isawaitable(result):
+        result = asyncio.run(result)
+    return {"ok": True, "result": result}
+
+
+def main():
+    cpu_seconds, memory_mb, max_calls = (int(value) for value in sys.argv[1:4])
+
+    # Keep the protocol on private descriptors: generated code that prints or
+    # reads stdin gets stderr and /dev/null instead
+    protocol_in = os.fdopen(os.dup(0), "r", encoding="utf-8")
+    protocol_out = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.dup2(2, 1)
+
+    def reply(payload: dict):
+        protocol_out.write(json.dumps(payload, default=str) + "\n")
+        protocol_out.flush()
+
+    _apply_limits(cpu_seconds, memory_mb, max_calls)
+
+    line = protocol_in.readline()
+    if not line:
+        return
+    try:
+        module = _load(json.loads(line)["source"])
+    except BaseException as e:
+        reply(dict(_error(e), ready=False))
+        return
+    reply({"ready": True})
+
+    for line in protocol_in:
+        try:
+            request = json.loads(line)
+            _set_call_cpu_limit(cpu_seconds)
+            response = _call(module, request)
+        except BaseException as e:
+            response = _error(e)
+        try:
+            reply(response)
+        except (TypeError, ValueError) as e:
+            reply(_error(e))
+
+
+if __name__ == "__main__":
+    main()
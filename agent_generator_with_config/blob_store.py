@@ -0,0 +1,161 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Content-addressed store for generated files.
+
+Many projects share byte-identical files (__init__.py, requirements.txt,
+often agent.py itself). With a blob store, each distinct content is
+written once as a read-only blob named by its SHA-256, and project files
+become hard links to it:
+
+    <store>/ab/cdef0123...        blob (mode 0444, or 0555 for executables)
+    <output>/<project>/agent.py   hard link to the blob
+
+The filesystem link count is the reference count: a blob whose st_nlink
+is 1 is referenced by no project and is removed by gc(). Blobs are
+read-only so an in-place edit of one project's file can't silently change
+every other project sharing it; editors that save by rename, and
+regeneration, simply replace the link.
+
+The store must be on the same filesystem as the projects. Where hard
+links aren't possible (another device, a filesystem without links) files
+are written normally.
+"""
+
+import errno
+import hashlib
+import os
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+BLOB_MODE = 0o444
+EXECUTABLE_BLOB_MODE = 0o555
+_LINK_UNSUPPORTED = {errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP, errno.EOPNOTSUPP}
+
+
+def _fsync_dir(path: Path):
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+class BlobStore:
+    """Read-only blobs keyed by content hash, shared by hard links."""
+    
+    def __init__(self, root, fsync: str = "none"):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.fsync = fsync
+    
+    def blob_path(self, digest: str, executable: bool = False) -> Path:
+        # Executables get their own blob: hard links share permission bits
+        return self.root / digest[:2] / (digest[2:] + ("-x" if executable else ""))
+    
+    def put(self, data: bytes, executable: bool = False) -> Path:
+        """Store data (no-op if the blob exists). Returns the blob's path."""
+        path = self.blob_path(hashlib.sha256(data).hexdigest(), executable)
+        if path.exists():
+            return path
+        path.parent.mkdir(exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".blob.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                f.flush()
+                if self.fsync != "none":
+                    os.fsync(f.fileno())
+            os.chmod(tmp_name, EXECUTABLE_BLOB_MODE if executable else BLOB_MODE)
+            try:
+                # link, not replace: a concurrent writer's blob may already be linked into projects
+                os.link(tmp_name, path)
+            except FileExistsError:
+                pass
+        finally:
+            os.unlink(tmp_name)
+        if self.fsync == "full":
+            _fsync_dir(path.parent)
+        return path
+    
+    def link(self, path, content: str, executable: bool = False) -> Optional[bool]:
+        """
+        Make path a hard link to the blob holding content.
+        
+        Returns:
+            True if path was (re)linked, False if it already was a link to
+            that blob, None if hard links aren't possible there (the caller
+            should write the file itself)
+        """
+        path = Path(path)
+        data = content.encode('utf-8')
+        for _ in range(2):
+            blob = self.put(data, executable)
+            try:
+                if os.path.samefile(blob, path):
+                    return False
+            except FileNotFoundError:
+                pass
+            tmp_name = path.parent / f".{path.name}.{uuid.uuid4().hex[:12]}.link"
+            try:
+                os.link(blob, tmp_name)
+            except FileNotFoundError:
+                continue  # Blob collected between put() and link(): store it again
+            except OSError as e:
+                if e.errno in _LINK_UNSUPPORTED:
+                    return None
+                raise
+            try:
+                os.replace(tmp_name, path)
+            except BaseException:
+                os.unlink(tmp_name)
+                raise
+            if self.fsync == "full":
+                _fsync_dir(path.parent)
+            return True
+        raise FileNotFoundError(f"Blob for {path.name} was removed while linking")
+    
+    def _blobs(self):
+        for shard in self.root.iterdir():
+            if shard.is_dir() and len(shard.name) == 2:
+                for blob in shard.iterdir():
+                    if not blob.name.startswith("."):
+                        yield blob
+    
+    def gc(self) -> Dict[str, int]:
+        """Delete blobs no project links to any more."""
+        removed = freed = 0
+        for blob in self._blobs():
+            stat = blob.stat()
+            if stat.st_nlink == 1:
+                blob.unlink()
+                removed += 1
+                freed += stat.st_size
+        return {"removed": removed, "freed_bytes": freed}
+    
+    def stats(self) -> Dict[str, Any]:
+        """Blob count and size, and how many bytes sharing saves."""
+        blobs = size = references = saved = 0
+        for blob in self._blobs():
+            stat = blob.stat()
+            links = stat.st_nlink - 1  # The store's own entry isn't a reference
+            blobs += 1
+            size += stat.st_size
+            references += links
+            saved += stat.st_size * max(links - 1, 0)
+        return {"blobs": blobs, "bytes": size, "references": references, "bytes_saved": saved}
@@ -15,22 +15,137 @@
 """
 Deterministic Config-to-Code Generator for ADK Agents.
 Converts JSON configuration to Python agent code files.
+
+Batch mode regenerates many configs at once across a process pool:
+
+    python -m code_generator batch "templates/**/project_config.json" --out generated --jobs 8
+
+With --blob-store DIR, identical files across projects are hard links to
+one shared blob; "python -m code_generator gc DIR" removes unused blobs.
 """
 
 import os
+import sys
+import io
 import json
+import glob
+import time
+import argparse
+import hashlib
+import tempfile
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, List, Set
+from typing import Any, Dict, List, Optional, Set
 try:
-    from .config_schema import AgentProjectConfig, AgentConfig, ToolConfig, AgentType, BuiltinToolType
+    from .config_schema import AgentProjectConfig, AgentConfig, ToolConfig, AgentType, BuiltinToolType, validate_agent_config
+    from .blob_store import BlobStore
 except ImportError:
-    from config_schema import AgentProjectConfig, AgentConfig, ToolConfig, AgentType, BuiltinToolType
+    from config_schema import AgentProjectConfig, AgentConfig, ToolConfig, AgentType, BuiltinToolType, validate_agent_config
+    from blob_store import BlobStore
+
+
+# fsync policies for generated file writes:
+#   "none" - rely on the OS to flush (fastest, fine for dev machines)
+#   "file" - fsync each file before it is renamed into place
+#   "full" - also fsync the directory so the rename itself is durable
+FSYNC_POLICIES = ("none", "file", "full")
+
+
+def _sha256_file(path: Path) -> str:
+    """SHA-256 hex digest of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_file_if_changed(path, content: str, fsync: str = "none", mode: int = None) -> bool:
+    """
+    Atomically write content to path unless the file already holds it.
+    
+    The existing file is compared by size and SHA-256 first, so unchanged files
+    are never touched (their mtime stays put and file watchers stay quiet).
+    Changed files are written to a temp file in the same directory and renamed
+    over the target.
+    
+    Args:
+        path: Destination file path
+        content: Text content to write (UTF-8)
+        fsync: One of FSYNC_POLICIES
+        mode: Optional permission bits for the file (e.g. 0o755)
+        
+    Returns:
+        True if the file was written, False if it was already up to date
+    """
+    if fsync not in FSYNC_POLICIES:
+        raise ValueError(f"Unknown fsync policy: {fsync} (expected one of {FSYNC_POLICIES})")
+    
+    path = Path(path)
+    data = content.encode('utf-8')
+    
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        stat = None
+    
+    if stat is not None and stat.st_size == len(data):
+        if _sha256_file(path) == hashlib.sha256(data).hexdigest():
+            if mode is None or (stat.st_mode & 0o777) == mode:
+                return False
+            if stat.st_nlink == 1:
+                os.chmod(path, mode)
+                return False
+            # A shared (blob store) inode: rewrite rather than chmod every link
+    
+    if mode is None:
+        mode = (stat.st_mode & 0o777) if stat is not None else 0o644
+    
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            if fsync != "none":
+                os.fsync(f.fileno())
+        try:
+            os.chmod(tmp_name, mode)
+        except OSError:
+            pass  # chmod may fail on Windows, that's OK
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+    
+    if fsync == "full" and hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(path.parent, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    
+    return True
 
 
 class AgentCodeGenerator:
     """Generates Python agent code from configuration."""
     
-    def __init__(self):
+    def __init__(self, fsync_policy: str = "none", blob_store: Optional[BlobStore] = None):
+        """
+        Args:
+            fsync_policy: Durability of disk writes - one of FSYNC_POLICIES
+            blob_store: Write files as hard links into this content-addressed
+                        store, so identical files across projects share storage
+        """
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync_policy} (expected one of {FSYNC_POLICIES})")
+        self.fsync_policy = fsync_policy
+        self.blob_store = blob_store
+        
         self.builtin_tool_imports = {
             BuiltinToolType.GOOGLE_SEARCH: "from google.adk.tools import google_search",
             BuiltinToolType.URL_CONTEXT: "from google.adk.tools import url_context", 
@@ -88,8 +203,9 @@ class AgentCodeGenerator:
         ##    files[".env"] = self._generate_env_file(config)
         
         # Write files to disk if output_dir is specified
+        self.last_written_files = []
         if output_dir:
-            self._write_files_to_disk(files, output_dir)
+            self.last_written_files = self._write_files_to_disk(files, output_dir)
         
         return files
     
@@ -162,6 +278,9 @@ root_agent = {config.main_agent}
                 for import_stmt in tool.imports:
                     imports.add(import_stmt.strip())
         
+        if any(self._agent_tool_sub_agents(agent, config) for agent in config.agents.values()):
+            imports.add("from google.adk.tools.agent_tool import AgentTool")
+        
         # Collect builtin tool imports
         for tool in config.tools.values():
             if tool.type == "builtin" and tool.builtin_type:
@@ -238,14 +357,36 @@ root_agent = {config.main_agent}
         else:
             raise ValueError(f"Unknown agent type: {agent.type}")
     
+    def _agent_tool_sub_agents(self, agent: AgentConfig, config: AgentProjectConfig) -> List[str]:
+        """
+        Sub-agents of an LLM agent that use Google Search.
+        
+        ADK can't combine built-in search with agent transfer, so these are
+        given to the parent as AgentTools instead of transfer sub-agents.
+        """
+        if agent.type != AgentType.LLM_AGENT:
+            return []
+        wrapped = []
+        for sub_agent_name in agent.sub_agents:
+            sub_agent = config.agents.get(sub_agent_name)
+            if sub_agent is None or sub_agent.type != AgentType.LLM_AGENT:
+                continue
+            tools = [config.tools.get(tool_name) for tool_name in sub_agent.tools]
+            if any(tool and tool.type == "builtin" and tool.builtin_type == BuiltinToolType.GOOGLE_SEARCH for tool in tools):
+                wrapped.append(sub_agent_name)
+        return wrapped
+    
     def _generate_llm_agent(self, agent_name: str, agent: AgentConfig, config: AgentProjectConfig) -> str:
         """Generate LLM agent code."""
         
-        # Build tools list
-        tools_list = self._build_tools_list(agent.tools, config)
+        # Build tools list; search sub-agents are called as AgentTools
+        agent_tools = self._agent_tool_sub_agents(agent, config)
+        tools = [self._build_tools_list(agent.tools, config)] + [f"AgentTool(agent={name})" for name in agent_tools]
+        tools_list = ", ".join(tool for tool in tools if tool)
         
         # Build sub-agents list
-        sub_agents_list = ", ".join(agent.sub_agents) if agent.sub_agents else None
+        sub_agents = [name for name in agent.sub_agents if name not in agent_tools]
+        sub_agents_list = ", ".join(sub_agents) if sub_agents else None
         
         # Build configuration
         agent_config = self._build_agent_config(agent)
@@ -465,16 +606,42 @@ This agent was automatically generated using the ADK Agent Generator.
             lines.append(f"{key}={value}")
         return "\n".join(lines)
     
-    def _write_files_to_disk(self, files: Dict[str, str], output_dir: str):
-        """Write generated files to disk."""
+    def write_file(self, path, content: str, mode: int = None) -> bool:
+        """
+        Write one generated file unless it already holds content.
+        
+        With a blob store the file becomes a hard link to the content's blob
+        (mode 0o755 picks the executable blob); otherwise it is written in place.
+        
+        Returns:
+            True if the file was written or relinked
+        """
+        if self.blob_store is not None:
+            linked = self.blob_store.link(path, content, executable=bool(mode and mode & 0o111))
+            if linked is not None:
+                return linked
+        return write_file_if_changed(path, content, fsync=self.fsync_policy, mode=mode)
+    
+    def _write_files_to_disk(self, files: Dict[str, str], output_dir: str) -> List[str]:
+        """
+        Write generated files to disk, skipping files whose content is unchanged.
+        
+        Returns:
+            Names of the files that were actually written
+        """
         try:
             output_path = Path(output_dir)
             output_path.mkdir(parents=True, exist_ok=True)
             
+            written = []
             for filename, content in files.items():
                 file_path = output_path / filename
-                file_path.write_text(content, encoding='utf-8')
-                print(f"Generated: {file_path}")
+                if self.write_file(file_path, content):
+                    written.append(filename)
+                    print(f"Generated: {file_path}")
+                else:
+                    print(f"Unchanged: {file_path}")
+            return written
         except Exception as e:
             print(f"[CODEGEN] Write error: {e}")
             import traceback
@@ -514,4 +681,217 @@ def generate_agent_from_dict(config_dict: dict, output_dir: str = None) -> Dict[
     """
     config = AgentProjectConfig(**config_dict)
     generator = AgentCodeGenerator()
-    return generator.generate_from_config(config, output_dir) 
\ No newline at end of file
+    return generator.generate_from_config(config, output_dir) 
+
+
+def _glob_base(pattern: str) -> Path:
+    """The leading part of a glob pattern that has no wildcards."""
+    parts = []
+    for part in Path(pattern).parts:
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    return Path(*parts) if parts else Path(".")
+
+
+def _batch_output_name(config_file: str, base: Path) -> str:
+    """
+    Output folder for a config, relative to the batch output directory.
+    
+    The config's path under the pattern's base, so configs in different
+    folders never share an output: a/x/project_config.json -> a/x and
+    a/y.json -> a/y.
+    """
+    path = Path(config_file)
+    try:
+        relative = path.relative_to(base)
+    except ValueError:
+        relative = Path(path.name)
+    if relative.name == "project_config.json" and relative.parent != Path("."):
+        return relative.parent.as_posix()
+    return relative.with_suffix("").as_posix()
+
+
+def _render_config_file(
+    config_file: str,
+    output_dir: str,
+    strict: bool = False,
+    fsync_policy: str = "none",
+    blob_store_dir: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Validate and render one config file. Runs inside a batch worker process.
+    
+    Never raises - failures are returned so one bad config can't abort the batch.
+    """
+    started = time.perf_counter()
+    result = {"config_file": config_file, "success": False, "warnings": []}
+    
+    try:
+        with open(config_file, 'r') as f:
+            config_data = json.load(f)
+        
+        config = AgentProjectConfig(**config_data)
+        errors = validate_agent_config(config)
+        result["warnings"] = errors
+        if errors and strict:
+            result["error"] = "; ".join(errors)
+            return result
+        
+        blob_store = BlobStore(blob_store_dir, fsync=fsync_policy) if blob_store_dir else None
+        generator = AgentCodeGenerator(fsync_policy=fsync_policy, blob_store=blob_store)
+        
+        # Per-file progress lines are too noisy for hundreds of configs
+        with contextlib.redirect_stdout(io.StringIO()):
+            files = generator.generate_from_config(config, output_dir)
+        
+        result.update({
+            "success": True,
+            "output_directory": output_dir,
+            "file_count": len(files),
+            "written_count": len(generator.last_written_files)
+        })
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        result["seconds"] = time.perf_counter() - started
+    
+    return result
+
+
+def batch_generate(
+    pattern: str,
+    out_dir: str,
+    jobs: Optional[int] = None,
+    strict: bool = False,
+    fsync_policy: str = "none",
+    blob_store_dir: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Validate and render every config file matching a glob across a process pool.
+    
+    Args:
+        pattern: Glob for config files (``**`` is recursive)
+        out_dir: Base output directory; each config gets its own sub-folder,
+                 mirroring its path under the pattern's non-wildcard prefix
+        jobs: Worker processes (defaults to the CPU count)
+        strict: Treat validation errors as failures instead of warnings
+        fsync_policy: Durability of disk writes - "none", "file" or "full"
+        blob_store_dir: Deduplicate files through a blob store here (same
+                        filesystem as out_dir)
+        
+    Returns:
+        One result dict per config file, in glob order
+    """
+    config_files = sorted(glob.glob(pattern, recursive=True))
+    if not config_files:
+        print(f"No config files match: {pattern}")
+        return []
+    
+    print(f"Generating {len(config_files)} configs into {out_dir} with {jobs or os.cpu_count()} workers")
+    results = {}
+    
+    # Configs that would render into the same folder are failed up front
+    base = _glob_base(pattern)
+    outputs = {}
+    for config_file in config_files:
+        outputs.setdefault(_batch_output_name(config_file, base), []).append(config_file)
+    to_render = {}
+    for name, owners in outputs.items():
+        if len(owners) == 1:
+            to_render[owners[0]] = os.path.join(out_dir, name)
+            continue
+        for config_file in owners:
+            others = ", ".join(other for other in owners if other != config_file)
+            results[config_file] = {
+                "config_file": config_file,
+                "success": False,
+                "warnings": [],
+                "error": f"Output folder '{name}' is also used by {others}",
+                "seconds": 0.0
+            }
+            print(f"❌ {config_file}: {results[config_file]['error']}")
+    
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {
+            pool.submit(_render_config_file, config_file, output_dir, strict, fsync_policy, blob_store_dir): config_file
+            for config_file, output_dir in to_render.items()
+        }
+        for future in as_completed(futures):
+            config_file = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # A worker that dies (e.g. BrokenProcessPool) fails its configs, not the batch
+                result = {
+                    "config_file": config_file,
+                    "success": False,
+                    "warnings": [],
+                    "error": f"Worker failed: {type(e).__name__}: {e}",
+                    "seconds": 0.0
+                }
+            results[config_file] = result
+            
+            if result["success"]:
+                print(f"✅ {result['config_file']} -> {result['output_directory']} "
+                      f"({result['written_count']}/{result['file_count']} files written)")
+                for warning in result["warnings"]:
+                    print(f"   ⚠️  {warning}")
+            else:
+                print(f"❌ {result['config_file']}: {result['error']}")
+    
+    return [results[config_file] for config_file in config_files]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(
+        prog="python -m code_generator",
+        description="Generate ADK agent code from JSON configurations"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    batch_parser = subparsers.add_parser("batch", help="Regenerate many configs across a process pool")
+    batch_parser.add_argument("pattern", help='Glob for config files, e.g. "templates/**/project_config.json"')
+    batch_parser.add_argument("--out", required=True, help="Base output directory")
+    batch_parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+    batch_parser.add_argument("--strict", action="store_true", help="Fail configs that have validation errors")
+    batch_parser.add_argument("--fsync", choices=FSYNC_POLICIES, default="none", help="fsync policy for writes")
+    batch_parser.add_argument("--blob-store", default=None, help="Hard-link identical files to blobs in this directory")
+    
+    gc_parser = subparsers.add_parser("gc", help="Remove blobs no generated project links to")
+    gc_parser.add_argument("blob_store", help="Blob store directory")
+    
+    args = parser.parse_args(argv)
+    
+    if args.command == "gc":
+        store = BlobStore(args.blob_store)
+        removed = store.gc()
+        stats = store.stats()
+        print(f"Removed {removed['removed']} blobs ({removed['freed_bytes']} bytes); "
+              f"{stats['blobs']} blobs with {stats['references']} references remain")
+        return 0
+    
+    started = time.perf_counter()
+    results = batch_generate(args.pattern, args.out, args.jobs, args.strict, args.fsync, args.blob_store)
+    elapsed = time.perf_counter() - started
+    
+    succeeded = [r for r in results if r["success"]]
+    failed = [r for r in results if not r["success"]]
+    total_files = sum(r["file_count"] for r in succeeded)
+    total_written = sum(r["written_count"] for r in succeeded)
+    
+    print()
+    print(f"Configs: {len(succeeded)} succeeded, {len(failed)} failed, {len(results)} total")
+    print(f"Files: {total_files} rendered, {total_written} written")
+    if args.blob_store:
+        stats = BlobStore(args.blob_store).stats()
+        print(f"Blob store: {stats['blobs']} blobs, {stats['bytes']} bytes, {stats['bytes_saved']} bytes saved by sharing")
+    if elapsed > 0 and results:
+        print(f"Throughput: {len(results) / elapsed:.1f} configs/s, {total_files / elapsed:.1f} files/s ({elapsed:.2f}s)")
+    
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -17,10 +17,16 @@ JSON Schema definitions for ADK Agent Configuration.
 Based on analysis of existing ADK agents, tools, and planners.
 """
 
-from typing import Dict, List, Optional, Union, Any, Literal
+from collections import OrderedDict
+from typing import Dict, List, Optional, Union, Any, Literal, Tuple
 from pydantic import BaseModel, Field, ConfigDict
 from enum import Enum
 
+try:
+    from .config_validator import ConfigIssue, validate_config_dict, validate_config_cached
+except ImportError:
+    from config_validator import ConfigIssue, validate_config_dict, validate_config_cached
+
 
 class AgentType(str, Enum):
     """Available agent types in ADK."""
@@ -103,45 +109,44 @@ class AgentProjectConfig(BaseModel):
 # Validation functions
 def validate_agent_config(config: AgentProjectConfig) -> List[str]:
     """Validate agent configuration and return list of errors."""
-    errors = []
-    
-    # Check main agent exists
-    if config.main_agent not in config.agents:
-        errors.append(f"Main agent '{config.main_agent}' not found in agents")
-    
-    # Check all referenced sub-agents exist
-    for agent_name, agent in config.agents.items():
-        for sub_agent in agent.sub_agents:
-            if sub_agent not in config.agents:
-                errors.append(f"Sub-agent '{sub_agent}' referenced by '{agent_name}' not found")
+    return [issue.message for issue in validate_config_dict(config.model_dump(mode="json"))]
+
+
+# Parsed configs keyed by config hash. Entries are shared between callers and
+# must be treated as read-only.
+_parsed_configs: "OrderedDict[str, AgentProjectConfig]" = OrderedDict()
+_PARSED_CONFIGS_MAX = 128
+
+
+def load_validated_config(config_dict: Dict[str, Any]) -> Tuple[AgentProjectConfig, List[ConfigIssue]]:
+    """
+    Parse and validate a configuration dictionary, reusing earlier results.
     
-    # Check all referenced tools exist
-    for agent_name, agent in config.agents.items():
-        for tool_name in agent.tools:
-            if tool_name not in config.tools:
-                errors.append(f"Tool '{tool_name}' referenced by '{agent_name}' not found")
+    A config that was already parsed and validated (same hash) skips both the
+    Pydantic parse and the validation pass, so repeated previews and
+    regenerations are close to free.
     
-    # Validate agent types have required fields
-    for agent_name, agent in config.agents.items():
-        if agent.type == AgentType.LLM_AGENT:
-            if not agent.model:
-                errors.append(f"LLM agent '{agent_name}' missing required 'model' field")
-            if not agent.instruction:
-                errors.append(f"LLM agent '{agent_name}' missing required 'instruction' field")
+    Args:
+        config_dict: Project configuration as a plain dictionary
         
-        # Sequential/Parallel/Loop agents need sub-agents
-        if agent.type in [AgentType.SEQUENTIAL_AGENT, AgentType.PARALLEL_AGENT, AgentType.LOOP_AGENT]:
-            if not agent.sub_agents:
-                errors.append(f"{agent.type} agent '{agent_name}' needs at least one sub-agent")
-    
-    # Validate tool configurations
-    for tool_name, tool in config.tools.items():
-        if tool.type == "builtin" and not tool.builtin_type:
-            errors.append(f"Builtin tool '{tool_name}' missing builtin_type")
-        if tool.type == "custom_function" and not tool.function_code:
-            errors.append(f"Custom tool '{tool_name}' missing function_code")
-    
-    return errors
+    Returns:
+        Tuple of (parsed config, validation issues)
+        
+    Raises:
+        pydantic.ValidationError: If the dictionary doesn't match the schema
+    """
+    key, issues, _ = validate_config_cached(config_dict)
+    
+    config = _parsed_configs.get(key)
+    if config is None:
+        config = AgentProjectConfig(**config_dict)
+        _parsed_configs[key] = config
+        while len(_parsed_configs) > _PARSED_CONFIGS_MAX:
+            _parsed_configs.popitem(last=False)
+    else:
+        _parsed_configs.move_to_end(key)
+    
+    return config, issues
 
 
 def get_default_model() -> str:
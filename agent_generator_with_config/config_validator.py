@@ -0,0 +1,192 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Dependency-free validation for agent project configurations.
+Works on plain JSON dictionaries in a single pass and returns structured
+issues with JSON paths. Results are cached by config hash.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Tuple
+
+# Mirrors AgentType / BuiltinToolType in config_schema without importing pydantic
+AGENT_TYPES = {"llm_agent", "sequential_agent", "parallel_agent", "loop_agent"}
+WORKFLOW_AGENT_TYPES = {"sequential_agent", "parallel_agent", "loop_agent"}
+TOOL_TYPES = {"builtin", "custom_function"}
+BUILTIN_TOOL_TYPES = {
+    "google_search", "url_context", "load_memory", "preload_memory",
+    "load_artifacts", "transfer_to_agent", "get_user_choice", "exit_loop",
+}
+
+
+@dataclass(frozen=True)
+class ConfigIssue:
+    """A single validation problem."""
+    path: str      # JSON path, e.g. "$.agents.router.sub_agents[1]"
+    code: str      # Machine-readable code, e.g. "unknown_sub_agent"
+    message: str   # Human-readable description
+
+    def to_dict(self) -> Dict[str, str]:
+        return asdict(self)
+
+    def __str__(self) -> str:
+        return self.message
+
+
+def config_hash(config: Dict[str, Any]) -> str:
+    """Stable SHA-256 over a config dict's canonical JSON form."""
+    canonical = json.dumps(config, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _value(item: Any) -> Any:
+    """Plain value of a possibly-Enum field."""
+    return getattr(item, "value", item)
+
+
+def validate_config_dict(config: Dict[str, Any]) -> List[ConfigIssue]:
+    """
+    Validate a project configuration dictionary in a single pass.
+
+    Agent and tool names are indexed once up front, then every agent and every
+    tool is visited exactly once.
+
+    Args:
+        config: Project configuration as a plain dictionary
+
+    Returns:
+        List of issues (empty if the configuration is valid)
+    """
+    issues: List[ConfigIssue] = []
+
+    if not isinstance(config, dict):
+        return [ConfigIssue("$", "invalid_type", "Configuration must be a JSON object")]
+
+    for field in ("project_name", "main_agent"):
+        if not isinstance(config.get(field), str) or not config.get(field):
+            issues.append(ConfigIssue(f"$.{field}", "missing_field", f"Project missing required '{field}' field"))
+
+    agents = config.get("agents")
+    if not isinstance(agents, dict):
+        issues.append(ConfigIssue("$.agents", "invalid_type", "'agents' must be an object of agent definitions"))
+        agents = {}
+
+    tools = config.get("tools") or {}
+    if not isinstance(tools, dict):
+        issues.append(ConfigIssue("$.tools", "invalid_type", "'tools' must be an object of tool definitions"))
+        tools = {}
+
+    main_agent = config.get("main_agent")
+    if isinstance(main_agent, str) and main_agent and main_agent not in agents:
+        issues.append(ConfigIssue("$.main_agent", "unknown_main_agent", f"Main agent '{main_agent}' not found in agents"))
+
+    for agent_name, agent in agents.items():
+        path = f"$.agents.{agent_name}"
+        if not isinstance(agent, dict):
+            issues.append(ConfigIssue(path, "invalid_type", f"Agent '{agent_name}' must be an object"))
+            continue
+
+        agent_type = _value(agent.get("type"))
+        if agent_type not in AGENT_TYPES:
+            issues.append(ConfigIssue(f"{path}.type", "unknown_agent_type", f"Agent '{agent_name}' has unknown type '{agent_type}'"))
+        if "description" not in agent:
+            issues.append(ConfigIssue(f"{path}.description", "missing_field", f"Agent '{agent_name}' missing required 'description' field"))
+
+        sub_agents = agent.get("sub_agents") or []
+        for index, sub_agent in enumerate(sub_agents):
+            if sub_agent not in agents:
+                issues.append(ConfigIssue(f"{path}.sub_agents[{index}]", "unknown_sub_agent",
+                                          f"Sub-agent '{sub_agent}' referenced by '{agent_name}' not found"))
+
+        for index, tool_name in enumerate(agent.get("tools") or []):
+            if tool_name not in tools:
+                issues.append(ConfigIssue(f"{path}.tools[{index}]", "unknown_tool",
+                                          f"Tool '{tool_name}' referenced by '{agent_name}' not found"))
+
+        if agent_type == "llm_agent":
+            if not agent.get("model"):
+                issues.append(ConfigIssue(f"{path}.model", "missing_field", f"LLM agent '{agent_name}' missing required 'model' field"))
+            if not agent.get("instruction"):
+                issues.append(ConfigIssue(f"{path}.instruction", "missing_field", f"LLM agent '{agent_name}' missing required 'instruction' field"))
+        elif agent_type in WORKFLOW_AGENT_TYPES and not sub_agents:
+            issues.append(ConfigIssue(f"{path}.sub_agents", "missing_sub_agents",
+                                      f"{agent_type} agent '{agent_name}' needs at least one sub-agent"))
+
+    for tool_name, tool in tools.items():
+        path = f"$.tools.{tool_name}"
+        if not isinstance(tool, dict):
+            issues.append(ConfigIssue(path, "invalid_type", f"Tool '{tool_name}' must be an object"))
+            continue
+
+        tool_type = tool.get("type")
+        if tool_type not in TOOL_TYPES:
+            issues.append(ConfigIssue(f"{path}.type", "unknown_tool_type", f"Tool '{tool_name}' has unknown type '{tool_type}'"))
+        elif tool_type == "builtin":
+            builtin_type = _value(tool.get("builtin_type"))
+            if not builtin_type:
+                issues.append(ConfigIssue(f"{path}.builtin_type", "missing_field", f"Builtin tool '{tool_name}' missing builtin_type"))
+            elif builtin_type not in BUILTIN_TOOL_TYPES:
+                issues.append(ConfigIssue(f"{path}.builtin_type", "unknown_builtin_type",
+                                          f"Builtin tool '{tool_name}' has unknown builtin_type '{builtin_type}'"))
+        elif not tool.get("function_code"):
+            issues.append(ConfigIssue(f"{path}.function_code", "missing_field", f"Custom tool '{tool_name}' missing function_code"))
+
+    return issues
+
+
+class ValidationCache:
+    """Bounded LRU of config hash -> validation issues."""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[ConfigIssue, ...]]" = OrderedDict()
+
+    def get(self, key: str):
+        issues = self._entries.get(key)
+        if issues is not None:
+            self._entries.move_to_end(key)
+        return issues
+
+    def put(self, key: str, issues: List[ConfigIssue]):
+        self._entries[key] = tuple(issues)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+_validation_cache = ValidationCache()
+
+
+def validate_config_cached(config: Dict[str, Any]) -> Tuple[str, List[ConfigIssue], bool]:
+    """
+    Validate a configuration, skipping the work if this exact config was seen before.
+
+    Returns:
+        Tuple of (config hash, issues, whether the result came from the cache)
+    """
+    key = config_hash(config)
+    cached = _validation_cache.get(key)
+    if cached is not None:
+        return key, list(cached), True
+
+    issues = validate_config_dict(config)
+    _validation_cache.put(key, issues)
+    return key, issues, False
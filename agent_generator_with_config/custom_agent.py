@@ -7,7 +7,9 @@ import os
 import json
 from dotenv import load_dotenv
 from google import genai
+from google.genai import types
 from code_generator import generate_agent_from_dict
+from meta_agent.extraction import extract_json, JSONExtractionError
 
 # Load environment
 load_dotenv()
@@ -72,20 +74,13 @@ Return ONLY the JSON, no explanation."""
         
         response = client.models.generate_content(
             model="gemini-flash-latest",
-            contents=prompt
+            contents=prompt,
+            config=types.GenerateContentConfig(response_mime_type="application/json")
         )
         
-        # Extract JSON from response
+        # Extract JSON from response (tolerates fences, commentary and truncation)
         response_text = response.text.strip()
-        
-        # Remove markdown code blocks if present
-        if "```json" in response_text:
-            response_text = response_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_text:
-            response_text = response_text.split("```")[1].split("```")[0].strip()
-        
-        # Parse JSON
-        config = json.loads(response_text)
+        config = extract_json(response_text, required_keys=("project_name", "agents"))
         
         print("✅ AI designed the agent configuration!")
         print()
@@ -95,7 +90,7 @@ Return ONLY the JSON, no explanation."""
         
         return config
         
-    except json.JSONDecodeError as e:
+    except JSONExtractionError as e:
         print(f"❌ Failed to parse AI response as JSON: {e}")
         print(f"Response was: {response_text[:200]}...")
         return None
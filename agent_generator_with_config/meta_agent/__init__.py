@@ -12,9 +12,20 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-"""Agent Creator Meta-Agent Package."""
+"""
+Agent Creator Meta-Agent Package.
 
-from .agent import root_agent, agent_creator_orchestrator
+root_agent and agent_creator_orchestrator are imported on first access:
+building them loads ADK, which users of the pipeline modules (orchestrator,
+config, routing, ...) don't need.
+"""
 
 __version__ = "1.0.0"
-__all__ = ["root_agent", "agent_creator_orchestrator"] 
\ No newline at end of file
+__all__ = ["root_agent", "agent_creator_orchestrator"]
+
+
+def __getattr__(name):
+    if name in __all__:
+        from . import agent
+        return getattr(agent, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}") 
\ No newline at end of file
@@ -16,10 +16,11 @@
 
 import os
 import logging
+from functools import lru_cache
+from typing import Dict, List, Tuple
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import BaseModel, Field
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 
@@ -30,6 +31,50 @@ class AgentModel(BaseModel):
     model: str = Field(default="gemini-2.0-flash")
 
 
+class ModelTier(BaseModel):
+    """A model tier: the primary model first, then fallbacks in order."""
+    
+    models: List[str] = Field(min_length=1)
+    latency_slo_ms: int = Field(default=0)  # Soft target; a model whose p95 exceeds it is demoted (0 = none)
+    timeout_ms: int = Field(default=0)      # Hard per-call timeout before falling back (0 = none)
+
+
+def _default_model_tiers() -> Dict[str, ModelTier]:
+    return {
+        "fast": ModelTier(
+            models=["gemini-flash-lite-latest", "gemini-flash-latest"],
+            latency_slo_ms=8000,
+            timeout_ms=60000
+        ),
+        "strong": ModelTier(
+            models=["gemini-2.5-pro", "gemini-flash-latest"],
+            latency_slo_ms=45000,
+            timeout_ms=120000
+        ),
+    }
+
+
+def _default_step_routes() -> Dict[str, str]:
+    return {
+        "requirements": "fast",
+        "architecture": "fast",
+        "agent_instructions": "fast",
+        "tool_code": "strong",
+        "chat_summary": "fast",
+        "other": "fast",
+    }
+
+
+def _default_model_prices() -> Dict[str, Tuple[float, float]]:
+    # USD per million (input, output) tokens, used for cost stats only
+    return {
+        "gemini-flash-lite-latest": (0.10, 0.40),
+        "gemini-flash-latest": (0.30, 2.50),
+        "gemini-2.5-pro": (1.25, 10.00),
+        "gemini-2.0-flash": (0.10, 0.40),
+    }
+
+
 class Config(BaseSettings):
     """Configuration settings for the agent creator meta-agent."""
     
@@ -50,6 +95,28 @@ class Config(BaseSettings):
     SESSION_TIMEOUT_MINUTES: int = Field(default=30)
     MAX_AGENTS_PER_PROJECT: int = Field(default=10)
     MAX_TOOLS_PER_PROJECT: int = Field(default=20)
+    BLOB_STORE_DIR: str = Field(default="")  # Opt-in: hard-link generated files to shared blobs (same filesystem)
+    
+    # Model routing: pipeline step -> tier -> models (primary first, then fallbacks)
+    MODEL_TIERS: Dict[str, ModelTier] = Field(default_factory=_default_model_tiers)
+    STEP_ROUTES: Dict[str, str] = Field(default_factory=_default_step_routes)
+    MODEL_PRICES: Dict[str, Tuple[float, float]] = Field(default_factory=_default_model_prices)
+    
+    # Hedged LLM requests (opt-in): duplicate a call that runs past its step's p95
+    HEDGE_REQUESTS: bool = Field(default=False)
+    HEDGE_BUDGET_FRACTION: float = Field(default=0.05)  # Max hedges per primary call
+    HEDGE_MIN_SAMPLES: int = Field(default=20)
+    HEDGE_PERCENTILE: float = Field(default=0.95)
+    
+    # Domain templates: requests that clearly match a registry domain skip the requirements
+    # call and are planned on top of the domain's template
+    USE_TEMPLATES: bool = Field(default=True)
+    DOMAIN_REGISTRY_PATH: str = Field(default="")  # Empty = frontend/lib/domain-registry.json
+    TEMPLATE_MIN_SCORE: float = Field(default=0.3)
+    TEMPLATE_MIN_MARGIN: float = Field(default=0.05)
+    
+    # Vetted tools (meta_agent/tool_library) are used instead of generating matching tools
+    USE_TOOL_LIBRARY: bool = Field(default=True)
     
     # Cloud settings (optional)
     CLOUD_PROJECT: str = Field(default="")
@@ -61,4 +128,19 @@ class Config(BaseSettings):
     GOOGLE_API_KEY: str | None = Field(default="")
     GOOGLE_SEARCH_ENGINE_ID: str | None = Field(default="")
     GOOGLE_CLOUD_PROJECT: str | None = Field(default="")
-    GOOGLE_GENAI_USE_VERTEXAI: str | None = Field(default="") 
\ No newline at end of file
+    GOOGLE_GENAI_USE_VERTEXAI: str | None = Field(default="")
+    
+    def tier_for_step(self, step: str) -> ModelTier:
+        """Model tier a pipeline step is routed to (unknown steps use the "other" route)."""
+        tier_name = self.STEP_ROUTES.get(step) or self.STEP_ROUTES.get("other", "fast")
+        return self.MODEL_TIERS[tier_name]
+    
+    def model_for_step(self, step: str) -> str:
+        """Primary model for a pipeline step."""
+        return self.tier_for_step(step).models[0]
+
+
+@lru_cache(maxsize=1)
+def get_config() -> Config:
+    """Shared settings instance (read once per process)."""
+    return Config()
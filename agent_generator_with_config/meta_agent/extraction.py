@@ -0,0 +1,480 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Extraction of structured content (tool code, JSON) from LLM responses."""
+
+import ast
+import json
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# Fenced code blocks; the closing fence is optional so truncated output still yields a candidate
+_FENCE_RE = re.compile(r"```[ \t]*([A-Za-z0-9_+-]*)[ \t]*\n(.*?)(?:```|\Z)", re.DOTALL)
+_CODE_START_RE = re.compile(r"^(?:import |from \S+ import |def |async def |@)", re.MULTILINE)
+
+# Import name -> pip package, where they differ
+PACKAGE_NAMES = {
+    "bs4": "beautifulsoup4",
+    "yaml": "pyyaml",
+    "PIL": "pillow",
+    "sklearn": "scikit-learn",
+    "cv2": "opencv-python",
+    "dateutil": "python-dateutil",
+    "dotenv": "python-dotenv",
+    "docx": "python-docx",
+    "pptx": "python-pptx",
+    "jwt": "pyjwt",
+    "serial": "pyserial",
+    "Crypto": "pycryptodome",
+    "google.genai": "google-genai",
+    "googleapiclient": "google-api-python-client",
+    "google.cloud.storage": "google-cloud-storage",
+    "google.cloud.firestore": "google-cloud-firestore",
+    "google.cloud.bigquery": "google-cloud-bigquery",
+}
+
+# Already provided by every generated project
+PROVIDED_MODULES = {"google.adk"}
+
+
+@dataclass
+class ExtractedTool:
+    """A tool function pulled out of an LLM response."""
+    function_name: str
+    function_code: str
+    imports: List[str] = field(default_factory=list)
+    dependencies: List[str] = field(default_factory=list)
+
+
+def _candidate_blocks(text: str) -> Iterator[str]:
+    """Code candidates in preference order: python fences, other fences, then bare code."""
+    fences = [(lang.lower(), body) for lang, body in _FENCE_RE.findall(text)]
+    for lang, body in fences:
+        if lang in ("python", "py", "python3"):
+            yield body
+    for lang, body in fences:
+        if lang not in ("python", "py", "python3"):
+            yield body
+
+    match = _CODE_START_RE.search(text)
+    if match:
+        yield text[match.start():]
+
+
+def _parse_prefix(code: str) -> Optional[ast.Module]:
+    """Parse code, dropping trailing lines (prose, truncation) until it parses."""
+    lines = code.rstrip().splitlines()
+    while lines:
+        try:
+            return ast.parse("\n".join(lines))
+        except SyntaxError as e:
+            # Cut at the error line when it is past the start, else drop one line
+            cut = (e.lineno or len(lines)) - 1
+            lines = lines[:cut] if 0 < cut < len(lines) else lines[:-1]
+    return None
+
+
+def _node_source(lines: List[str], node: ast.stmt) -> str:
+    """Source of a top-level statement including its decorators."""
+    start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+    return "\n".join(lines[start - 1:node.end_lineno])
+
+
+def _referenced_names(node: ast.AST) -> Set[str]:
+    return {n.id for n in ast.walk(node) if isinstance(n, ast.Name)}
+
+
+def _bound_by(node: ast.stmt) -> Set[str]:
+    """Names a top-level statement binds."""
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return {node.name}
+    if isinstance(node, (ast.Import, ast.ImportFrom)):
+        return {alias.asname or alias.name.split(".")[0] for alias in node.names}
+    if isinstance(node, (ast.Assign, ast.AnnAssign, ast.AugAssign)):
+        targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+        return {n.id for t in targets for n in ast.walk(t) if isinstance(n, ast.Name)}
+    return set()
+
+
+def _imported_modules(nodes: List[ast.AST]) -> List[str]:
+    """Dotted module names imported anywhere inside the given nodes."""
+    modules = []
+    for root in nodes:
+        for node in ast.walk(root):
+            if isinstance(node, ast.Import):
+                modules.extend(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                modules.append(node.module)
+    return modules
+
+
+def infer_dependencies(modules: List[str]) -> List[str]:
+    """Map imported module names to pip packages, skipping the standard library."""
+    stdlib = getattr(sys, "stdlib_module_names", set())
+    packages = []
+    for module in modules:
+        top = module.split(".")[0]
+        if top in stdlib or top == "__future__":
+            continue
+        if any(module == p or module.startswith(p + ".") for p in PROVIDED_MODULES):
+            continue
+        package = None
+        for prefix in sorted(PACKAGE_NAMES, key=len, reverse=True):
+            if module == prefix or module.startswith(prefix + "."):
+                package = PACKAGE_NAMES[prefix]
+                break
+        package = package or top
+        if package not in packages:
+            packages.append(package)
+    return packages
+
+
+def extract_tool_code(response: str, tool_name: str) -> Optional[ExtractedTool]:
+    """
+    Extract a tool function from an LLM response.
+
+    Every fenced block (and, failing that, the bare code in the response) is
+    parsed with ``ast``. The function named ``tool_name`` is selected, or the
+    first function if no name matches, in which case it is renamed. Helper
+    functions, classes and constants it references are kept. Top-level imports
+    it needs become ``imports`` and third-party modules become ``dependencies``.
+
+    Args:
+        response: Raw model response text
+        tool_name: Expected function name
+
+    Returns:
+        ExtractedTool, or None if no function could be found
+    """
+    for block in _candidate_blocks(response):
+        tree = _parse_prefix(block)
+        if tree is None:
+            continue
+
+        functions = [n for n in tree.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]
+        if not functions:
+            continue
+        target = next((f for f in functions if f.name == tool_name), functions[0])
+
+        # Keep the target plus any top-level definitions it (transitively) references
+        definitions = {
+            name: node for node in tree.body
+            if not isinstance(node, (ast.Import, ast.ImportFrom))
+            for name in _bound_by(node)
+        }
+        kept = {id(target): target}
+        pending = [target]
+        while pending:
+            for name in _referenced_names(pending.pop()):
+                node = definitions.get(name)
+                if node is not None and id(node) not in kept:
+                    kept[id(node)] = node
+                    pending.append(node)
+
+        # Attribute roots (module.attr) and decorators are Names too
+        used = set()
+        for node in kept.values():
+            used |= _referenced_names(node)
+
+        # Parsed text is a line prefix of the block, so node line numbers index into it
+        lines = block.rstrip().splitlines()
+        import_nodes = [
+            node for node in tree.body
+            if isinstance(node, (ast.Import, ast.ImportFrom)) and _bound_by(node) & used
+        ]
+        imports = [_node_source(lines, node).strip() for node in import_nodes]
+
+        body = [node for node in tree.body if id(node) in kept]
+        code = "\n\n\n".join(_node_source(lines, node) for node in body)
+
+        if target.name != tool_name:
+            code = re.sub(rf"\b(async\s+def|def)\s+{re.escape(target.name)}\s*\(", rf"\1 {tool_name}(", code, count=1)
+
+        return ExtractedTool(
+            function_name=tool_name,
+            function_code=code.strip() + "\n",
+            imports=imports,
+            dependencies=infer_dependencies(_imported_modules(import_nodes + body))
+        )
+
+    return None
+
+
+# ---------------------------------------------------------------------------
+# JSON
+# ---------------------------------------------------------------------------
+
+_JSON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_CLOSERS = {"{": "}", "[": "]"}
+_MAX_TRUNCATION_CUTS = 50
+
+
+class JSONExtractionError(ValueError):
+    """No JSON object with the expected keys could be recovered from a response."""
+
+
+def _json_candidates(text: str) -> Iterator[str]:
+    """JSON candidates in preference order: json fences, other fences, then the raw text."""
+    fences = [(lang.lower(), body) for lang, body in _FENCE_RE.findall(text)]
+    for lang, body in fences:
+        if lang == "json":
+            yield body
+    for lang, body in fences:
+        if lang != "json":
+            yield body
+    yield text
+
+
+def _object_end(text: str, start: int) -> int:
+    """Index just past the bracket that closes the one at start, or len(text) if it never closes."""
+    depth = 0
+    in_string = False
+    escaped = False
+    for index in range(start, len(text)):
+        ch = text[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return index + 1
+    return len(text)
+
+
+def _decode_objects(text: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Complete JSON objects in text, scanning left to right with raw_decode.
+
+    An object that fails to decode (malformed or truncated) is skipped up to
+    its closing brace, or the end of the text, so one of its members is never
+    mistaken for the object itself.
+
+    Returns:
+        (top-level objects, objects found inside spans that failed to decode)
+    """
+    decoder = json.JSONDecoder()
+    objects: List[Dict[str, Any]] = []
+    inner: List[Dict[str, Any]] = []
+    index = text.find("{")
+    while index != -1:
+        try:
+            value, end = decoder.raw_decode(text, index)
+        except json.JSONDecodeError:
+            end = _object_end(text, index)
+            inner.extend(_decode_inner(text[index + 1:end]))
+        else:
+            if isinstance(value, dict):
+                objects.append(value)
+        index = text.find("{", end)
+    return objects, inner
+
+
+def _decode_inner(text: str) -> Iterator[Dict[str, Any]]:
+    """Every object that decodes at any "{" in text, nested ones included."""
+    decoder = json.JSONDecoder()
+    index = text.find("{")
+    while index != -1:
+        try:
+            value, _ = decoder.raw_decode(text, index)
+        except json.JSONDecodeError:
+            pass
+        else:
+            if isinstance(value, dict):
+                yield value
+        index = text.find("{", index + 1)
+
+
+def _repair_json(text: str) -> Optional[str]:
+    """
+    Repair the common defects of model-written JSON, starting at the first "{".
+
+    Comments are dropped, Python literals (True/False/None) become JSON ones,
+    trailing commas are removed and, if the text is truncated, the open
+    string and brackets are closed.
+    """
+    start = text.find("{")
+    if start == -1:
+        return None
+
+    out: List[str] = []
+    stack: List[str] = []
+    in_string = False
+    escaped = False
+    i = start
+    n = len(text)
+
+    while i < n:
+        ch = text[i]
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            i += 1
+            continue
+
+        if ch == '"':
+            in_string = True
+            out.append(ch)
+        elif text.startswith("//", i) or ch == "#":
+            newline = text.find("\n", i)
+            i = n if newline == -1 else newline
+            continue
+        elif text.startswith("/*", i):
+            close = text.find("*/", i + 2)
+            i = n if close == -1 else close + 2
+            continue
+        elif ch in _CLOSERS:
+            stack.append(ch)
+            out.append(ch)
+        elif ch in "}]":
+            _strip_trailing_comma(out)
+            if stack:
+                stack.pop()
+            out.append(ch)
+            if not stack:
+                return "".join(out)
+        elif ch.isalpha():
+            end = i
+            while end < n and (text[end].isalnum() or text[end] == "_"):
+                end += 1
+            word = text[i:end]
+            out.append(_JSON_LITERALS.get(word, word))
+            i = end
+            continue
+        else:
+            out.append(ch)
+        i += 1
+
+    # Truncated: close whatever is still open
+    if in_string:
+        if escaped:
+            out.pop()
+        out.append('"')
+    text = "".join(out).rstrip()
+    if text.endswith(":"):
+        text += " null"
+    out = list(text)
+    _strip_trailing_comma(out)
+    for opener in reversed(stack):
+        out.append(_CLOSERS[opener])
+    return "".join(out)
+
+
+def _strip_trailing_comma(out: List[str]):
+    """Drop trailing whitespace and one comma from the output buffer."""
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+
+
+def _truncation_cuts(text: str) -> Iterator[str]:
+    """Prefixes of text ending before each top-level-ish comma, longest first."""
+    in_string = False
+    escaped = False
+    commas = []
+    for index, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == ",":
+            commas.append(index)
+    for index in reversed(commas[-_MAX_TRUNCATION_CUTS:]):
+        yield text[:index]
+
+
+def extract_json(text: str, required_keys: Iterable[str] = (), known_keys: Iterable[str] = ()) -> Dict[str, Any]:
+    """
+    Extract a JSON object from an LLM response.
+
+    Fenced blocks are tried first, then the whole response. Within each, every
+    complete object is decoded in turn and the first that has all
+    ``required_keys`` wins, so leading or trailing commentary and extra
+    objects are ignored. If nothing decodes cleanly, common defects (comments,
+    trailing commas, Python literals, truncated output) are repaired. For
+    truncated output, incomplete trailing members are dropped until the
+    object parses. Only then, and only when keys are given, is an object
+    nested inside a broken one accepted - never a fragment in place of the
+    object the response was meant to be.
+
+    Args:
+        text: Raw model response text
+        required_keys: Keys the object must contain
+        known_keys: Keys the object may contain; it must have at least one
+
+    Returns:
+        The extracted object
+
+    Raises:
+        JSONExtractionError: If no suitable object could be recovered
+    """
+    required = tuple(required_keys)
+    known = tuple(known_keys)
+
+    def suitable(value: Dict[str, Any]) -> bool:
+        return all(key in value for key in required) and (not known or any(key in value for key in known))
+
+    candidates = list(_json_candidates(text or ""))
+    decoded = [_decode_objects(candidate) for candidate in candidates]
+
+    for objects, _ in decoded:
+        for value in objects:
+            if suitable(value):
+                return value
+
+    for candidate in candidates:
+        repaired = _repair_json(candidate)
+        if repaired is None:
+            continue
+        attempts = [repaired]
+        attempts.extend(filter(None, (_repair_json(cut) for cut in _truncation_cuts(candidate[candidate.find("{"):]))))
+        for attempt in attempts:
+            try:
+                value = json.loads(attempt)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(value, dict) and suitable(value):
+                return value
+
+    if required or known:
+        for _, inner in decoded:
+            for value in inner:
+                if suitable(value):
+                    return value
+
+    snippet = (text or "").strip()[:200]
+    if required:
+        raise JSONExtractionError(f"No JSON object with keys {list(required)} found in response: {snippet!r}")
+    raise JSONExtractionError(f"No JSON object found in response: {snippet!r}")
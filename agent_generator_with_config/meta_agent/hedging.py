@@ -0,0 +1,173 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Hedged requests for LLM calls.
+
+If a call is still running after the rolling p95 latency for its step, an
+identical duplicate is started and whichever finishes first wins; the other
+is cancelled. Hedges are capped by a process-wide budget (a fraction of
+primary calls) so tail-latency savings never multiply quota use.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from .config import get_config
+
+T = TypeVar("T")
+
+
+class HedgePolicy:
+    """Per-step latency windows plus a global hedge budget."""
+
+    def __init__(
+        self,
+        budget_fraction: float = 0.05,
+        budget_burst: int = 2,
+        min_samples: int = 20,
+        percentile: float = 0.95,
+        min_delay_ms: float = 500.0,
+        window: int = 200
+    ):
+        """
+        Args:
+            budget_fraction: Hedges allowed per primary call, over the process lifetime
+            budget_burst: Hedges allowed before enough primary calls have accrued budget
+            min_samples: Latencies needed for a step before it is hedged
+            percentile: Latency percentile that triggers a hedge
+            min_delay_ms: Never hedge earlier than this
+            window: Latencies kept per step
+        """
+        self.budget_fraction = budget_fraction
+        self.budget_burst = budget_burst
+        self.min_samples = min_samples
+        self.percentile = percentile
+        self.min_delay_ms = min_delay_ms
+        self.window = window
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._primary_calls = 0
+        self._hedges = 0
+        self._hedge_wins = 0
+        self._lock = threading.Lock()
+
+    def observe(self, step: str, latency_ms: float):
+        """Record the latency of a single (non-cancelled) request."""
+        with self._lock:
+            self._latencies.setdefault(step, deque(maxlen=self.window)).append(latency_ms)
+
+    def delay_for(self, step: str) -> Optional[float]:
+        """Seconds to wait before hedging a call for this step, or None if it should not be hedged."""
+        with self._lock:
+            latencies = self._latencies.get(step)
+            if not latencies or len(latencies) < self.min_samples:
+                return None
+            ordered = sorted(latencies)
+        index = min(len(ordered) - 1, max(0, math.ceil(self.percentile * len(ordered)) - 1))
+        return max(ordered[index], self.min_delay_ms) / 1000
+
+    def start_primary(self):
+        with self._lock:
+            self._primary_calls += 1
+
+    def try_acquire(self) -> bool:
+        """Take one hedge from the global budget, if any is left."""
+        with self._lock:
+            allowed = self._primary_calls * self.budget_fraction + self.budget_burst
+            if self._hedges + 1 > allowed:
+                return False
+            self._hedges += 1
+            return True
+
+    def record_hedge_win(self):
+        with self._lock:
+            self._hedge_wins += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "primary_calls": self._primary_calls,
+                "hedges": self._hedges,
+                "hedge_wins": self._hedge_wins,
+                "hedge_rate": round(self._hedges / self._primary_calls, 4) if self._primary_calls else 0.0,
+            }
+
+
+async def hedged(make_call: Callable[[], Awaitable[T]], policy: Optional[HedgePolicy], step: str) -> T:
+    """
+    Await make_call(), hedging it with a duplicate if it runs past the step's p95.
+
+    Args:
+        make_call: Factory returning a fresh awaitable for the request
+        policy: Hedge policy; None disables hedging
+        step: Pipeline step the call belongs to
+
+    Returns:
+        The result of whichever request finished first successfully
+    """
+    if policy is None:
+        return await make_call()
+
+    async def timed() -> T:
+        started = time.perf_counter()
+        result = await make_call()
+        policy.observe(step, (time.perf_counter() - started) * 1000)
+        return result
+
+    policy.start_primary()
+    primary = asyncio.ensure_future(timed())
+    delay = policy.delay_for(step)
+    if delay is None:
+        return await primary
+
+    done, _ = await asyncio.wait({primary}, timeout=delay)
+    if done or not policy.try_acquire():
+        return await primary
+
+    hedge = asyncio.ensure_future(timed())
+    pending = {primary, hedge}
+    error: Optional[BaseException] = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        policy.record_hedge_win()
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+_policy: Optional[HedgePolicy] = None
+
+
+def get_hedge_policy() -> HedgePolicy:
+    """Process-wide policy so the budget and latency windows are shared by all sessions."""
+    global _policy
+    if _policy is None:
+        config = get_config()
+        _policy = HedgePolicy(
+            budget_fraction=config.HEDGE_BUDGET_FRACTION,
+            min_samples=config.HEDGE_MIN_SAMPLES,
+            percentile=config.HEDGE_PERCENTILE
+        )
+    return _policy
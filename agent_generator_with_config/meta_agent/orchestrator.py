@@ -6,9 +6,11 @@ Maintains sophisticated 6-step workflow for frontend integration
 
 import os
 import json
+import time
 import uuid
+import asyncio
 from datetime import datetime
-from typing import Dict, Any, Callable, Optional
+from typing import Dict, Any, Callable, List, Optional
 from google import genai
 from dotenv import load_dotenv
 
@@ -23,9 +25,23 @@ from .tools.config_merger import (
     create_project,
     add_agent_to_config,
     add_tool_to_config,
-    get_full_config
+    update_tool_in_config
 )
 from .tools.code_generator import generate_agent_code
+from .extraction import ExtractedTool, extract_tool_code
+from .prompt_budget import PromptAssembler, TokenUsage, compact_json
+from .routing import get_router
+from .hedging import get_hedge_policy, hedged
+from .schemas import RequirementsAnalysis, ArchitecturePlan, parse_model, parse_plan
+from .templates import BUILTIN_TOOLS, TemplateMatch, get_template_library, template_problems
+from .tool_library import get_tool_library
+from .tools.code_checker import (
+    CodeIssue,
+    check_tool_code,
+    check_project_tools,
+    smoke_test_agent_source,
+    format_issues
+)
 
 load_dotenv()
 
@@ -36,7 +52,16 @@ class MetaAgentOrchestrator:
     Maps perfectly to frontend's step-by-step UI.
     """
     
-    def __init__(self, api_key: Optional[str] = None, progress_callback: Optional[Callable] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        progress_callback: Optional[Callable] = None,
+        validate_generated_code: bool = True,
+        max_tool_repairs: int = 1,
+        hedge_requests: Optional[bool] = None,
+        use_templates: Optional[bool] = None,
+        use_tool_library: Optional[bool] = None
+    ):
         """
         Initialize orchestrator.
         
@@ -44,47 +69,116 @@ class MetaAgentOrchestrator:
             api_key: Google API key (uses env var if not provided)
             progress_callback: Function to call with progress updates
                               Signature: callback(step: int, status: str, data: dict)
+            validate_generated_code: Compile-check tools and import-smoke the
+                                     generated agent.py after step 6
+            max_tool_repairs: How many times a broken tool is regenerated
+            hedge_requests: Send a duplicate LLM request when one runs past its
+                            step's p95 latency (defaults to Config.HEDGE_REQUESTS)
+            use_templates: Start requests that clearly match a registry domain
+                           from its template: step 1's LLM call is skipped and
+                           step 2 extends the template's plan
+                           (defaults to Config.USE_TEMPLATES)
+            use_tool_library: Take tools the vetted tool library has instead of
+                              generating them (defaults to Config.USE_TOOL_LIBRARY)
         """
         self.api_key = api_key or os.getenv("GOOGLE_API_KEY")
         if not self.api_key:
             raise ValueError("GOOGLE_API_KEY not found in environment")
         
         self.client = genai.Client(api_key=self.api_key)
-        self.model = "gemini-flash-latest"  # Working model
+        self.router = get_router()
+        self.model = self.router.config.model_for_step("other")  # Default; each call is routed by step
+        if hedge_requests is None:
+            hedge_requests = self.router.config.HEDGE_REQUESTS
+        self.hedger = get_hedge_policy() if hedge_requests else None
+        if use_templates is None:
+            use_templates = self.router.config.USE_TEMPLATES
+        self.templates = get_template_library() if use_templates else None
+        if use_tool_library is None:
+            use_tool_library = self.router.config.USE_TOOL_LIBRARY
+        self.tool_library = get_tool_library() if use_tool_library else None
+        self.prompts = PromptAssembler(self.client, self.model, api_key=self.api_key)
+        self.usage = TokenUsage()
         self.progress_callback = progress_callback
         self.session_id = None
+        self.validate_generated_code = validate_generated_code
+        self.max_tool_repairs = max_tool_repairs
         
-    def _call_gemini(self, prompt: str, system_prompt: str, max_retries: int = 3) -> str:
-        """Call Gemini API with system prompt + user prompt. Retry on rate limit."""
-        import time
+    async def _call_gemini(
+        self,
+        prompt: str,
+        system_prompt: str,
+        max_retries: int = 3,
+        json_output: bool = False,
+        response_schema: Any = None,
+        step: str = "other"
+    ) -> str:
+        """
+        Call Gemini API with system prompt + user prompt. Retry on rate limit.
         
-        full_prompt = f"{system_prompt}\n\nUser Request: {prompt}\n\nProvide your response:"
+        The model comes from the step's routing tier. If a model errors or
+        stays rate limited, the next model in the tier is tried. With hedging
+        enabled, a call that runs past its step's p95 is duplicated.
         
-        for attempt in range(max_retries):
-            try:
-                response = self.client.models.generate_content(
-                    model=self.model,
-                    contents=full_prompt
-                )
-                return response.text.strip()
-                
-            except Exception as e:
-                error_msg = str(e).lower()
-                # Ignore rate limit errors as requested
-                if "rate limit" in error_msg or "quota" in error_msg or "429" in error_msg:
-                    if attempt < max_retries - 1:
-                        wait_time = (attempt + 1) * 2  # Exponential backoff: 2s, 4s, 6s
-                        print(f"Rate limit hit, retrying in {wait_time}s... (attempt {attempt + 1}/{max_retries})")
-                        time.sleep(wait_time)
+        Args:
+            json_output: Ask the model for JSON output mode (application/json)
+            response_schema: Optional schema the JSON output must follow
+            step: Pipeline step, used for model routing and usage accounting
+        """
+        contents = self.prompts.user_contents(prompt)
+        estimated_tokens = self.prompts.count_tokens(system_prompt, prompt)
+        timeout_ms = self.router.timeout_ms(step)
+        rate_limited = False
+        last_error = None
+        
+        for position, model in enumerate(self.router.candidates(step)):
+            config = await self.prompts.build_config(system_prompt, json_output, response_schema, model, timeout_ms)
+            
+            for attempt in range(max_retries):
+                try:
+                    started = time.perf_counter()
+                    response = await hedged(
+                        lambda: self.client.aio.models.generate_content(
+                            model=model,
+                            contents=contents,
+                            config=config
+                        ),
+                        self.hedger,
+                        step
+                    )
+                    latency_ms = (time.perf_counter() - started) * 1000
+                    usage_metadata = getattr(response, "usage_metadata", None)
+                    self.router.record_success(step, model, latency_ms, usage_metadata, fallback=position > 0)
+                    self.usage.record(step, estimated_tokens, usage_metadata, latency_ms)
+                    return response.text.strip()
+                    
+                except Exception as e:
+                    last_error = e
+                    error_msg = str(e).lower()
+                    if config.cached_content and "cache" in error_msg and attempt < max_retries - 1:
+                        # Cache expired or was evicted provider-side: rebuild it (or go inline)
+                        self.prompts.invalidate(system_prompt, model)
+                        config = await self.prompts.build_config(system_prompt, json_output, response_schema, model, timeout_ms)
                         continue
+                    # Ignore rate limit errors as requested
+                    if "rate limit" in error_msg or "quota" in error_msg or "429" in error_msg:
+                        rate_limited = True
+                        if attempt < max_retries - 1:
+                            wait_time = (attempt + 1) * 2  # Exponential backoff: 2s, 4s, 6s
+                            print(f"Rate limit hit, retrying in {wait_time}s... (attempt {attempt + 1}/{max_retries})")
+                            await asyncio.sleep(wait_time)
+                            continue
+                        self.router.record_error(step, model, cooldown=False)
                     else:
-                        print(f"Rate limit - using cached/default response")
-                        return '{"success": true, "message": "Rate limited, using defaults"}'
-                else:
-                    # Non-rate-limit error, raise immediately
-                    raise
+                        rate_limited = False
+                        self.router.record_error(step, model)
+                    print(f"[ROUTER] {model} failed for step '{step}': {e}")
+                    break
         
-        return response.text.strip()
+        if rate_limited:
+            print(f"Rate limit - using cached/default response")
+            return '{"success": true, "message": "Rate limited, using defaults"}'
+        raise last_error
     
     
     async def _update_progress(self, step: int, status: str, data: Dict[str, Any] = None):
@@ -97,47 +191,48 @@ class MetaAgentOrchestrator:
             else:
                 self.progress_callback(step, status, data or {})
     
-    
-    def _extract_json(self, text: str) -> Dict[str, Any]:
-        """Extract JSON from response text."""
-        # Remove markdown code blocks
-        if "```json" in text:
-            text = text.split("```json")[1].split("```")[0].strip()
-        elif "```" in text:
-            text = text.split("```")[1].split("```")[0].strip()
-        
-        # Try to find JSON object
-        start = text.find("{")
-        end = text.rfind("}") + 1
-        if start != -1 and end > start:
-            text = text[start:end]
-        
-        return json.loads(text)
-    
-    async def create_agent(self, user_description: str, output_dir: str = "my_generated_agents") -> Dict[str, Any]:
+    async def create_agent(
+        self,
+        user_description: str,
+        output_dir: str = "my_generated_agents",
+        write_to_disk: bool = True
+    ) -> Dict[str, Any]:
         """
         Main entry point - creates agent through 6-step workflow.
         
         Args:
             user_description: Natural language description of agent
             output_dir: Where to save generated code
+            write_to_disk: Whether to write the project to output_dir. When False
+                           the generated files are only returned in memory.
             
         Returns:
-            Dict with session_id, config, and generated files
+            Dict with session_id, config, generated file names and file contents
         """
         # Generate session ID
         self.session_id = f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        self.usage = TokenUsage()
         
         try:
+            template = self._match_template(user_description)
+            template_plan = None
+            
             # STEP 1: Requirements Analysis
             await self._update_progress(1, "analyzing", {"message": "Analyzing requirements..."})
-            requirements = await self._step1_analyze_requirements(user_description)
-            await self._update_progress(1, "complete", {"requirements": requirements})
+            if template:
+                requirements, template_plan = template.template.instantiate(user_description)
+                await self._update_progress(1, "complete", {"requirements": requirements, "template": template.template.id})
+            else:
+                requirements = await self._step1_analyze_requirements(user_description)
+                await self._update_progress(1, "complete", {"requirements": requirements})
             
-            # STEP 2: Architecture Planning
+            # STEP 2: Architecture Planning (on top of the template's plan, if any)
             await self._update_progress(2, "planning", {"message": "Planning architecture..."})
-            architecture = await self._step2_plan_architecture(user_description, requirements)
-            await self._update_progress(2, "complete", {"architecture": architecture})
+            architecture = await self._step2_plan_architecture(user_description, requirements, template_plan)
+            step2_data = {"architecture": architecture}
+            if template:
+                step2_data["template"] = template.template.id
+            await self._update_progress(2, "complete", step2_data)
             
             # STEP 3: Project Setup
             await self._update_progress(3, "setup", {"message": "Setting up project..."})
@@ -156,7 +251,11 @@ class MetaAgentOrchestrator:
             
             # STEP 6: Generate Code
             await self._update_progress(6, "generating", {"message": "Generating code..."})
-            result = await self._step6_generate_code(output_dir, project_name)
+            result = await self._step6_generate_code(output_dir, project_name, write_to_disk)
+            if self.validate_generated_code:
+                await self._update_progress(6, "validating", {"message": "Validating generated code..."})
+                result = await self._validate_generated_code(result, output_dir, project_name, write_to_disk)
+            file_contents = result.pop("file_contents", {})
             await self._update_progress(6, "complete", result)
             
             # Extract output directory and files from result
@@ -169,23 +268,78 @@ class MetaAgentOrchestrator:
                 "project_name": project_name,
                 "config": result.get("project_config"),
                 "output_directory": output_directory,
-                "files": generated_files
+                "files": generated_files,
+                "file_contents": file_contents,
+                "token_usage": self.usage.to_dict()
             }
             
         except Exception as e:
             await self._update_progress(0, "error", {"error": str(e)})
             raise
     
+    def _match_template(self, user_description: str) -> Optional[TemplateMatch]:
+        """Registry domain the request clearly belongs to, if templates are enabled."""
+        if self.templates is None:
+            return None
+        config = self.router.config
+        match = self.templates.match(user_description, config.TEMPLATE_MIN_SCORE, config.TEMPLATE_MIN_MARGIN)
+        if match:
+            print(f"[TEMPLATE] Using '{match.template.id}' (score {match.score:.2f}, next {match.runner_up:.2f})")
+        return match
+    
     async def _step1_analyze_requirements(self, user_description: str) -> Dict[str, Any]:
         """Step 1: Analyze user requirements."""
-        response = self._call_gemini(user_description, REQUIREMENTS_ANALYZER_PROMPT)
-        return self._extract_json(response)
+        response = await self._call_gemini(
+            user_description, REQUIREMENTS_ANALYZER_PROMPT,
+            response_schema=RequirementsAnalysis, step="requirements"
+        )
+        return parse_model(RequirementsAnalysis, response).model_dump(mode="json")
     
-    async def _step2_plan_architecture(self, user_description: str, requirements: Dict) -> Dict[str, Any]:
-        """Step 2: Plan agent architecture."""
-        prompt = f"{user_description}\n\nRequirements: {json.dumps(requirements)}"
-        response = self._call_gemini(prompt, ARCHITECTURE_PLANNER_PROMPT)
-        return self._extract_json(response)
+    async def _step2_plan_architecture(
+        self,
+        user_description: str,
+        requirements: Dict,
+        template_plan: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Step 2: Plan agent architecture.
+        
+        The plan is checked for unknown agent types, dangling sub-agents and
+        duplicate names before any agents are built. A bad plan is re-requested
+        once with the problems as feedback.
+        
+        Args:
+            template_plan: Plan of the matched domain template. The planner
+                           keeps it and adds the agents and tools the request
+                           needs beyond it; a plan that drops template parts
+                           is rejected like any other bad plan.
+        """
+        # Requirements are context here; send them compacted
+        prompt = f"{user_description}\n\nRequirements: {compact_json(requirements)}"
+        if template_plan:
+            prompt += (
+                "\n\nStart from this domain template plan. Keep its agents, tools and sub-agents, "
+                "and add the agents and tools this request needs that the template doesn't cover:\n"
+                f"{compact_json(template_plan)}"
+            )
+        problems: List[str] = []
+        
+        for attempt in range(2):
+            if problems:
+                feedback = "\n".join(f"- {problem}" for problem in problems)
+                prompt += f"\n\nYour previous plan had these problems. Return a corrected plan:\n{feedback}"
+                print(f"[STEP2] Plan rejected, re-planning:\n{feedback}")
+            
+            response = await self._call_gemini(
+                prompt, ARCHITECTURE_PLANNER_PROMPT, response_schema=ArchitecturePlan, step="architecture"
+            )
+            plan, problems = parse_plan(response)
+            if plan is not None and template_plan:
+                problems += template_problems(template_plan, plan.model_dump(mode="json"))
+            if plan is not None and not problems:
+                return plan.model_dump(mode="json")
+        
+        raise ValueError("Architecture plan is invalid:\n" + "\n".join(f"- {problem}" for problem in problems))
     
     async def _step3_setup_project(self, architecture: Dict, description: str) -> str:
         """Step 3: Setup project configuration."""
@@ -251,7 +405,12 @@ class MetaAgentOrchestrator:
         return built_agents
     
     async def _step5_build_tools(self, architecture: Dict) -> list:
-        """Step 5: Build all tools."""
+        """
+        Step 5: Build all tools.
+        
+        ADK builtins are registered as-is and tools the vetted library has
+        are copied from it; only the rest are generated by the LLM.
+        """
         # Collect all unique tools from all agents
         all_tools = set()
         for agent_spec in architecture.get("agents", []):
@@ -260,8 +419,44 @@ class MetaAgentOrchestrator:
         built_tools = []
         
         for tool_name in all_tools:
-            # Generate tool code
-            tool_code = await self._generate_tool_code(tool_name)
+            if tool_name in BUILTIN_TOOLS:
+                add_tool_to_config(
+                    session_id=self.session_id,
+                    tool_name=tool_name,
+                    tool_type="builtin",
+                    description=f"Builtin tool: {tool_name}",
+                    builtin_type=tool_name
+                )
+                built_tools.append(tool_name)
+                continue
+            
+            library_tool = self.tool_library.find(tool_name) if self.tool_library else None
+            if library_tool is not None:
+                print(f"[STEP5] Using library tool '{library_tool.name}' v{library_tool.version} for '{tool_name}'")
+                tool = library_tool.as_tool(tool_name)
+                add_tool_to_config(
+                    session_id=self.session_id,
+                    tool_name=tool_name,
+                    tool_type="custom_function",
+                    description=library_tool.description,
+                    function_code=tool.function_code,
+                    imports=tool.imports,
+                    dependencies=tool.dependencies
+                )
+                built_tools.append(tool_name)
+                continue
+            
+            # Generate tool code (with the imports and dependencies it needs)
+            tool = await self._generate_tool_code(tool_name)
+            
+            # Compile-check in process and regenerate just this tool if broken
+            if self.validate_generated_code:
+                for _ in range(self.max_tool_repairs):
+                    issues = check_tool_code(tool_name, tool.function_code, tool.imports, all_tools)
+                    if not issues:
+                        break
+                    print(f"[STEP5] Tool '{tool_name}' failed checks, regenerating:\n{format_issues(issues)}")
+                    tool = await self._generate_tool_code(tool_name, feedback=format_issues(issues))
             
             # Add to project
             add_tool_to_config(
@@ -269,21 +464,23 @@ class MetaAgentOrchestrator:
                 tool_name=tool_name,
                 tool_type="custom_function",
                 description=f"Custom tool: {tool_name}",
-                function_code=tool_code,
-                imports=["import json", "from typing import Any"],
-                dependencies=[]
+                function_code=tool.function_code,
+                imports=tool.imports,
+                dependencies=tool.dependencies
             )
             
             built_tools.append(tool_name)
         
         return built_tools
     
-    async def _step6_generate_code(self, output_dir: str, project_name: str) -> Dict[str, Any]:
+    async def _step6_generate_code(self, output_dir: str, project_name: str, write_to_disk: bool = True) -> Dict[str, Any]:
         """Step 6: Generate final code."""
         try:
-            # Create project-specific directory
-            import os
-            project_output_dir = os.path.join(output_dir, project_name)
+            # Create project-specific directory. The name comes from the plan,
+            # so it must be a single folder inside output_dir.
+            project_output_dir = os.path.realpath(os.path.join(output_dir, project_name))
+            if os.path.dirname(project_output_dir) != os.path.realpath(output_dir):
+                raise ValueError(f"Project name '{project_name}' must be a single folder name")
             
             print(f"[STEP6] Generating code to: {project_output_dir}")
             print(f"[STEP6] Session ID: {self.session_id}")
@@ -291,7 +488,9 @@ class MetaAgentOrchestrator:
             result_json = generate_agent_code(
                 session_id=self.session_id,
                 output_base_dir=project_output_dir,
-                validate_config=True
+                validate_config=True,
+                write_to_disk=write_to_disk,
+                include_file_contents=True
             )
             
             print(f"[STEP6] generate_agent_code returned: {len(result_json)} chars")
@@ -319,6 +518,62 @@ class MetaAgentOrchestrator:
             traceback.print_exc()
             raise
     
+    async def _validate_generated_code(
+        self,
+        result: Dict[str, Any],
+        output_dir: str,
+        project_name: str,
+        write_to_disk: bool
+    ) -> Dict[str, Any]:
+        """
+        Post-generation validation: static tool checks, then an isolated import
+        smoke test of agent.py. Broken tools are regenerated individually and
+        the project is re-rendered.
+        """
+        for attempt in range(self.max_tool_repairs + 1):
+            project_config = result.get("project_config") or {}
+            broken = check_project_tools(project_config)
+            issues = [issue for tool_issues in broken.values() for issue in tool_issues]
+            
+            if not broken:
+                source = (result.get("file_contents") or {}).get("agent.py", "")
+                try:
+                    issues = await smoke_test_agent_source(source, project_config)
+                except Exception as e:
+                    print(f"[VALIDATE] Import smoke test unavailable: {e}")
+                    issues = []
+                for issue in issues:
+                    if issue.tool:
+                        broken.setdefault(issue.tool, []).append(issue)
+            
+            if not broken or attempt == self.max_tool_repairs:
+                if issues:
+                    print(f"[VALIDATE] Generated code still has issues:\n{format_issues(issues)}")
+                result["validation"] = {
+                    "ok": not issues,
+                    "issues": [issue.to_dict() for issue in issues]
+                }
+                return result
+            
+            for tool_name, tool_issues in broken.items():
+                print(f"[VALIDATE] Regenerating tool '{tool_name}':\n{format_issues(tool_issues)}")
+                await self._repair_tool(tool_name, tool_issues)
+            
+            result = await self._step6_generate_code(output_dir, project_name, write_to_disk)
+        
+        return result
+    
+    async def _repair_tool(self, tool_name: str, issues: List[CodeIssue]):
+        """Regenerate one tool with the failed checks as feedback."""
+        tool = await self._generate_tool_code(tool_name, feedback=format_issues(issues))
+        update_tool_in_config(
+            session_id=self.session_id,
+            tool_name=tool_name,
+            function_code=tool.function_code,
+            imports=tool.imports,
+            dependencies=tool.dependencies
+        )
+    
     async def _generate_agent_instruction(self, name: str, purpose: str, tools: list) -> str:
         """Generate detailed instruction for an agent."""
         prompt = f"""
@@ -329,43 +584,45 @@ Available Tools: {', '.join(tools) if tools else 'None'}
 Create a detailed instruction for this agent.
 """
         from .prompts import PROMPT_BUILDER_PROMPT
-        return self._call_gemini(prompt, PROMPT_BUILDER_PROMPT)
+        return await self._call_gemini(prompt, PROMPT_BUILDER_PROMPT, step="agent_instructions")
     
-    async def _generate_tool_code(self, tool_name: str) -> str:
-        """Generate Python code for a custom tool."""
+    async def _generate_tool_code(self, tool_name: str, feedback: Optional[str] = None) -> ExtractedTool:
+        """Generate Python code for a custom tool, optionally fixing a failed attempt."""
         prompt = f"Create a Python function for tool: {tool_name}"
+        if feedback:
+            prompt += (
+                f"\n\nThe previous version of `{tool_name}` failed these checks:\n{feedback}\n"
+                f"Return a corrected, self-contained function named `{tool_name}` "
+                f"with every import it needs inside a ```python block."
+            )
         
-        response = self._call_gemini(prompt, TOOL_BUILDER_PROMPT)
+        response = await self._call_gemini(prompt, TOOL_BUILDER_PROMPT, step="tool_code")
         
-        # Extract code from response
-        if "```python" in response:
-            code = response.split("```python")[1].split("```")[0].strip()
-        elif "def " in response:
-            # Find function definition
-            lines = response.split("\n")
-            code_lines = []
-            in_function = False
-            for line in lines:
-                if line.strip().startswith("def "):
-                    in_function = True
-                if in_function:
-                    code_lines.append(line)
-            code = "\n".join(code_lines)
-        else:
+        # Parse candidate code blocks with ast and pick the tool's function
+        extracted = extract_tool_code(response, tool_name)
+        if extracted is None:
             # Generate basic function
-            code = f"""def {tool_name}(*args, **kwargs):
+            extracted = ExtractedTool(
+                function_name=tool_name,
+                function_code=f"""def {tool_name}(*args, **kwargs):
     \"\"\"Custom tool: {tool_name}\"\"\"
     return "Tool executed successfully"
 """
+            )
         
-        return code
+        return extracted
 
 
 # Synchronous wrapper for backward compatibility
 class SyncMetaAgentOrchestrator(MetaAgentOrchestrator):
     """Synchronous version of orchestrator."""
     
-    def create_agent_sync(self, user_description: str, output_dir: str = "my_generated_agents") -> Dict[str, Any]:
+    def create_agent_sync(
+        self,
+        user_description: str,
+        output_dir: str = "my_generated_agents",
+        write_to_disk: bool = True
+    ) -> Dict[str, Any]:
         """Synchronous version of create_agent."""
         import asyncio
-        return asyncio.run(self.create_agent(user_description, output_dir))
+        return asyncio.run(self.create_agent(user_description, output_dir, write_to_disk))
@@ -0,0 +1,233 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Prompt assembly and token accounting for meta-agent LLM calls.
+
+- System prompts go in ``system_instruction`` instead of being pasted in front
+  of every request, so the static prefix is identical across calls.
+- Long system prompts are put in an explicit context cache where the model
+  supports it. Otherwise the plain system instruction is used.
+- Context passed between steps is compacted.
+- Token usage is recorded per step from each response's usage metadata.
+"""
+
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, field, asdict
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from google.genai import types  # Imported on use: google.genai.types is slow to load
+
+# Rough characters-per-token ratio for English prompts and JSON
+CHARS_PER_TOKEN = 4
+
+# Explicit caching has a minimum prefix size; shorter prompts are sent inline
+DEFAULT_MIN_CACHE_TOKENS = int(os.getenv("PROMPT_CACHE_MIN_TOKENS", 1024))
+DEFAULT_CACHE_TTL_SECONDS = int(os.getenv("PROMPT_CACHE_TTL_SECONDS", 3600))
+
+# After the provider rejects cache creation (4xx, e.g. caching not supported
+# for the model), don't ask again for this long; after a transient failure
+# (5xx, 429, network), only back off briefly
+UNCACHEABLE_RETRY_SECONDS = int(os.getenv("PROMPT_CACHE_UNSUPPORTED_RETRY_SECONDS", 3600))
+CACHE_ERROR_BACKOFF_SECONDS = int(os.getenv("PROMPT_CACHE_ERROR_BACKOFF_SECONDS", 60))
+
+# (api key fingerprint, model, prompt hash) -> (cache name, expires at)
+_cache_registry: Dict[Tuple[str, str, str], Tuple[str, float]] = {}
+# (api key fingerprint, model) -> time until which explicit caching is skipped
+_uncacheable: Dict[Tuple[str, str], float] = {}
+
+
+def _caching_rejected(error: Exception) -> bool:
+    """True for client errors (other than rate limiting) that retrying won't fix."""
+    code = getattr(error, "code", None)
+    return isinstance(code, int) and 400 <= code < 500 and code != 429
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used for budgeting before a call is made."""
+    return (len(text or "") + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def compact_json(data: Any) -> str:
+    """Serialize step context without whitespace or empty fields."""
+    def prune(value):
+        if isinstance(value, dict):
+            return {k: prune(v) for k, v in value.items() if v not in (None, "", [], {})}
+        if isinstance(value, list):
+            return [prune(v) for v in value]
+        return value
+    return json.dumps(prune(data), separators=(",", ":"), ensure_ascii=False)
+
+
+@dataclass
+class StepUsage:
+    """Token counts for one step (or for the whole session)."""
+    calls: int = 0
+    estimated_prompt_tokens: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    output_tokens: int = 0
+    total_tokens: int = 0
+    latency_ms: float = 0.0
+
+
+@dataclass
+class TokenUsage:
+    """Per-session token usage, broken down by step."""
+    steps: Dict[str, StepUsage] = field(default_factory=dict)
+
+    def record(self, step: str, estimated_prompt_tokens: int, usage_metadata: Any = None, latency_ms: float = 0.0):
+        """Add one call's usage. usage_metadata is the response's usage_metadata, if any."""
+        usage = self.steps.setdefault(step, StepUsage())
+        usage.calls += 1
+        usage.estimated_prompt_tokens += estimated_prompt_tokens
+        usage.latency_ms += latency_ms
+        if usage_metadata is not None:
+            usage.prompt_tokens += getattr(usage_metadata, "prompt_token_count", None) or 0
+            usage.cached_tokens += getattr(usage_metadata, "cached_content_token_count", None) or 0
+            usage.output_tokens += (
+                (getattr(usage_metadata, "candidates_token_count", None) or 0)
+                + (getattr(usage_metadata, "thoughts_token_count", None) or 0)
+            )
+            usage.total_tokens += getattr(usage_metadata, "total_token_count", None) or 0
+
+    def totals(self) -> StepUsage:
+        total = StepUsage()
+        for usage in self.steps.values():
+            for name, value in asdict(usage).items():
+                setattr(total, name, getattr(total, name) + value)
+        return total
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total": asdict(self.totals()),
+            "steps": {step: asdict(usage) for step, usage in self.steps.items()},
+        }
+
+
+class PromptAssembler:
+    """
+    Builds the contents and config for each LLM call.
+
+    One assembler is created per orchestrator; explicit caches are shared
+    process-wide so sessions reuse them until they expire.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        model: str,
+        api_key: str = "",
+        min_cache_tokens: int = DEFAULT_MIN_CACHE_TOKENS,
+        cache_ttl_seconds: int = DEFAULT_CACHE_TTL_SECONDS
+    ):
+        self.client = client
+        self.model = model
+        self.min_cache_tokens = min_cache_tokens
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self._key_fingerprint = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+    def user_contents(self, prompt: str) -> str:
+        """The per-call part of the request."""
+        return f"User Request: {prompt}\n\nProvide your response:"
+
+    def _cache_key(self, system_prompt: str, model: str) -> Tuple[str, str, str]:
+        return (self._key_fingerprint, model, hashlib.sha256(system_prompt.encode("utf-8")).hexdigest())
+
+    async def _cached_system_prompt(self, system_prompt: str, model: str) -> Optional[str]:
+        """Name of an explicit cache holding system_prompt, creating one if worthwhile."""
+        if estimate_tokens(system_prompt) < self.min_cache_tokens:
+            return None
+        unavailable = (self._key_fingerprint, model)
+        if time.time() < _uncacheable.get(unavailable, 0.0):
+            return None
+
+        key = self._cache_key(system_prompt, model)
+        if key in _cache_registry:
+            name, expires_at = _cache_registry[key]
+            # Leave a margin so a call never races the expiry
+            if time.time() < expires_at - 60:
+                return name
+
+        from google.genai import types
+        try:
+            cache = await self.client.aio.caches.create(
+                model=model,
+                config=types.CreateCachedContentConfig(
+                    system_instruction=system_prompt,
+                    ttl=f"{self.cache_ttl_seconds}s"
+                )
+            )
+        except Exception as e:
+            retry_after = UNCACHEABLE_RETRY_SECONDS if _caching_rejected(e) else CACHE_ERROR_BACKOFF_SECONDS
+            print(f"[PROMPT] Context caching unavailable for {model} (retrying in {retry_after}s), "
+                  f"sending system prompt inline: {e}")
+            _uncacheable[unavailable] = time.time() + retry_after
+            return None
+
+        _uncacheable.pop(unavailable, None)
+        _cache_registry[key] = (cache.name, time.time() + self.cache_ttl_seconds)
+        return cache.name
+
+    async def build_config(
+        self,
+        system_prompt: str,
+        json_output: bool = False,
+        response_schema: Any = None,
+        model: Optional[str] = None,
+        timeout_ms: Optional[int] = None
+    ) -> "types.GenerateContentConfig":
+        """
+        Generation config with the system prompt cached or set as system instruction.
+
+        Args:
+            model: Model the call goes to (defaults to the assembler's model)
+            timeout_ms: Per-call HTTP timeout
+        """
+        from google.genai import types
+        kwargs: Dict[str, Any] = {}
+        if json_output or response_schema is not None:
+            kwargs["response_mime_type"] = "application/json"
+            kwargs["response_schema"] = response_schema
+        if timeout_ms:
+            kwargs["http_options"] = types.HttpOptions(timeout=timeout_ms)
+
+        cache_name = await self._cached_system_prompt(system_prompt, model or self.model)
+        if cache_name:
+            kwargs["cached_content"] = cache_name
+        else:
+            kwargs["system_instruction"] = system_prompt
+        return types.GenerateContentConfig(**kwargs)
+
+    def invalidate(self, system_prompt: str, model: Optional[str] = None):
+        """Forget a cache entry, e.g. after the provider reports it expired."""
+        _cache_registry.pop(self._cache_key(system_prompt, model or self.model), None)
+
+    def count_tokens(self, system_prompt: str, prompt: str, exact: bool = False) -> int:
+        """
+        Prompt size for a call. Estimated by default; exact=True asks the
+        provider's count_tokens endpoint (one extra request).
+        """
+        contents = self.user_contents(prompt)
+        if exact:
+            try:
+                result = self.client.models.count_tokens(model=self.model, contents=[system_prompt, contents])
+                return result.total_tokens
+            except Exception:
+                pass
+        return estimate_tokens(system_prompt) + estimate_tokens(contents)
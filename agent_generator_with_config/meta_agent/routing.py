@@ -0,0 +1,190 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Model routing for the meta-agent pipeline.
+
+Each step is routed to a model tier from Config (e.g. a fast tier for
+requirements and architecture, a strong tier for tool code). Within a tier,
+models are tried in order:
+
+- A model that errored recently is skipped for a cooldown period.
+- A model whose rolling p95 latency exceeds the tier's SLO is demoted behind
+  the others. Only samples from the last LATENCY_MAX_AGE_SECONDS count, so a
+  demoted model - which then rarely gets calls - is tried first again once
+  its slow samples age out, and stays there if it has recovered.
+
+Latency, errors, fallbacks and estimated cost are tracked per (step, model).
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from .config import Config, ModelTier, get_config
+
+LATENCY_WINDOW = 50        # Calls kept per model for the rolling p95
+MIN_SLO_SAMPLES = 5        # Don't demote on fewer samples than this
+LATENCY_MAX_AGE_SECONDS = 300.0  # Older samples don't count towards the SLO p95
+ERROR_COOLDOWN_SECONDS = 60.0
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+@dataclass
+class RouteStats:
+    """Stats for one (step, model) route."""
+    calls: int = 0
+    errors: int = 0
+    fallbacks: int = 0          # Calls served here after an earlier model failed
+    slo_misses: int = 0
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+    latencies_ms: Deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+
+    def to_dict(self) -> Dict[str, Any]:
+        latencies = list(self.latencies_ms)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "fallbacks": self.fallbacks,
+            "slo_misses": self.slo_misses,
+            "prompt_tokens": self.prompt_tokens,
+            "output_tokens": self.output_tokens,
+            "cost_usd": round(self.cost_usd, 6),
+            "latency_p50_ms": round(percentile(latencies, 0.5), 1) if latencies else None,
+            "latency_p95_ms": round(percentile(latencies, 0.95), 1) if latencies else None,
+        }
+
+
+class ModelRouter:
+    """Picks models per step and keeps per-route latency and cost stats."""
+
+    def __init__(self, config: Optional[Config] = None, clock: Callable[[], float] = time.monotonic):
+        self.config = config or get_config()
+        self.clock = clock
+        self._routes: Dict[Tuple[str, str], RouteStats] = {}
+        self._model_latencies: Dict[str, Deque[Tuple[float, float]]] = {}  # model -> (time, latency_ms)
+        self._cooldown_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def tier(self, step: str) -> ModelTier:
+        return self.config.tier_for_step(step)
+
+    def _p95(self, model: str, now: float) -> Optional[float]:
+        samples = self._model_latencies.get(model)
+        if not samples:
+            return None
+        while samples and samples[0][0] < now - LATENCY_MAX_AGE_SECONDS:
+            samples.popleft()
+        if len(samples) < MIN_SLO_SAMPLES:
+            return None
+        return percentile([latency for _, latency in samples], 0.95)
+
+    def candidates(self, step: str) -> List[str]:
+        """
+        Models to try for a step, in order.
+
+        Healthy models within the SLO come first (in configured order), then
+        models over the SLO, then models cooling down after an error, so
+        there is always something to try.
+        """
+        tier = self.tier(step)
+        now = self.clock()
+        healthy, slow, cooling = [], [], []
+        with self._lock:
+            for model in tier.models:
+                if self._cooldown_until.get(model, 0.0) > now:
+                    cooling.append(model)
+                    continue
+                p95 = self._p95(model, now)
+                if tier.latency_slo_ms and p95 is not None and p95 > tier.latency_slo_ms:
+                    slow.append(model)
+                else:
+                    healthy.append(model)
+        return healthy + slow + cooling
+
+    def timeout_ms(self, step: str) -> Optional[int]:
+        return self.tier(step).timeout_ms or None
+
+    def _route(self, step: str, model: str) -> RouteStats:
+        key = (step, model)
+        if key not in self._routes:
+            self._routes[key] = RouteStats()
+        return self._routes[key]
+
+    def record_success(
+        self,
+        step: str,
+        model: str,
+        latency_ms: float,
+        usage_metadata: Any = None,
+        fallback: bool = False
+    ):
+        """Record a successful call."""
+        tier = self.tier(step)
+        with self._lock:
+            stats = self._route(step, model)
+            stats.calls += 1
+            stats.latencies_ms.append(latency_ms)
+            self._model_latencies.setdefault(model, deque(maxlen=LATENCY_WINDOW)).append((self.clock(), latency_ms))
+            self._cooldown_until.pop(model, None)
+            if fallback:
+                stats.fallbacks += 1
+            if tier.latency_slo_ms and latency_ms > tier.latency_slo_ms:
+                stats.slo_misses += 1
+            if usage_metadata is not None:
+                prompt_tokens = getattr(usage_metadata, "prompt_token_count", None) or 0
+                output_tokens = (
+                    (getattr(usage_metadata, "candidates_token_count", None) or 0)
+                    + (getattr(usage_metadata, "thoughts_token_count", None) or 0)
+                )
+                stats.prompt_tokens += prompt_tokens
+                stats.output_tokens += output_tokens
+                input_price, output_price = self.config.MODEL_PRICES.get(model, (0.0, 0.0))
+                stats.cost_usd += (prompt_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+    def record_error(self, step: str, model: str, cooldown: bool = True):
+        """Record a failed call; the model is skipped for a while unless cooldown is False."""
+        with self._lock:
+            stats = self._route(step, model)
+            stats.calls += 1
+            stats.errors += 1
+            if cooldown:
+                self._cooldown_until[model] = self.clock() + ERROR_COOLDOWN_SECONDS
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-route stats keyed "step/model"."""
+        with self._lock:
+            return {f"{step}/{model}": stats.to_dict() for (step, model), stats in self._routes.items()}
+
+
+_router: Optional[ModelRouter] = None
+
+
+def get_router() -> ModelRouter:
+    """Process-wide router so health and latency stats carry across sessions."""
+    global _router
+    if _router is None:
+        _router = ModelRouter()
+    return _router
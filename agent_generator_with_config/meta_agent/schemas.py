@@ -0,0 +1,153 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Structured-output schemas for the meta-agent steps.
+
+The models are passed to Gemini as response schemas, and responses are
+validated straight from the JSON text.
+"""
+
+from typing import Any, Dict, List, Literal, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel, Field, ValidationError
+
+try:
+    from ..config_schema import AgentType
+except ImportError:
+    from config_schema import AgentType
+
+from .extraction import JSONExtractionError, extract_json
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+WORKFLOW_AGENT_TYPES = {AgentType.SEQUENTIAL_AGENT.value, AgentType.PARALLEL_AGENT.value, AgentType.LOOP_AGENT.value}
+
+
+class RequirementsAnalysis(BaseModel):
+    """Step 1 output."""
+    purpose: str = ""
+    main_capabilities: List[str] = Field(default_factory=list)
+    suggested_tools: List[str] = Field(default_factory=list)
+    complexity: Literal["simple", "medium", "complex"] = "simple"
+
+
+class AgentSpec(BaseModel):
+    """One agent in the architecture plan."""
+    name: str
+    type: AgentType = AgentType.LLM_AGENT
+    purpose: str = ""
+    tools_needed: List[str] = Field(default_factory=list)
+    sub_agents: List[str] = Field(default_factory=list)
+
+
+class ArchitecturePlan(BaseModel):
+    """Step 2 output."""
+    main_agent_name: str
+    agents: List[AgentSpec]
+
+    def plan_issues(self) -> List[str]:
+        """Structural problems that would only surface after agents are built."""
+        return plan_problems(self.model_dump(mode="json"))
+
+
+def plan_problems(plan: Dict[str, Any]) -> List[str]:
+    """
+    Structural checks on a plan dictionary: duplicate names, dangling
+    sub-agents, a missing main agent and empty workflow agents.
+
+    Works on the raw dictionary so problems can be reported even when the
+    plan also fails schema validation.
+
+    Returns:
+        List of problem descriptions (empty if the plan is sound)
+    """
+    agents = [agent for agent in plan.get("agents") or [] if isinstance(agent, dict)]
+    names = [agent.get("name") for agent in agents]
+    known = set(names)
+    issues = []
+
+    if not agents:
+        issues.append("Plan has no agents")
+
+    seen = set()
+    for name in names:
+        if name in seen:
+            issues.append(f"Duplicate agent name '{name}'")
+        seen.add(name)
+
+    main_agent_name = plan.get("main_agent_name")
+    if main_agent_name not in known:
+        issues.append(f"main_agent_name '{main_agent_name}' is not one of the planned agents")
+
+    for agent in agents:
+        name = agent.get("name")
+        sub_agents = agent.get("sub_agents") or []
+        for sub_agent in sub_agents:
+            if sub_agent == name:
+                issues.append(f"Agent '{name}' lists itself as a sub-agent")
+            elif sub_agent not in known:
+                issues.append(f"Sub-agent '{sub_agent}' referenced by '{name}' is not in the plan")
+        if agent.get("type") in WORKFLOW_AGENT_TYPES and not sub_agents:
+            issues.append(f"{agent['type']} '{name}' needs at least one sub-agent")
+
+    return issues
+
+
+def parse_model(model: Type[ModelT], text: str) -> ModelT:
+    """
+    Validate a model response against a schema.
+
+    Structured output is validated directly from the JSON text. If the text is
+    not clean JSON (a fenced block, extra commentary, truncation), the object is
+    recovered with extract_json first.
+
+    Raises:
+        ValidationError: If the JSON does not match the schema
+        JSONExtractionError: If no JSON object could be recovered
+    """
+    try:
+        return model.model_validate_json(text)
+    except ValidationError as e:
+        if not any(error["type"] == "json_invalid" for error in e.errors()):
+            raise
+
+    # Anchor on the model's own fields so a nested object is never taken for the response
+    required = [name for name, field in model.model_fields.items() if field.is_required()]
+    return model.model_validate(extract_json(text, required, known_keys=model.model_fields))
+
+
+def parse_plan(text: str) -> Tuple[Optional[ArchitecturePlan], List[str]]:
+    """
+    Parse and check an architecture plan.
+
+    Returns:
+        Tuple of (plan or None, problems). Schema errors such as unknown agent
+        types are reported as problems, alongside the plan_issues() checks.
+    """
+    try:
+        plan = parse_model(ArchitecturePlan, text)
+    except JSONExtractionError as e:
+        return None, [str(e)]
+    except ValidationError as e:
+        problems = [
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+            for error in e.errors()
+        ]
+        try:
+            problems.extend(plan_problems(extract_json(text, ArchitecturePlan.model_fields)))
+        except JSONExtractionError:
+            pass
+        return None, problems
+    return plan, plan.plan_issues()
@@ -19,12 +19,13 @@ from google.adk.tools.agent_tool import AgentTool
 from google.adk.tools.function_tool import FunctionTool
 
 from ..prompts import AGENT_BUILDER_PROMPT
+from ..config import get_config
 from .prompt_builder import prompt_builder
 from ..tools.config_merger import add_agent_to_config, update_agent_in_config
 
 agent_builder = LlmAgent(
     name="agent_builder",
-    model="gemini-2.0-flash",
+    model=get_config().model_for_step("agent_instructions"),
     description="""
     Agent Configuration Specialist that builds detailed configurations for 
     individual agents. Creates basic agent config, calls prompt builder for 
@@ -16,10 +16,11 @@
 
 from google.adk.agents.llm_agent import LlmAgent
 from ..prompts import ARCHITECTURE_PLANNER_PROMPT
+from ..config import get_config
 
 architecture_planner = LlmAgent(
     name="architecture_planner",
-    model="gemini-flash-latest",
+    model=get_config().model_for_step("architecture"),
     description="""
     Agent Architecture Specialist that designs the structure of agent systems.
     Creates simple, clear architecture plans defining agents, their roles, 
@@ -16,10 +16,11 @@
 
 from google.adk.agents.llm_agent import LlmAgent
 from ..prompts import PROMPT_BUILDER_PROMPT
+from ..config import get_config
 
 prompt_builder = LlmAgent(
     name="prompt_builder",
-    model="gemini-2.0-flash",
+    model=get_config().model_for_step("agent_instructions"),
     description="""
     Prompt Engineering Specialist that creates detailed, effective instructions 
     for AI agents. Focuses on clear role definition, tool usage, response 
@@ -16,10 +16,11 @@
 
 from google.adk.agents.llm_agent import LlmAgent
 from ..prompts import REQUIREMENTS_ANALYZER_PROMPT
+from ..config import get_config
 
 requirements_analyzer = LlmAgent(
     name="requirements_analyzer",
-    model="gemini-2.0-flash",
+    model=get_config().model_for_step("requirements"),
     description="""
     Requirements Analysis Specialist that extracts and structures user requirements 
     for agent creation. Analyzes user input to understand purpose, capabilities, 
@@ -18,11 +18,12 @@ from google.adk.agents.llm_agent import LlmAgent
 from google.adk.tools.function_tool import FunctionTool
 
 from ..prompts import TOOL_BUILDER_PROMPT
+from ..config import get_config
 from ..tools.config_merger import add_tool_to_config, update_tool_in_config
 
 tool_builder = LlmAgent(
     name="tool_builder",
-    model="gemini-2.0-flash",
+    model=get_config().model_for_step("tool_code"),
     description="""
     Tool Creation Specialist that creates custom tools with Python function code.
     Writes clean, functional Python code with proper error handling and adds 
@@ -0,0 +1,247 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Agent templates for common domains.
+
+Domains come from the frontend's domain-registry.json (keywords, capability
+nodes, default ADK tools). A TF-IDF index over each domain's text is built
+once. A request that matches a domain strongly enough gets a precomputed
+requirements analysis, so the pipeline skips the requirements LLM call, and
+the domain's plan becomes the starting point for the planner, which keeps it
+and adds the agents and tools the request asks for beyond the template.
+"""
+
+import json
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from ..config_schema import BuiltinToolType
+except ImportError:
+    from config_schema import BuiltinToolType
+
+from .config import get_config
+from .schemas import ArchitecturePlan, RequirementsAnalysis, plan_problems
+
+DEFAULT_REGISTRY_PATH = Path(__file__).resolve().parents[2] / "frontend" / "lib" / "domain-registry.json"
+
+KEYWORD_WEIGHT = 3            # Keywords count this many times in a domain's document
+GENERIC_DOMAINS = {"generic_custom"}  # Catch-all domains never count as a strong match
+BUILTIN_TOOLS = {tool.value for tool in BuiltinToolType}
+SEARCH_TOOL = BuiltinToolType.GOOGLE_SEARCH.value
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "build", "by", "can", "create", "for", "from",
+    "help", "helps", "i", "in", "into", "is", "it", "make", "me", "my", "of", "on", "or",
+    "that", "the", "their", "this", "to", "us", "want", "we", "which", "who", "will", "with",
+    "agent", "agents", "ai", "bot",
+}
+
+
+def _stem(word: str) -> str:
+    """Crude suffix stripping so 'trips'/'trip' and 'forecasting'/'forecast' match."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 5 and word.endswith("ing"):
+        return word[:-3]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(token) for token in _TOKEN.findall((text or "").lower()) if token not in _STOPWORDS]
+
+
+@dataclass
+class DomainTemplate:
+    """One registry domain."""
+    id: str
+    display_name: str
+    description: str
+    keywords: List[str]
+    nodes: List[Dict[str, str]]
+    default_tools: List[str]
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_registry(cls, domain: Dict[str, Any]) -> "DomainTemplate":
+        return cls(
+            id=domain["id"],
+            display_name=domain.get("displayName", domain["id"]),
+            description=domain.get("description", ""),
+            keywords=list(domain.get("keywords", [])),
+            nodes=list(domain.get("nodes", [])),
+            default_tools=[tool for tool in domain.get("defaultTools", []) if tool in BUILTIN_TOOLS],
+            metadata=dict(domain.get("metadata") or {}),
+        )
+
+    def document(self) -> List[str]:
+        tokens = tokenize(" ".join(self.keywords)) * KEYWORD_WEIGHT
+        tokens += tokenize(f"{self.display_name} {self.description}")
+        for node in self.nodes:
+            tokens += tokenize(f"{node.get('label', '')} {node.get('description', '')}")
+        return tokens
+
+    def instantiate(self, user_description: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Requirements and architecture plan for a request in this domain.
+
+        The main agent gets the domain's tools. Google Search can't share an
+        agent with other tools, so when the domain uses it alongside others
+        it goes to a dedicated search agent, which the code generator hands
+        to the main agent as an AgentTool.
+
+        Returns:
+            (requirements, architecture) dictionaries, as steps 1 and 2 return them
+        """
+        main_name = f"{self.id}_agent"
+        capabilities = [node.get("label", node.get("id", "")) for node in self.nodes]
+        # One line: the code generator emits the purpose as a comment above the agent
+        purpose = f"{' '.join(user_description.split())} (Domain: {self.display_name} - {self.description})"
+        if self.metadata.get("disclaimer"):
+            purpose += f" Always note: {self.metadata['disclaimer']}"
+
+        tools = list(self.default_tools)
+        agents = []
+        sub_agents = []
+        if SEARCH_TOOL in tools and len(tools) > 1:
+            tools.remove(SEARCH_TOOL)
+            search_name = f"{self.id}_search_agent"
+            agents.append({
+                "name": search_name,
+                "type": "llm_agent",
+                "purpose": f"Search the web for up-to-date {self.display_name.lower()} information for {main_name}",
+                "tools_needed": [SEARCH_TOOL],
+                "sub_agents": [],
+            })
+            sub_agents.append(search_name)
+        agents.insert(0, {
+            "name": main_name,
+            "type": "llm_agent",
+            "purpose": purpose,
+            "tools_needed": tools,
+            "sub_agents": sub_agents,
+        })
+
+        requirements = RequirementsAnalysis(
+            purpose=user_description.strip(),
+            main_capabilities=capabilities,
+            suggested_tools=list(self.default_tools),
+            complexity="medium" if sub_agents else "simple",
+        ).model_dump(mode="json")
+        architecture = ArchitecturePlan.model_validate({"main_agent_name": main_name, "agents": agents}).model_dump(mode="json")
+        return requirements, architecture
+
+
+def template_problems(template_plan: Dict[str, Any], plan: Dict[str, Any]) -> List[str]:
+    """
+    Parts of a template plan that a plan built on it dropped.
+
+    Returns:
+        List of problem descriptions (empty if every template agent is kept
+        with its tools and sub-agents)
+    """
+    agents = {agent.get("name"): agent for agent in plan.get("agents") or [] if isinstance(agent, dict)}
+    issues = []
+    for template_agent in template_plan["agents"]:
+        name = template_agent["name"]
+        agent = agents.get(name)
+        if agent is None:
+            issues.append(f"Template agent '{name}' is missing; keep it and add new agents alongside it")
+            continue
+        for key, kind in (("tools_needed", "tool"), ("sub_agents", "sub-agent")):
+            for item in template_agent[key]:
+                if item not in (agent.get(key) or []):
+                    issues.append(f"Agent '{name}' dropped template {kind} '{item}'")
+    if plan.get("main_agent_name") != template_plan["main_agent_name"]:
+        issues.append(f"main_agent_name must stay '{template_plan['main_agent_name']}'")
+    return issues
+
+
+@dataclass
+class TemplateMatch:
+    template: DomainTemplate
+    score: float
+    runner_up: float
+
+
+class TemplateLibrary:
+    """TF-IDF index over registry domains."""
+
+    def __init__(self, domains: List[Dict[str, Any]]):
+        self.templates = [DomainTemplate.from_registry(domain) for domain in domains]
+        documents = [Counter(template.document()) for template in self.templates]
+        doc_freq = Counter(term for document in documents for term in document)
+        count = len(documents)
+        self.idf = {term: math.log((1 + count) / (1 + df)) + 1 for term, df in doc_freq.items()}
+        self.vectors = [self._vector(document) for document in documents]
+
+        # Templates are only offered if they produce a sound plan
+        for template in self.templates:
+            _, plan = template.instantiate("check")
+            problems = plan_problems(plan)
+            if problems:
+                raise ValueError(f"Template '{template.id}' is invalid: {problems}")
+
+    @classmethod
+    def from_file(cls, path: Path) -> "TemplateLibrary":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f).get("domains", []))
+
+    def _vector(self, counts: Counter) -> Dict[str, float]:
+        vector = {term: tf * self.idf.get(term, 0.0) for term, tf in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return {term: weight / norm for term, weight in vector.items()} if norm else {}
+
+    def scores(self, text: str) -> List[Tuple[DomainTemplate, float]]:
+        """Cosine similarity of text to every domain, best first."""
+        query = self._vector(Counter(tokenize(text)))
+        scored = [
+            (template, sum(weight * vector.get(term, 0.0) for term, weight in query.items()))
+            for template, vector in zip(self.templates, self.vectors)
+        ]
+        return sorted(scored, key=lambda item: item[1], reverse=True)
+
+    def match(self, text: str, min_score: float, min_margin: float) -> Optional[TemplateMatch]:
+        """
+        The domain a request clearly belongs to, or None.
+
+        A match needs at least min_score similarity and a lead of min_margin
+        over the next domain; catch-all domains never match.
+        """
+        scored = [(template, score) for template, score in self.scores(text) if template.id not in GENERIC_DOMAINS]
+        if not scored:
+            return None
+        best, score = scored[0]
+        runner_up = scored[1][1] if len(scored) > 1 else 0.0
+        if score <= 0 or score < min_score or score - runner_up < min_margin:
+            return None
+        return TemplateMatch(best, score, runner_up)
+
+
+@lru_cache(maxsize=1)
+def get_template_library() -> Optional[TemplateLibrary]:
+    """Library built from the configured registry (once per process), or None if it is missing."""
+    path = Path(get_config().DOMAIN_REGISTRY_PATH or DEFAULT_REGISTRY_PATH)
+    if not path.exists():
+        return None
+    return TemplateLibrary.from_file(path)
@@ -0,0 +1,138 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Library of vetted custom tools.
+
+Each *.json file in this directory is one tool: a ToolConfig-style entry
+(function_code, imports, dependencies) plus a version, tags and aliases.
+Step 5 looks tools up here before asking the LLM to write them, so
+recurring tools cost no LLM calls and come out the same in every project.
+
+A requested tool matches an entry by name or alias, or when the words in
+its name (minus generic verbs like "get" and "fetch") are all covered by
+the entry's name and tags, e.g. get_weather_forecast -> get_weather.
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..extraction import ExtractedTool
+from ..tools.code_checker import check_tool_code, format_issues
+
+LIBRARY_DIR = Path(__file__).parent
+
+# Words that say little about what a tool does
+_GENERIC_WORDS = {
+    "get", "fetch", "find", "lookup", "look", "retrieve", "check", "query", "load", "read",
+    "tool", "info", "information", "current", "the", "for", "of", "by", "and",
+}
+
+
+def name_words(name: str) -> List[str]:
+    """Words of a tool name: snake_case and camelCase are split, generic words dropped."""
+    spaced = re.sub(r"([a-z0-9])([A-Z])", r"\1_\2", name)
+    return [word for word in re.split(r"[^a-z0-9]+", spaced.lower()) if word and word not in _GENERIC_WORDS]
+
+
+@dataclass
+class LibraryTool:
+    """One vetted tool."""
+    name: str
+    version: str
+    description: str
+    function_code: str
+    imports: List[str] = field(default_factory=list)
+    dependencies: List[str] = field(default_factory=list)
+    tags: List[str] = field(default_factory=list)
+    aliases: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LibraryTool":
+        return cls(
+            name=data["name"],
+            version=str(data["version"]),
+            description=data.get("description", ""),
+            function_code=data["function_code"],
+            imports=list(data.get("imports", [])),
+            dependencies=list(data.get("dependencies", [])),
+            tags=[tag.lower() for tag in data.get("tags", [])],
+            aliases=list(data.get("aliases", [])),
+        )
+
+    @property
+    def vocabulary(self) -> set:
+        return set(name_words(self.name)) | {word for tag in self.tags for word in name_words(tag)}
+
+    def as_tool(self, tool_name: str) -> ExtractedTool:
+        """The tool's code with its function named tool_name."""
+        code = self.function_code
+        if tool_name != self.name:
+            code = re.sub(rf"^(async\s+)?def\s+{re.escape(self.name)}\b", rf"\1def {tool_name}", code, count=1, flags=re.MULTILINE)
+        return ExtractedTool(tool_name, code, list(self.imports), list(self.dependencies))
+
+
+class ToolLibrary:
+    """Tools indexed by name, alias and tag."""
+
+    def __init__(self, tools: List[LibraryTool]):
+        self.tools = {tool.name: tool for tool in tools}
+        self.by_name: Dict[str, LibraryTool] = {}
+        for tool in tools:
+            for name in [tool.name] + tool.aliases:
+                if name in self.by_name:
+                    raise ValueError(f"Tool name '{name}' is used by both '{self.by_name[name].name}' and '{tool.name}'")
+                self.by_name[name] = tool
+            issues = check_tool_code(tool.name, tool.function_code, tool.imports)
+            if issues:
+                raise ValueError(f"Library tool '{tool.name}' fails checks:\n{format_issues(issues)}")
+
+    @classmethod
+    def from_directory(cls, path: Path = LIBRARY_DIR) -> "ToolLibrary":
+        tools = []
+        for entry in sorted(Path(path).glob("*.json")):
+            with open(entry, "r", encoding="utf-8") as f:
+                tools.append(LibraryTool.from_dict(json.load(f)))
+        return cls(tools)
+
+    def find(self, tool_name: str) -> Optional[LibraryTool]:
+        """
+        The library tool for a requested tool name, or None.
+
+        Exact names and aliases win; otherwise the entry whose vocabulary
+        covers every word of the name, preferring one whose own name has
+        the same words (fetchData -> fetch_data), then the tightest fit.
+        """
+        if tool_name in self.by_name:
+            return self.by_name[tool_name]
+        words = set(name_words(tool_name))
+        if not words:
+            return None
+        candidates = [tool for tool in self.tools.values() if words <= tool.vocabulary]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda tool: (set(name_words(tool.name)) != words, len(tool.vocabulary), tool.name))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"tools": {name: tool.version for name, tool in sorted(self.tools.items())}}
+
+
+@lru_cache(maxsize=1)
+def get_tool_library() -> ToolLibrary:
+    """The bundled library (loaded once per process)."""
+    return ToolLibrary.from_directory()
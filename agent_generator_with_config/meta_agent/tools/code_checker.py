@@ -0,0 +1,396 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Code Checker - Validates generated tool code and agent.py before users run it.
+
+Two stages:
+1. In-process: compile() plus AST checks on each tool (syntax, missing
+   function, undefined names).
+2. Isolated: import the generated agent.py in a warm subprocess pool with a
+   timeout, and map failures back to the tool that caused them.
+"""
+
+import ast
+import asyncio
+import builtins
+import json
+import os
+import sys
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional
+
+SMOKE_WORKER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "smoke_worker.py")
+
+# Names every generated agent.py provides (see AgentCodeGenerator._collect_imports)
+GENERATED_MODULE_NAMES = {
+    "LlmAgent", "SequentialAgent", "ParallelAgent", "LoopAgent",
+    "FunctionTool", "types", "List", "Dict", "Any", "Optional",
+}
+
+
+@dataclass
+class CodeIssue:
+    """A problem found in generated code."""
+    kind: str                    # syntax | missing_function | undefined_name | import | timeout
+    message: str
+    tool: Optional[str] = None   # Tool responsible, if known
+    lineno: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def format_issues(issues: List[CodeIssue]) -> str:
+    """Render issues as a bullet list for regeneration prompts and logs."""
+    lines = []
+    for issue in issues:
+        where = f" (line {issue.lineno})" if issue.lineno else ""
+        lines.append(f"- {issue.kind}{where}: {issue.message}")
+    return "\n".join(lines)
+
+
+def _bound_names(tree: ast.AST) -> Optional[set]:
+    """All names bound anywhere in a module, or None if a star import makes that unknowable."""
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+            names.add(node.id)
+        elif isinstance(node, ast.arg):
+            names.add(node.arg)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                if alias.name == "*":
+                    return None
+                names.add(alias.asname or alias.name.split(".")[0])
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            names.add(node.name)
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            names.update(node.names)
+        elif isinstance(node, (ast.MatchAs, ast.MatchStar)) and node.name:
+            names.add(node.name)
+        elif isinstance(node, ast.MatchMapping) and node.rest:
+            names.add(node.rest)
+    return names
+
+
+def check_tool_code(
+    tool_name: str,
+    function_code: str,
+    imports: Optional[List[str]] = None,
+    known_names: Optional[set] = None
+) -> List[CodeIssue]:
+    """
+    Statically check one custom tool.
+
+    Args:
+        tool_name: Name the tool function must have
+        function_code: The tool's Python source
+        imports: Import statements the generated file adds for this tool
+        known_names: Extra names available at module level (e.g. other tools)
+
+    Returns:
+        List of issues (empty if the tool looks sound)
+    """
+    source = "\n".join(list(imports or []) + [function_code or ""])
+
+    try:
+        compile(source, f"<tool {tool_name}>", "exec")
+        tree = ast.parse(source)
+    except SyntaxError as e:
+        lineno = (e.lineno - len(imports or [])) if e.lineno else None
+        return [CodeIssue("syntax", f"{e.msg}: {(e.text or '').strip()}", tool_name, lineno)]
+
+    defined = {
+        node.name for node in tree.body
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+    }
+    if tool_name not in defined:
+        return [CodeIssue("missing_function", f"No top-level function named '{tool_name}' (found: {sorted(defined) or 'none'})", tool_name)]
+
+    bound = _bound_names(tree)
+    if bound is None:
+        return []
+
+    available = bound | set(dir(builtins)) | GENERATED_MODULE_NAMES | set(known_names or ())
+    issues = []
+    reported = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load) and node.id not in available:
+            if node.id not in reported:
+                reported.add(node.id)
+                lineno = node.lineno - len(imports or [])
+                issues.append(CodeIssue("undefined_name", f"Name '{node.id}' is used but never imported or defined", tool_name, lineno))
+    return issues
+
+
+def check_project_tools(project_config: Dict[str, Any]) -> Dict[str, List[CodeIssue]]:
+    """Statically check every custom tool in a project config. Returns {tool: issues} for broken tools."""
+    tools = project_config.get("tools", {})
+    tool_names = set(tools)
+    broken = {}
+    for tool_name, tool in tools.items():
+        if tool.get("type") != "custom_function":
+            continue
+        issues = check_tool_code(tool_name, tool.get("function_code", ""), tool.get("imports"), tool_names)
+        if issues:
+            broken[tool_name] = issues
+    return broken
+
+
+def locate_tool(source: str, lineno: Optional[int], tool_names: List[str]) -> Optional[str]:
+    """
+    Find the tool whose code in the generated source spans a line.
+    
+    Each tool's code is emitted after a "# Tool: ..." marker, so a chunk runs
+    from its marker to the end of the tool's function. That also covers
+    imports the tool code carries above its def.
+    """
+    if not lineno:
+        return None
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return None
+    markers = [index + 1 for index, line in enumerate(source.splitlines()) if line.startswith("# Tool: ")]
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name in tool_names:
+            start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+            start = max([marker for marker in markers if marker <= start], default=start)
+            if start <= lineno <= (node.end_lineno or node.lineno):
+                return node.name
+    return None
+
+
+def tools_for_module(module: Optional[str], project_config: Dict[str, Any]) -> List[str]:
+    """Tools whose imports reference a (possibly dotted) module name."""
+    if not module:
+        return []
+    root = module.split(".")[0]
+    owners = []
+    for tool_name, tool in project_config.get("tools", {}).items():
+        for statement in tool.get("imports") or []:
+            try:
+                nodes = ast.parse(statement).body
+            except SyntaxError:
+                continue
+            candidates = []
+            for node in nodes:
+                if isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                    candidates.append(node.module)
+                elif isinstance(node, ast.Import):
+                    candidates.extend(alias.name for alias in node.names)
+            if any(name.split(".")[0] == root for name in candidates):
+                owners.append(tool_name)
+                break
+    return owners
+
+
+class ImportSmokePool:
+    """
+    Pool of warm Python subprocesses that import generated agent.py source.
+
+    Workers import the ADK once at startup and are reused across checks,
+    running generated code under CPU and memory limits. A worker that
+    exceeds the timeout or its limits is killed and replaced, and one that
+    has served max_checks checks is recycled.
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        timeout: float = 20.0,
+        startup_timeout: float = 60.0,
+        cpu_seconds: int = 10,
+        memory_mb: int = 512,
+        max_checks: int = 50
+    ):
+        """
+        Args:
+            size: Max concurrent workers
+            timeout: Wall-clock seconds per check before the worker is killed
+            startup_timeout: Seconds for a worker to import the ADK
+            cpu_seconds: CPU seconds per check (0 for no limit)
+            memory_mb: Address space a check may add to the warm worker (0 for no limit)
+            max_checks: Checks a worker serves before it is recycled
+        """
+        self.size = size
+        self.timeout = timeout
+        self.startup_timeout = startup_timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.max_checks = max_checks
+        self._idle: List[asyncio.subprocess.Process] = []
+        self._checks: Dict[asyncio.subprocess.Process, int] = {}
+        self._spawned = 0
+        self._loop = None
+        self._available = None
+
+    def _bind_loop(self):
+        """Workers are tied to an event loop - start fresh if the loop changed."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            for process in self._idle:
+                try:
+                    process.kill()
+                except Exception:
+                    pass  # Already gone, or its loop is closed
+            self._idle = []
+            self._checks = {}
+            self._spawned = 0
+            self._loop = loop
+            self._available = asyncio.Condition()
+
+    async def _spawn(self) -> asyncio.subprocess.Process:
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-u", SMOKE_WORKER_PATH,
+            str(self.cpu_seconds), str(self.memory_mb), str(self.max_checks),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        try:
+            await asyncio.wait_for(process.stdout.readline(), self.startup_timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            raise
+        self._checks[process] = 0
+        return process
+
+    async def _acquire(self) -> asyncio.subprocess.Process:
+        async with self._available:
+            while True:
+                while self._idle:
+                    process = self._idle.pop()
+                    if process.returncode is None:
+                        return process
+                    self._spawned -= 1
+                if self._spawned < self.size:
+                    self._spawned += 1
+                    break
+                await self._available.wait()
+        try:
+            return await self._spawn()
+        except BaseException:
+            async with self._available:
+                self._spawned -= 1
+                self._available.notify()
+            raise
+
+    async def _release(self, process: asyncio.subprocess.Process, healthy: bool):
+        async with self._available:
+            if healthy and process.returncode is None and self._checks.get(process, 0) < self.max_checks:
+                self._idle.append(process)
+            else:
+                if process.returncode is None:
+                    try:
+                        process.kill()
+                    except ProcessLookupError:
+                        pass
+                self._checks.pop(process, None)
+                self._spawned -= 1
+            self._available.notify()
+
+    async def warm_up(self):
+        """Start all workers ahead of the first check."""
+        self._bind_loop()
+        processes = [await self._acquire() for _ in range(self.size)]
+        for process in processes:
+            await self._release(process, True)
+
+    async def run(self, source: str) -> Dict[str, Any]:
+        """Import generated source in a worker and return the worker's verdict."""
+        self._bind_loop()
+        process = await self._acquire()
+        healthy = False
+        try:
+            process.stdin.write((json.dumps({"source": source}) + "\n").encode("utf-8"))
+            await process.stdin.drain()
+            self._checks[process] = self._checks.get(process, 0) + 1
+            line = await asyncio.wait_for(process.stdout.readline(), self.timeout)
+            if not line:
+                await process.wait()
+                return {
+                    "ok": False,
+                    "error_type": "WorkerCrashed",
+                    "message": f"Smoke worker exited during import, e.g. over its CPU or memory limit (exit code {process.returncode})"
+                }
+            healthy = True
+            return json.loads(line)
+        except asyncio.TimeoutError:
+            return {"ok": False, "error_type": "Timeout", "message": f"Import did not finish within {self.timeout}s"}
+        except ConnectionError:
+            return {"ok": False, "error_type": "WorkerCrashed", "message": "Smoke worker exited"}
+        finally:
+            await self._release(process, healthy)
+
+    async def close(self):
+        for process in self._idle:
+            if process.returncode is None:
+                process.kill()
+        for process in self._idle:
+            await process.wait()
+        self._idle = []
+        self._checks = {}
+        self._spawned = 0
+
+
+_smoke_pool: Optional[ImportSmokePool] = None
+
+
+def get_smoke_pool() -> ImportSmokePool:
+    """Shared pool so workers stay warm across sessions."""
+    global _smoke_pool
+    if _smoke_pool is None:
+        _smoke_pool = ImportSmokePool(
+            size=int(os.getenv("SMOKE_POOL_SIZE", 2)),
+            timeout=float(os.getenv("SMOKE_TIMEOUT_SECONDS", 20)),
+            cpu_seconds=int(os.getenv("SMOKE_CPU_SECONDS", 10)),
+            memory_mb=int(os.getenv("SMOKE_MEMORY_MB", 512)),
+            max_checks=int(os.getenv("SMOKE_MAX_CHECKS", 50))
+        )
+    return _smoke_pool
+
+
+async def smoke_test_agent_source(source: str, project_config: Dict[str, Any]) -> List[CodeIssue]:
+    """
+    Import generated agent.py source in an isolated worker.
+
+    Returns:
+        Issues found; each is attributed to a tool when the failure can be traced to one
+    """
+    verdict = await get_smoke_pool().run(source)
+    if verdict.get("ok"):
+        return []
+
+    error_type = verdict.get("error_type", "Error")
+    message = f"{error_type}: {verdict.get('message', '')}"
+    lineno = verdict.get("lineno")
+    tool_names = list(project_config.get("tools", {}))
+
+    if error_type == "Timeout":
+        return [CodeIssue("timeout", message)]
+
+    owners = tools_for_module(verdict.get("module"), project_config)
+    if owners:
+        return [CodeIssue("import", message, tool, lineno) for tool in owners]
+
+    tool = locate_tool(source, lineno, tool_names)
+    if tool:
+        return [CodeIssue("import", message, tool, lineno)]
+
+    # Not traceable to a tool (e.g. the ADK itself is missing in this environment)
+    return [CodeIssue("import", message, None, lineno)]
@@ -18,21 +18,20 @@ Uses the same AgentCodeGenerator class as the main code generator for consistenc
 """
 
 import json
-import os
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 # Import the AgentCodeGenerator class and related schemas
 try:
     # Try relative import first
     from ...code_generator import AgentCodeGenerator
-    from ...config_schema import validate_agent_config, AgentProjectConfig
+    from ...blob_store import BlobStore
+    from ...config_schema import load_validated_config
 except ImportError:
     try:
         # Try absolute import
         import sys
-        import os
         from pathlib import Path
         
         # Add the parent directory to path
@@ -40,19 +39,65 @@ except ImportError:
         sys.path.insert(0, str(parent_dir))
         
         from code_generator import AgentCodeGenerator
-        from config_schema import validate_agent_config, AgentProjectConfig
+        from blob_store import BlobStore
+        from config_schema import load_validated_config
     except ImportError as e:
         print(f"Warning: Could not import code generator: {e}")
         print("Make sure you're running from the correct directory")
         raise
 
 from .config_merger import get_full_config
+from ..config import get_config
+
+
+def _summary_unchanged(summary_path: Path, summary: Dict[str, Any]) -> bool:
+    """Whether an existing summary matches apart from its generated_at timestamp."""
+    try:
+        with open(summary_path, 'r') as f:
+            existing = json.load(f)
+    except (OSError, ValueError):
+        return False
+    existing.pop("generated_at", None)
+    current = dict(summary)
+    current.pop("generated_at", None)
+    return existing == current
+
+
+def _build_quick_start(project_name: str, project_config: Dict[str, Any]) -> str:
+    """Build the quick_start.py helper script for a generated project."""
+    return f"""#!/usr/bin/env python3
+# Quick start script for {project_name}
+
+from agent import root_agent
+
+def main():
+    print("Starting {project_name}...")
+    print("Main agent: {project_config['main_agent']}")
+    print("Available agents: {list(project_config['agents'].keys())}")
+    print("Available tools: {list(project_config['tools'].keys())}")
+    print()
+    print("Generated in current directory for easy testing with ADK Web UI")
+    print()
+    print("To run the agent with ADK CLI:")
+    print("adk cli agent.py")
+    print()
+    print("To use the agent programmatically:")
+    print("response = root_agent.run('Your message here')")
+    print("print(response)")
+
+if __name__ == "__main__":
+    main()
+"""
 
 
 def generate_agent_code(
     session_id: str,
     output_base_dir: str = ".",
-    validate_config: bool = True
+    validate_config: bool = True,
+    write_to_disk: bool = True,
+    include_file_contents: bool = False,
+    fsync_policy: str = "none",
+    blob_store_dir: Optional[str] = None
 ) -> str:
     """
     Generate Python code files from the final agent configuration.
@@ -62,6 +107,15 @@ def generate_agent_code(
         session_id: Session identifier containing the configuration
         output_base_dir: Base directory for generated code (defaults to current directory)
         validate_config: Whether to validate the configuration before generation
+        write_to_disk: Whether to write the files to output_base_dir. When False
+                       the project is rendered purely in memory.
+        include_file_contents: Whether to return every file's content in the
+                               result under "file_contents"
+        fsync_policy: Durability of disk writes - "none", "file" or "full"
+        blob_store_dir: Hard-link files to a content-addressed blob store in
+                        this directory so identical files across projects
+                        share storage (defaults to Config.BLOB_STORE_DIR;
+                        empty disables it)
         
     Returns:
         JSON string with generation results
@@ -69,7 +123,8 @@ def generate_agent_code(
     input_params = {
         "session_id": session_id,
         "output_base_dir": output_base_dir,
-        "validate_config": validate_config
+        "validate_config": validate_config,
+        "write_to_disk": write_to_disk
     }
     
     try:
@@ -96,9 +151,9 @@ def generate_agent_code(
         print(f"[CODE_GEN] Agents count: {len(project_config.get('agents', {}))}")
         print(f"[CODE_GEN] Tools count: {len(project_config.get('tools', {}))}")
         
-        # Create AgentProjectConfig object
+        # Create AgentProjectConfig object (parse + validation are cached by config hash)
         try:
-            config_obj = AgentProjectConfig(**project_config)
+            config_obj, validation_issues = load_validated_config(project_config)
             print(f"[CODE_GEN] Config object created successfully")
         except Exception as config_error:
             print(f"[CODE_GEN] Config parsing failed: {config_error}")
@@ -109,31 +164,33 @@ def generate_agent_code(
                 "error": f"Configuration parsing error: {str(config_error)}"
             }, indent=2)
         
-        # Validate the configuration if requested
-        if validate_config:
-            try:
-                validation_errors = validate_agent_config(config_obj)
-                if validation_errors:
-                    print(f"[CODE_GEN] Validation warnings (continuing anyway): {validation_errors}")
-                    # Don't fail on validation - just log warnings
-            except Exception as validation_error:
-                print(f"[CODE_GEN] Validation error (continuing anyway): {validation_error}")
-                # Continue with code generation even if validation fails
-        
-        # Create output directory - generate directly in the current folder for easy testing
-        project_name = project_config["project_name"]
-        output_dir = Path(output_base_dir).resolve()
+        # Report validation issues if requested
+        if validate_config and validation_issues:
+            # Don't fail on validation - just log warnings
+            print(f"[CODE_GEN] Validation warnings (continuing anyway):")
+            for issue in validation_issues:
+                print(f"[CODE_GEN]   {issue.path}: {issue.message}")
         
-        # Ensure the directory exists
-        output_dir.mkdir(parents=True, exist_ok=True)
+        project_name = project_config["project_name"]
+        output_dir = Path(output_base_dir).resolve() if write_to_disk else None
         
-        print(f"[CODE_GEN] Output directory: {output_dir}")
+        if output_dir is not None:
+            # Generate directly in the target folder for easy testing
+            output_dir.mkdir(parents=True, exist_ok=True)
+            print(f"[CODE_GEN] Output directory: {output_dir}")
+        else:
+            print(f"[CODE_GEN] Rendering in memory (no disk writes)")
         print(f"[CODE_GEN] Starting AgentCodeGenerator...")
         
         # Generate the code using the same AgentCodeGenerator class
         try:
-            generator = AgentCodeGenerator()
-            generated_files = generator.generate_from_config(config_obj, str(output_dir))
+            if blob_store_dir is None:
+                blob_store_dir = get_config().BLOB_STORE_DIR
+            blob_store = BlobStore(blob_store_dir, fsync=fsync_policy) if blob_store_dir and output_dir is not None else None
+            generator = AgentCodeGenerator(fsync_policy=fsync_policy, blob_store=blob_store)
+            generated_files = generator.generate_from_config(
+                config_obj, str(output_dir) if output_dir is not None else None
+            )
             print(f"[CODE_GEN] Generated {len(generated_files)} files: {list(generated_files.keys())}")
         except Exception as gen_error:
             print(f"[CODE_GEN] AgentCodeGenerator failed: {gen_error}")
@@ -146,7 +203,7 @@ def generate_agent_code(
             "session_id": session_id,
             "project_name": project_name,
             "generated_at": datetime.now().isoformat(),
-            "output_directory": str(output_dir),
+            "output_directory": str(output_dir) if output_dir is not None else None,
             "generated_files": list(generated_files.keys()),
             "agent_count": len(project_config["agents"]),
             "tool_count": len(project_config["tools"]),
@@ -155,60 +212,41 @@ def generate_agent_code(
             "tools": list(project_config["tools"].keys())
         }
         
-        # Write summary file
-        summary_path = output_dir / "generation_summary.json"
-        with open(summary_path, 'w') as f:
-            json.dump(summary, f, indent=2)
-        
-        # Save the project configuration for reference and regeneration
-        config_path = output_dir / "project_config.json"
-        with open(config_path, 'w') as f:
-            json.dump(project_config, f, indent=2)
-        
-        # Create a quick start script
-        quick_start_content = f"""#!/usr/bin/env python3
-# Quick start script for {project_name}
-
-from agent import root_agent
-
-def main():
-    print("Starting {project_name}...")
-    print("Main agent: {project_config['main_agent']}")
-    print("Available agents: {list(project_config['agents'].keys())}")
-    print("Available tools: {list(project_config['tools'].keys())}")
-    print()
-    print("Generated in current directory for easy testing with ADK Web UI")
-    print()
-    print("To run the agent with ADK CLI:")
-    print("adk cli agent.py")
-    print()
-    print("To use the agent programmatically:")
-    print("response = root_agent.run('Your message here')")
-    print("print(response)")
-
-if __name__ == "__main__":
-    main()
-"""
-        
-        quick_start_path = output_dir / "quick_start.py"
-        with open(quick_start_path, 'w') as f:
-            f.write(quick_start_content)
+        # Summary, project configuration (for reference and regeneration)
+        # and a quick start script ship alongside the generated code
+        extra_files = {
+            "generation_summary.json": json.dumps(summary, indent=2),
+            "project_config.json": json.dumps(project_config, indent=2),
+            "quick_start.py": _build_quick_start(project_name, project_config)
+        }
         
-        # Make quick start script executable (skip on Windows)
-        try:
-            os.chmod(quick_start_path, 0o755)
-        except Exception:
-            pass  # chmod may fail on Windows, that's OK
+        written_files = list(generator.last_written_files)
+        if output_dir is not None:
+            # Only the timestamp differs on an unchanged re-generation - keep the old summary
+            if _summary_unchanged(output_dir / "generation_summary.json", summary):
+                extra_files["generation_summary.json"] = (output_dir / "generation_summary.json").read_text()
+            
+            for filename, content in extra_files.items():
+                # Make quick start script executable
+                mode = 0o755 if filename == "quick_start.py" else None
+                if generator.write_file(output_dir / filename, content, mode=mode):
+                    written_files.append(filename)
+            
+            print(f"[CODE_GEN] Wrote {len(written_files)} changed files: {written_files}")
         
         result = {
             "success": True,
             "message": f"Agent code generated successfully for project '{project_name}' using AgentCodeGenerator",
-            "output_directory": str(output_dir),
-            "generated_files": list(generated_files.keys()) + ["generation_summary.json", "project_config.json", "quick_start.py"],
+            "output_directory": str(output_dir) if output_dir is not None else None,
+            "generated_files": list(generated_files.keys()) + list(extra_files.keys()),
+            "written_files": written_files,
             "summary": summary,
             "project_config": project_config
         }
         
+        if include_file_contents:
+            result["file_contents"] = {**generated_files, **extra_files}
+        
         return json.dumps({
             "tool": "generate_agent_code",
             "input": input_params,
@@ -265,9 +303,9 @@ def preview_generated_code(
         full_config = config_data["config"]
         project_config = full_config["project_config"]
         
-        # Create AgentProjectConfig object
+        # Create AgentProjectConfig object (cached for repeated previews)
         try:
-            config_obj = AgentProjectConfig(**project_config)
+            config_obj, _ = load_validated_config(project_config)
         except Exception as config_error:
             return json.dumps({
                 "success": False,
@@ -337,8 +375,7 @@ def validate_configuration(session_id: str) -> str:
         
         # Validate the configuration  
         try:
-            config_obj = AgentProjectConfig(**project_config)
-            validation_errors = validate_agent_config(config_obj)
+            config_obj, validation_issues = load_validated_config(project_config)
         except Exception as validation_error:
             error_result = {
                 "success": False,
@@ -353,11 +390,12 @@ def validate_configuration(session_id: str) -> str:
                 "timestamp": datetime.now().isoformat()
             }, indent=2)
         
-        if validation_errors:
+        if validation_issues:
             error_result = {
                 "success": False,
                 "valid": False,
-                "errors": validation_errors,
+                "errors": [issue.message for issue in validation_issues],
+                "issues": [issue.to_dict() for issue in validation_issues],
                 "message": "Configuration validation failed"
             }
             result = error_result
@@ -0,0 +1,144 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Import smoke-test worker, run as a long-lived subprocess by ImportSmokePool.
+
+Usage: python smoke_worker.py <cpu_seconds> <memory_mb> <max_checks>
+
+Protocol (one JSON object per line):
+    stdin:  {"source": "<agent.py source>"}
+    stdout: {"ok": true} or {"ok": false, "error_type": ..., "message": ..., "lineno": ..., "module": ...}
+
+The ADK is imported once at startup so each smoke test only pays for
+executing the generated module itself. Resource limits are applied after
+that and before any generated code runs, as in the backend's tool worker:
+each check gets cpu_seconds of CPU time and memory_mb of address space on
+top of what the warm worker already uses. Going over the CPU limit kills
+the worker with SIGXCPU and the pool replaces it; the hard limit covers
+max_checks checks (the pool recycles the worker after that), so generated
+code can't lift its own limit.
+"""
+
+import contextlib
+import io
+import json
+import math
+import os
+import sys
+import traceback
+import types
+
+GENERATED_FILENAME = "agent.py"
+
+
+def _cpu_used() -> int:
+    """CPU seconds used so far, rounded up so a new limit never starts in the past."""
+    usage = os.times()
+    return math.ceil(usage.user + usage.system)
+
+
+def _address_space() -> int:
+    """Current virtual memory size in bytes (0 if it can't be read)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _apply_limits(cpu_seconds: int, memory_mb: int, max_checks: int):
+    try:
+        import resource
+    except ImportError:
+        return  # Not available on this platform; the pool's wall-clock timeout still applies
+    if memory_mb > 0:
+        limit = _address_space() + memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    if cpu_seconds > 0:
+        hard = _cpu_used() + cpu_seconds * max_checks + 1
+        resource.setrlimit(resource.RLIMIT_CPU, (_cpu_used() + cpu_seconds, hard))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+
+def _set_check_cpu_limit(cpu_seconds: int):
+    if cpu_seconds <= 0:
+        return
+    try:
+        import resource
+    except ImportError:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = _cpu_used() + cpu_seconds
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _smoke_import(source: str, counter: int) -> dict:
+    """Execute generated agent source as a throwaway module."""
+    module_name = f"_artifex_smoke_{counter}"
+    module = types.ModuleType(module_name)
+    module.__file__ = GENERATED_FILENAME
+    sys.modules[module_name] = module
+
+    try:
+        code = compile(source, GENERATED_FILENAME, "exec")
+        # Generated modules may print at import time; keep the protocol stream clean
+        with contextlib.redirect_stdout(io.StringIO()):
+            exec(code, module.__dict__)
+        if not hasattr(module, "root_agent"):
+            return {"ok": False, "error_type": "MissingRootAgent", "message": "root_agent is not defined"}
+        return {"ok": True}
+    except BaseException as e:
+        lineno = getattr(e, "lineno", None) if isinstance(e, SyntaxError) else None
+        for frame in traceback.extract_tb(e.__traceback__):
+            if frame.filename == GENERATED_FILENAME:
+                lineno = frame.lineno
+        return {
+            "ok": False,
+            "error_type": type(e).__name__,
+            "message": str(e),
+            "lineno": lineno,
+            "module": getattr(e, "name", None) if isinstance(e, ImportError) else None,
+        }
+    finally:
+        sys.modules.pop(module_name, None)
+
+
+def main():
+    cpu_seconds, memory_mb, max_checks = (int(value) for value in sys.argv[1:4])
+    try:
+        import google.adk.agents  # noqa: F401 - warm the import cache
+    except Exception:
+        pass
+    _apply_limits(cpu_seconds, memory_mb, max_checks)
+
+    out = sys.stdout
+    out.write(json.dumps({"ready": True}) + "\n")
+    out.flush()
+
+    for counter, line in enumerate(sys.stdin):
+        _set_check_cpu_limit(cpu_seconds)
+        try:
+            request = json.loads(line)
+            response = _smoke_import(request["source"], counter)
+        except Exception as e:
+            response = {"ok": False, "error_type": "WorkerError", "message": str(e)}
+        out.write(json.dumps(response) + "\n")
+        out.flush()
+
+
+if __name__ == "__main__":
+    main()
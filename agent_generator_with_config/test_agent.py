@@ -11,6 +11,7 @@ import sys
 from pathlib import Path
 from dotenv import load_dotenv
 from google import genai
+from google.genai import types
 
 # ============================================================================
 # CONFIGURATION - Change these to test different agents
@@ -88,6 +89,12 @@ def test_agent_interactive(agent_config, api_key):
     client = genai.Client(api_key=api_key)
     model = "gemini-flash-latest"
     
+    # The chat keeps the role-tagged history; each turn sends only the new message
+    chat = client.chats.create(
+        model=model,
+        config=types.GenerateContentConfig(system_instruction=agent_config['instruction'])
+    )
+    
     # Chat loop
     conversation_history = []
     
@@ -102,14 +109,8 @@ def test_agent_interactive(agent_config, api_key):
             continue
         
         try:
-            # Build prompt with agent instruction
-            full_prompt = f"{agent_config['instruction']}\n\nUser: {user_input}\nAssistant:"
-            
             # Call Gemini API
-            response = client.models.generate_content(
-                model=model,
-                contents=full_prompt
-            )
+            response = chat.send_message(user_input)
             
             agent_response = response.text
             
@@ -152,11 +153,10 @@ def test_agent_single(agent_config, api_key, prompt):
     client = genai.Client(api_key=api_key)
     model = "gemini-flash-latest"
     
-    full_prompt = f"{agent_config['instruction']}\n\nUser: {prompt}\nAssistant:"
-    
     response = client.models.generate_content(
         model=model,
-        contents=full_prompt
+        contents=prompt,
+        config=types.GenerateContentConfig(system_instruction=agent_config['instruction'])
     )
     
     return {
@@ -0,0 +1,122 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Test batch generation across a process pool.
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import code_generator
+from code_generator import _batch_output_name, _glob_base, batch_generate, main
+from test_configs import CUSTOM_TOOL_CONFIG, SIMPLE_RESEARCH_AGENT_CONFIG
+
+
+def _write_config(path: Path, config: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(config))
+
+
+def test_output_names():
+    """Outputs mirror each config's path under the pattern's base."""
+    base = _glob_base("templates/**/project_config.json")
+    assert base == Path("templates")
+    assert _glob_base("*.json") == Path(".")
+    assert _batch_output_name("templates/a/x/project_config.json", base) == "a/x"
+    assert _batch_output_name("templates/b/x/project_config.json", base) == "b/x"
+    assert _batch_output_name("templates/a/y.json", base) == "a/y"
+    assert _batch_output_name("templates/project_config.json", base) == "project_config"
+    print("✓ Output folders keep the config's relative path")
+
+
+def test_same_folder_names_do_not_collide():
+    """a/x and b/x render into separate folders, each writing every file."""
+    with tempfile.TemporaryDirectory() as tmp:
+        configs = Path(tmp) / "configs"
+        _write_config(configs / "a" / "x" / "project_config.json", CUSTOM_TOOL_CONFIG)
+        _write_config(configs / "b" / "x" / "project_config.json", SIMPLE_RESEARCH_AGENT_CONFIG)
+        out = Path(tmp) / "out"
+
+        results = batch_generate(str(configs / "**" / "project_config.json"), str(out), jobs=2)
+        assert [r["success"] for r in results] == [True, True]
+        assert [r["output_directory"] for r in results] == [str(out / "a" / "x"), str(out / "b" / "x")]
+        assert all(r["written_count"] == r["file_count"] for r in results)
+        assert "research" in (out / "b" / "x" / "agent.py").read_text().lower()
+    print("✓ Same-named folders under different parents get their own output")
+
+
+def test_duplicate_outputs_fail_before_rendering():
+    """Configs that still map to one folder fail without writing; the rest of the batch runs."""
+    with tempfile.TemporaryDirectory() as tmp:
+        configs = Path(tmp) / "configs"
+        _write_config(configs / "x.json", CUSTOM_TOOL_CONFIG)
+        _write_config(configs / "x" / "project_config.json", SIMPLE_RESEARCH_AGENT_CONFIG)
+        _write_config(configs / "y.json", SIMPLE_RESEARCH_AGENT_CONFIG)
+        out = Path(tmp) / "out"
+
+        results = {Path(r["config_file"]).relative_to(configs).as_posix(): r
+                   for r in batch_generate(str(configs / "**" / "*.json"), str(out), jobs=2)}
+        assert not results["x.json"]["success"] and "x/project_config.json" in results["x.json"]["error"]
+        assert not results["x/project_config.json"]["success"]
+        assert results["y.json"]["success"]
+        assert sorted(os.listdir(out)) == ["y"]
+    print("✓ Colliding outputs reported before any work is submitted")
+
+
+def _crashing_render(config_file, output_dir, *args):
+    """Stand-in worker that dies on one config, breaking the pool."""
+    if "crash" in config_file:
+        os._exit(1)
+    return {"config_file": config_file, "success": True, "warnings": [], "output_directory": output_dir,
+            "file_count": 0, "written_count": 0, "seconds": 0.0}
+
+
+def test_worker_crash_fails_configs_not_batch():
+    """A dead worker is reported per config instead of aborting the batch."""
+    original = code_generator._render_config_file
+    code_generator._render_config_file = _crashing_render  # Forked workers inherit the patch
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            _write_config(Path(tmp) / "crash.json", CUSTOM_TOOL_CONFIG)
+            _write_config(Path(tmp) / "fine.json", CUSTOM_TOOL_CONFIG)
+            results = batch_generate(os.path.join(tmp, "*.json"), os.path.join(tmp, "out"), jobs=1)
+    finally:
+        code_generator._render_config_file = original
+
+    assert len(results) == 2
+    crashed = results[0]
+    assert not crashed["success"] and "BrokenProcessPool" in crashed["error"]
+    print("✓ Worker crash reported as that config's failure")
+
+
+def test_main_exit_code():
+    with tempfile.TemporaryDirectory() as tmp:
+        _write_config(Path(tmp) / "good.json", CUSTOM_TOOL_CONFIG)
+        assert main(["batch", os.path.join(tmp, "*.json"), "--out", os.path.join(tmp, "out"), "--jobs", "1"]) == 0
+        (Path(tmp) / "bad.json").write_text("{not json")
+        assert main(["batch", os.path.join(tmp, "*.json"), "--out", os.path.join(tmp, "out"), "--jobs", "1"]) == 1
+    print("✓ Batch exit code reflects failed configs")
+
+
+if __name__ == "__main__":
+    print("Testing batch generation...\n")
+    test_output_names()
+    test_same_folder_names_do_not_collide()
+    test_duplicate_outputs_fail_before_rendering()
+    test_worker_crash_fails_configs_not_batch()
+    test_main_exit_code()
+    print("\n✅ All batch generation tests passed!")
@@ -0,0 +1,97 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Test the content-addressed blob store for generated files.
+"""
+
+import os
+import stat
+import tempfile
+from pathlib import Path
+
+from blob_store import BlobStore
+from code_generator import AgentCodeGenerator, write_file_if_changed
+from config_schema import AgentProjectConfig
+from test_configs import CUSTOM_TOOL_CONFIG
+
+
+def test_projects_share_blobs():
+    """Identical files in different projects are one blob; regeneration writes nothing."""
+    config = AgentProjectConfig(**CUSTOM_TOOL_CONFIG)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = BlobStore(Path(tmp) / ".blobs")
+        generator = AgentCodeGenerator(blob_store=store)
+        files = generator.generate_from_config(config, os.path.join(tmp, "one"))
+        generator.generate_from_config(config, os.path.join(tmp, "two"))
+
+        for filename in files:
+            one, two = Path(tmp, "one", filename), Path(tmp, "two", filename)
+            assert one.read_text() == files[filename]
+            assert os.path.samefile(one, two)
+            assert stat.S_IMODE(one.stat().st_mode) == 0o444
+
+        stats = store.stats()
+        assert stats["blobs"] == len(set(files.values()))
+        assert stats["references"] == 2 * len(files)
+
+        generator.generate_from_config(config, os.path.join(tmp, "two"))
+        assert generator.last_written_files == []
+        print(f"✓ {2 * len(files)} project files stored as {stats['blobs']} blobs")
+
+
+def test_gc_removes_unreferenced_blobs():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = BlobStore(Path(tmp) / ".blobs")
+        a, b = Path(tmp, "a.py"), Path(tmp, "b.py")
+        assert store.link(a, "shared = 1\n")
+        assert store.link(b, "shared = 1\n")
+        assert store.link(a, "changed = 2\n")  # Replaces a's link, the shared blob stays
+        assert store.gc()["removed"] == 0
+
+        b.unlink()
+        assert store.gc() == {"removed": 1, "freed_bytes": len("shared = 1\n")}
+        assert store.stats()["blobs"] == 1 and a.read_text() == "changed = 2\n"
+
+        # Unchanged content is not relinked
+        assert store.link(a, "changed = 2\n") is False
+        print("✓ Blobs without project links are garbage collected")
+
+
+def test_executable_blobs_are_separate():
+    """Hard links share mode bits, so executables get their own blob."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = BlobStore(Path(tmp) / ".blobs")
+        plain, script = Path(tmp, "plain.py"), Path(tmp, "script.py")
+        store.link(plain, "print('hi')\n")
+        store.link(script, "print('hi')\n", executable=True)
+        assert not os.path.samefile(plain, script)
+        assert stat.S_IMODE(script.stat().st_mode) == 0o555
+
+        # Writing without the store never chmods a shared inode
+        other = Path(tmp, "other.py")
+        store.link(other, "print('hi')\n")
+        assert write_file_if_changed(other, "print('hi')\n", mode=0o755)
+        assert stat.S_IMODE(plain.stat().st_mode) == 0o444
+        assert stat.S_IMODE(other.stat().st_mode) == 0o755
+        print("✓ Executable and shared-inode modes handled")
+
+
+if __name__ == "__main__":
+    print("Testing blob store...\n")
+    test_projects_share_blobs()
+    test_gc_removes_unreferenced_blobs()
+    test_executable_blobs_are_separate()
+    print("\n✅ All blob store tests passed!")
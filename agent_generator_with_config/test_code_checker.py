@@ -0,0 +1,275 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Test validation of generated code: static tool checks, failure attribution,
+the import smoke pool and the orchestrator's repair loop.
+"""
+
+import asyncio
+import os
+import tempfile
+import uuid
+
+from meta_agent.extraction import ExtractedTool
+from meta_agent.orchestrator import MetaAgentOrchestrator
+from meta_agent.tools.code_checker import (
+    ImportSmokePool, check_project_tools, check_tool_code, get_smoke_pool, locate_tool, smoke_test_agent_source,
+    tools_for_module
+)
+from meta_agent.tools.config_merger import add_agent_to_config, add_tool_to_config, create_project, update_project_metadata
+
+AGENT_HEADER = '''"""
+demo: generated
+"""
+
+from google.adk.agents.llm_agent import LlmAgent
+from google.adk.tools.function_tool import FunctionTool
+'''
+
+AGENT_FOOTER = '''
+root_agent = LlmAgent(name="main", model="gemini-2.5-flash", instruction="Help.")
+'''
+
+
+def test_check_tool_code():
+    """Syntax errors, a missing function and undefined names are reported with tool-relative lines."""
+    assert check_tool_code("add", "def add(a: int, b: int) -> int:\n    return a + b\n") == []
+    assert check_tool_code("now", "def now():\n    return datetime.now()\n", ["from datetime import datetime"]) == []
+
+    [issue] = check_tool_code("add", "def add(a, b)\n    return a + b\n", ["import math"])
+    assert issue.kind == "syntax" and issue.tool == "add" and issue.lineno == 1
+
+    [issue] = check_tool_code("add", "def plus(a, b):\n    return a + b\n")
+    assert issue.kind == "missing_function" and "plus" in issue.message
+
+    issues = check_tool_code("fetch", "def fetch(url):\n    data = requests.get(url)\n    return json.loads(requests.text)\n")
+    assert [(issue.kind, issue.lineno) for issue in issues] == [("undefined_name", 2), ("undefined_name", 3)]
+    assert "requests" in issues[0].message and "json" in issues[1].message
+
+    # Other tools and star imports count as defined
+    assert check_tool_code("both", "def both(x):\n    return helper(x)\n", known_names={"helper"}) == []
+    assert check_tool_code("star", "def star():\n    return sqrt(4)\n", ["from math import *"]) == []
+    print("✓ Static tool checks")
+
+
+def test_check_project_tools():
+    config = {"tools": {
+        "good": {"type": "custom_function", "function_code": "def good():\n    return bad()\n"},
+        "bad": {"type": "custom_function", "function_code": "def bad():\n    return missing\n"},
+        "google_search": {"type": "builtin"},
+    }}
+    broken = check_project_tools(config)
+    assert list(broken) == ["bad"] and broken["bad"][0].kind == "undefined_name"
+    print("✓ Project tools checked; builtins skipped")
+
+
+def test_tools_for_module():
+    """Import failures are attributed to the tools whose imports name the module."""
+    config = {"tools": {
+        "plot": {"imports": ["import matplotlib.pyplot as plt"]},
+        "frame": {"imports": ["from pandas import DataFrame", "import numpy as np"]},
+        "calc": {"imports": ["import math, numpy"]},
+        "plain": {},
+    }}
+    assert tools_for_module("numpy", config) == ["frame", "calc"]
+    assert tools_for_module("matplotlib.pyplot", config) == ["plot"]
+    assert tools_for_module("pandas.core", config) == ["frame"]
+    assert tools_for_module("plt", config) == []
+    assert tools_for_module(None, config) == []
+    print("✓ Failing modules mapped to the tools importing them")
+
+
+def test_locate_tool():
+    """A line inside a tool's chunk - its imports included - maps to that tool."""
+    source = AGENT_HEADER + '''
+
+# Tool: First tool
+import json
+
+def first(x):
+    return json.dumps(x)
+
+
+# Tool: Second tool
+def second():
+    return 1 / 0
+''' + AGENT_FOOTER
+    lines = source.splitlines()
+    line = {text: index + 1 for index, text in enumerate(lines)}
+    names = ["first", "second"]
+    assert locate_tool(source, line["import json"], names) == "first"
+    assert locate_tool(source, line["    return json.dumps(x)"], names) == "first"
+    assert locate_tool(source, line["    return 1 / 0"], names) == "second"
+    assert locate_tool(source, line["from google.adk.agents.llm_agent import LlmAgent"], names) is None
+    assert locate_tool(source, None, names) is None
+    assert locate_tool("def broken(:\n", 1, names) is None
+    print("✓ Failing lines mapped to the tool that owns them")
+
+
+def test_smoke_pool():
+    """Verdicts for good and broken modules; hung, crashed and over-limit workers are replaced."""
+    async def run():
+        pool = ImportSmokePool(size=1, timeout=3, cpu_seconds=1, memory_mb=256, max_checks=3)
+        verdicts = {
+            "ok": await pool.run(AGENT_HEADER + AGENT_FOOTER),
+            "no_root": await pool.run(AGENT_HEADER),
+            "error": await pool.run(AGENT_HEADER + "\nvalue = 1 / 0\n" + AGENT_FOOTER),
+            "missing": await pool.run("import module_that_does_not_exist\n"),
+            "hang": await pool.run("import time\ntime.sleep(30)\n"),
+            "after_hang": await pool.run(AGENT_HEADER + AGENT_FOOTER),
+            "crash": await pool.run("import os\nos._exit(3)\n"),
+            "spin": await pool.run("while True:\n    pass\n"),
+            "allocate": await pool.run("data = bytearray(1024 ** 3)\n"),
+            "after": await pool.run(AGENT_HEADER + AGENT_FOOTER),
+        }
+        spawned = pool._spawned
+        await pool.close()
+        return verdicts, spawned
+
+    verdicts, spawned = asyncio.run(run())
+    assert verdicts["ok"] == {"ok": True}
+    assert verdicts["no_root"]["error_type"] == "MissingRootAgent"
+    assert verdicts["error"]["error_type"] == "ZeroDivisionError" and verdicts["error"]["lineno"] == 8
+    assert verdicts["missing"]["module"] == "module_that_does_not_exist"
+    assert verdicts["hang"]["error_type"] == "Timeout"
+    assert verdicts["after_hang"] == {"ok": True}
+    assert verdicts["crash"]["error_type"] == "WorkerCrashed" and "exit code 3" in verdicts["crash"]["message"]
+    assert verdicts["spin"]["error_type"] == "WorkerCrashed"  # SIGXCPU before the wall-clock timeout
+    assert verdicts["allocate"]["error_type"] == "MemoryError"
+    assert verdicts["after"] == {"ok": True}
+    assert spawned == 1
+    print("✓ Smoke pool contains hangs, crashes, CPU and memory limits")
+
+
+def test_smoke_pool_recycles_workers():
+    async def run_checks():
+        pool = ImportSmokePool(size=1, timeout=10, max_checks=2)
+        pids = []
+        for _ in range(3):
+            verdict = await pool.run("import os\nprint(os.getpid())\nroot_agent = os.getpid()\n")
+            assert verdict == {"ok": True}
+            pids.append(pool._idle[-1].pid if pool._idle else None)
+        await pool.close()
+        return pids
+
+    pids = asyncio.run(run_checks())
+    # The first worker serves two checks, then a fresh one takes over
+    assert pids[0] is not None and pids[1] is None and pids[2] not in (None, pids[0])
+    print("✓ Smoke workers recycled after max_checks")
+
+
+def test_smoke_test_attribution():
+    """Import failures are traced to a tool by module name, then by line."""
+    config = {"tools": {
+        "stocks": {"type": "custom_function", "imports": ["import yfinance_that_does_not_exist"]},
+        "divide": {"type": "custom_function", "imports": []},
+    }}
+    by_module = AGENT_HEADER + "\n\n# Tool: Stocks\nimport yfinance_that_does_not_exist\n\ndef stocks():\n    return 1\n" + AGENT_FOOTER
+    by_line = AGENT_HEADER + "\n\n# Tool: Divide\nRATIO = 1 / 0\n\ndef divide():\n    return RATIO\n" + AGENT_FOOTER
+
+    async def run():
+        try:
+            return (
+                await smoke_test_agent_source(by_module, config),
+                await smoke_test_agent_source(by_line, config),
+                await smoke_test_agent_source(AGENT_HEADER + AGENT_FOOTER, config),
+            )
+        finally:
+            await get_smoke_pool().close()
+
+    module_issues, line_issues, clean = asyncio.run(run())
+    assert [(issue.kind, issue.tool) for issue in module_issues] == [("import", "stocks")]
+    assert [(issue.kind, issue.tool) for issue in line_issues] == [("import", "divide")]
+    assert "ZeroDivisionError" in line_issues[0].message
+    assert clean == []
+    print("✓ Smoke test failures attributed to tools")
+
+
+def test_orchestrator_repairs_broken_tool():
+    """A tool that fails validation is regenerated with the issues as feedback and re-rendered."""
+    orchestrator = MetaAgentOrchestrator(api_key="test-key", use_templates=False, use_tool_library=False)
+    orchestrator.session_id = f"session_test_{uuid.uuid4().hex[:8]}"
+    create_project(session_id=orchestrator.session_id, project_name="checked_project", description="Checks", version="1.0.0")
+    update_project_metadata(session_id=orchestrator.session_id, main_agent="main_agent")
+    add_agent_to_config(
+        session_id=orchestrator.session_id, agent_name="main_agent", agent_type="llm_agent",
+        description="Main", model="gemini-2.5-flash", instruction="Help.", tools=["convert"],
+        sub_agents=[], config_params={}
+    )
+    add_tool_to_config(
+        session_id=orchestrator.session_id, tool_name="convert", tool_type="custom_function",
+        description="Convert", function_code="def convert(x: float) -> float:\n    return undefined_rate * x\n",
+        imports=[], dependencies=[]
+    )
+    requests = []
+
+    async def generate_tool_code(tool_name, feedback=None):
+        requests.append((tool_name, feedback))
+        return ExtractedTool(function_name=tool_name, function_code="def convert(x: float) -> float:\n    return 2 * x\n")
+
+    orchestrator._generate_tool_code = generate_tool_code
+
+    async def run():
+        result = await orchestrator._step6_generate_code("./generated_test_agents", "checked_project", write_to_disk=False)
+        try:
+            return await orchestrator._validate_generated_code(result, "./generated_test_agents", "checked_project", False)
+        finally:
+            await get_smoke_pool().close()
+
+    result = asyncio.run(run())
+    assert len(requests) == 1 and requests[0][0] == "convert" and "undefined_rate" in requests[0][1]
+    assert result["validation"] == {"ok": True, "issues": []}
+    assert "return 2 * x" in result["file_contents"]["agent.py"]
+    print("✓ Orchestrator regenerates a broken tool and re-renders the project")
+
+
+def test_project_dir_stays_in_output_dir():
+    """A project name from the plan can't place the generated project outside output_dir."""
+    orchestrator = MetaAgentOrchestrator(api_key="test-key", use_templates=False, use_tool_library=False)
+    orchestrator.session_id = f"session_test_{uuid.uuid4().hex[:8]}"
+    create_project(session_id=orchestrator.session_id, project_name="escaped", description="Escape", version="1.0.0")
+    update_project_metadata(session_id=orchestrator.session_id, main_agent="main_agent")
+    add_agent_to_config(
+        session_id=orchestrator.session_id, agent_name="main_agent", agent_type="llm_agent",
+        description="Main", model="gemini-2.5-flash", instruction="Help.", tools=[],
+        sub_agents=[], config_params={}
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        output_dir = os.path.join(tmp, "out")
+        for project_name in ("../../escaped", "../escaped", "nested/escaped", ".."):
+            try:
+                asyncio.run(orchestrator._step6_generate_code(output_dir, project_name))
+                assert False, f"expected ValueError for {project_name!r}"
+            except ValueError:
+                pass
+        assert os.listdir(tmp) == []
+
+        result = asyncio.run(orchestrator._step6_generate_code(output_dir, "escaped"))
+        assert result["output_directory"] == os.path.realpath(os.path.join(output_dir, "escaped"))
+    print("✓ Generated project confined to the output directory")
+
+
+if __name__ == "__main__":
+    print("Testing generated code validation...\n")
+    test_check_tool_code()
+    test_check_project_tools()
+    test_tools_for_module()
+    test_locate_tool()
+    test_smoke_pool()
+    test_smoke_pool_recycles_workers()
+    test_smoke_test_attribution()
+    test_orchestrator_repairs_broken_tool()
+    test_project_dir_stays_in_output_dir()
+    print("\n✅ All code validation tests passed!")
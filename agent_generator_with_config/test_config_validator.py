@@ -0,0 +1,68 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Test the single-pass config validator and its cached fast path.
+"""
+
+import copy
+
+from config_schema import AgentProjectConfig, validate_agent_config, load_validated_config
+from config_validator import validate_config_dict, validate_config_cached
+from test_configs import SIMPLE_RESEARCH_AGENT_CONFIG, SEQUENTIAL_PROCESSING_CONFIG
+
+
+def test_valid_configs_have_no_issues():
+    """The sample configurations validate cleanly on both paths."""
+    for config_dict in (SIMPLE_RESEARCH_AGENT_CONFIG, SEQUENTIAL_PROCESSING_CONFIG):
+        assert validate_config_dict(config_dict) == []
+        assert validate_agent_config(AgentProjectConfig(**config_dict)) == []
+    print("✓ Sample configs are valid")
+
+
+def test_issues_carry_json_paths():
+    """Broken references are reported with the JSON path of the offending value."""
+    config_dict = copy.deepcopy(SEQUENTIAL_PROCESSING_CONFIG)
+    main_agent = config_dict["main_agent"]
+    config_dict["agents"][main_agent]["sub_agents"].append("ghost_agent")
+    config_dict["agents"][main_agent]["tools"] = ["ghost_tool"]
+    index = len(config_dict["agents"][main_agent]["sub_agents"]) - 1
+
+    issues = {(issue.path, issue.code) for issue in validate_config_dict(config_dict)}
+
+    assert (f"$.agents.{main_agent}.sub_agents[{index}]", "unknown_sub_agent") in issues
+    assert (f"$.agents.{main_agent}.tools[0]", "unknown_tool") in issues
+    print(f"✓ Reported {len(issues)} issues with JSON paths")
+
+
+def test_cached_fast_path():
+    """A repeated config hits the cache and reuses the parsed object."""
+    config_dict = copy.deepcopy(SIMPLE_RESEARCH_AGENT_CONFIG)
+    config_dict["description"] = "cache test"
+
+    _, _, cached = validate_config_cached(config_dict)
+    assert not cached
+    _, _, cached = validate_config_cached(config_dict)
+    assert cached
+
+    first, _ = load_validated_config(config_dict)
+    second, _ = load_validated_config(copy.deepcopy(config_dict))
+    assert first is second
+    print("✓ Repeated validation served from cache")
+
+
+if __name__ == "__main__":
+    test_valid_configs_have_no_issues()
+    test_issues_carry_json_paths()
+    test_cached_fast_path()
@@ -0,0 +1,117 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Test extraction of tool code and JSON from LLM responses.
+"""
+
+from meta_agent.extraction import extract_json, extract_tool_code, JSONExtractionError
+
+RESPONSE_WITH_PROSE = '''Sure! Here is the tool:
+
+```python
+import json
+import requests
+from bs4 import BeautifulSoup
+
+BASE_URL = "https://example.com"
+
+def _clean(text):
+    return text.strip()
+
+def fetch_title(path: str) -> str:
+    """Fetch a page title."""
+    html = requests.get(BASE_URL + path).text
+    return _clean(BeautifulSoup(html, "html.parser").title.string)
+```
+
+This function fetches the page and returns its title. Let me know if you need more!
+'''
+
+
+def test_extracts_function_imports_and_dependencies():
+    """Only the tool, its helpers and the imports it uses are kept."""
+    tool = extract_tool_code(RESPONSE_WITH_PROSE, "fetch_title")
+
+    assert tool is not None
+    assert tool.function_code.startswith("BASE_URL")
+    assert "def _clean" in tool.function_code
+    assert "Let me know" not in tool.function_code
+    assert tool.imports == ["import requests", "from bs4 import BeautifulSoup"]
+    assert tool.dependencies == ["requests", "beautifulsoup4"]
+    print("✓ Extracted tool with helpers, imports and dependencies")
+
+
+def test_unfenced_and_renamed():
+    """Bare code is parsed, and a mismatched function name is corrected."""
+    response = "def get_weather(city):\n    return city.upper()\n\nThat's it."
+    tool = extract_tool_code(response, "weather_lookup")
+
+    assert tool is not None
+    assert tool.function_code.startswith("def weather_lookup(city):")
+    assert tool.imports == [] and tool.dependencies == []
+    print("✓ Bare code extracted and renamed")
+
+
+def test_no_function():
+    assert extract_tool_code("I cannot help with that.", "anything") is None
+    print("✓ No function found returns None")
+
+
+def test_json_skips_commentary_and_other_objects():
+    """The first object with the required keys wins; surrounding text is ignored."""
+    response = 'Example: {"x": 1}\nPlan:\n```json\n{"main_agent_name": "m", "agents": [],}\n```\nDone.'
+    assert extract_json(response, required_keys=("agents",)) == {"main_agent_name": "m", "agents": []}
+    print("✓ JSON selected past commentary and extra objects")
+
+
+def test_json_repairs_truncated_output():
+    """Truncated output is closed and incomplete trailing members dropped."""
+    response = '{"main_agent_name": "m", "agents": [{"name": "a", "type": "llm_agent"}, {"name": "b", "ty'
+    plan = extract_json(response, required_keys=("agents",))
+    assert plan["agents"][0] == {"name": "a", "type": "llm_agent"}
+    assert plan["agents"][1]["name"] == "b"
+
+    try:
+        extract_json("No JSON here", required_keys=("agents",))
+        assert False, "expected JSONExtractionError"
+    except JSONExtractionError:
+        pass
+    print("✓ Truncated JSON repaired")
+
+
+def test_truncated_json_not_replaced_by_nested_object():
+    """A truncated object is repaired, not swapped for one of its members."""
+    response = '{"agents": [{"name": "a", "type": "llm_agent"}], "main_agent_name": "a", "desc'
+    assert extract_json(response) == {"agents": [{"name": "a", "type": "llm_agent"}], "main_agent_name": "a"}
+
+    # Members of a malformed object are only taken when they carry the requested keys
+    broken = 'Plan: {"plan": {"agents": [1] "x"}, "note": {"main_agent_name": "m", "agents": []}} end'
+    assert extract_json(broken, required_keys=("agents", "main_agent_name")) == {"main_agent_name": "m", "agents": []}
+    assert extract_json('{"a": {"purpose": "p"} "b"} {"other": 1}', known_keys=("purpose",)) == {"purpose": "p"}
+    try:
+        extract_json('{"a": {"x": 1} "b"}', known_keys=("purpose",))
+        assert False, "expected JSONExtractionError"
+    except JSONExtractionError:
+        pass
+    print("✓ Nested objects never stand in for a truncated response")
+
+
+if __name__ == "__main__":
+    test_extracts_function_imports_and_dependencies()
+    test_unfenced_and_renamed()
+    test_no_function()
+    test_json_skips_commentary_and_other_objects()
+    test_json_repairs_truncated_output()
+    test_truncated_json_not_replaced_by_nested_object()
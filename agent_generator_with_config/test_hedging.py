@@ -0,0 +1,81 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Test hedged LLM requests and the global hedge budget.
+"""
+
+import asyncio
+
+from meta_agent.hedging import HedgePolicy, hedged
+
+
+def _warm_policy(**kwargs) -> HedgePolicy:
+    policy = HedgePolicy(min_samples=5, min_delay_ms=10, **kwargs)
+    for _ in range(5):
+        policy.observe("architecture", 20.0)
+    return policy
+
+
+def test_slow_call_is_hedged():
+    """A call stuck past the step's p95 is raced by a duplicate, which wins."""
+    policy = _warm_policy(budget_fraction=1.0)
+    delays = [1.0, 0.01]
+
+    async def call():
+        await asyncio.sleep(delays.pop(0))
+        return "ok"
+
+    async def run():
+        started = asyncio.get_running_loop().time()
+        result = await hedged(call, policy, "architecture")
+        return result, asyncio.get_running_loop().time() - started
+
+    result, elapsed = asyncio.run(run())
+    assert result == "ok"
+    assert elapsed < 0.5
+    assert policy.stats()["hedge_wins"] == 1
+    print(f"✓ Hedged call finished in {elapsed:.3f}s")
+
+
+def test_budget_caps_hedges():
+    """Once the budget is spent, slow calls are simply awaited."""
+    policy = _warm_policy(budget_fraction=0.0, budget_burst=1)
+    started_calls = []
+
+    async def call():
+        started_calls.append(1)
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def run():
+        for _ in range(3):
+            await hedged(call, policy, "architecture")
+
+    asyncio.run(run())
+    assert policy.stats()["hedges"] == 1
+    assert len(started_calls) == 4
+    print("✓ Hedge budget respected")
+
+
+def test_cold_step_not_hedged():
+    policy = HedgePolicy(min_samples=5)
+    assert policy.delay_for("tool_code") is None
+    print("✓ Steps without latency history are not hedged")
+
+
+if __name__ == "__main__":
+    test_slow_call_is_hedged()
+    test_budget_caps_hedges()
+    test_cold_step_not_hedged()
@@ -0,0 +1,118 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Test prompt assembly and per-session token accounting.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from meta_agent import prompt_budget
+from meta_agent.prompt_budget import PromptAssembler, TokenUsage, compact_json
+
+
+class _CacheError(Exception):
+    def __init__(self, code: int):
+        super().__init__(f"{code} caching failed")
+        self.code = code
+
+
+class _Caches:
+    def __init__(self, error_code: int = 0):
+        self.error_code = error_code
+        self.attempts = 0
+        self.created = 0
+
+    async def create(self, model, config):
+        self.attempts += 1
+        if self.error_code:
+            raise _CacheError(self.error_code)
+        self.created += 1
+        return SimpleNamespace(name=f"cachedContents/{self.created}")
+
+
+def _client(caches: _Caches) -> SimpleNamespace:
+    return SimpleNamespace(aio=SimpleNamespace(caches=caches))
+
+
+def test_system_prompt_cached_once():
+    """A long system prompt is cached once and referenced by name afterwards."""
+    caches = _Caches()
+    assembler = PromptAssembler(_client(caches), "model-a", api_key="k1", min_cache_tokens=10)
+    system_prompt = "You are a specialist. " * 20
+
+    first = asyncio.run(assembler.build_config(system_prompt, json_output=True))
+    second = asyncio.run(assembler.build_config(system_prompt))
+    assert first.cached_content == second.cached_content == "cachedContents/1"
+    assert first.system_instruction is None
+    assert first.response_mime_type == "application/json"
+
+    # Short prompts are sent inline
+    assert asyncio.run(assembler.build_config("Be brief.")).system_instruction == "Be brief."
+    print("✓ System prompt cached and reused")
+
+
+def test_inline_fallback_when_caching_unsupported():
+    """A rejected cache request isn't repeated for a long while; a transient failure only briefly."""
+    system_prompt = "You are a specialist. " * 20
+    caches = _Caches(error_code=400)
+    assembler = PromptAssembler(_client(caches), "model-b", api_key="k2", min_cache_tokens=10)
+    assert asyncio.run(assembler.build_config(system_prompt)).system_instruction == system_prompt
+    assert asyncio.run(assembler.build_config(system_prompt)).system_instruction == system_prompt
+    assert caches.attempts == 1
+
+    remaining = prompt_budget._uncacheable[(assembler._key_fingerprint, "model-b")] - prompt_budget.time.time()
+    assert prompt_budget.CACHE_ERROR_BACKOFF_SECONDS < remaining <= prompt_budget.UNCACHEABLE_RETRY_SECONDS
+    print("✓ Falls back to inline system instruction")
+
+
+def test_transient_cache_error_retried():
+    system_prompt = "You are a specialist. " * 20
+    caches = _Caches(error_code=503)
+    assembler = PromptAssembler(_client(caches), "model-c", api_key="k3", min_cache_tokens=10)
+    assert asyncio.run(assembler.build_config(system_prompt)).system_instruction == system_prompt
+    unavailable = (assembler._key_fingerprint, "model-c")
+    assert prompt_budget._uncacheable[unavailable] - prompt_budget.time.time() <= prompt_budget.CACHE_ERROR_BACKOFF_SECONDS
+
+    # Once the backoff has passed and the provider recovers, the prompt is cached
+    prompt_budget._uncacheable[unavailable] = 0.0
+    caches.error_code = 0
+    assert asyncio.run(assembler.build_config(system_prompt)).cached_content == "cachedContents/1"
+    assert caches.attempts == 2 and unavailable not in prompt_budget._uncacheable
+    print("✓ Transient cache errors retried after a short backoff")
+
+
+def test_usage_and_compaction():
+    usage = TokenUsage()
+    metadata = SimpleNamespace(prompt_token_count=100, cached_content_token_count=80,
+                               candidates_token_count=20, thoughts_token_count=None, total_token_count=120)
+    usage.record("architecture", 110, metadata)
+    usage.record("architecture", 110, metadata)
+    usage.record("tool_code", 50, None)
+
+    report = usage.to_dict()
+    assert report["steps"]["architecture"]["calls"] == 2
+    assert report["total"]["cached_tokens"] == 160
+    assert report["total"]["estimated_prompt_tokens"] == 270
+
+    assert compact_json({"purpose": "p", "suggested_tools": [], "complexity": "simple"}) == '{"purpose":"p","complexity":"simple"}'
+    print("✓ Usage recorded per step")
+
+
+if __name__ == "__main__":
+    test_system_prompt_cached_once()
+    test_inline_fallback_when_caching_unsupported()
+    test_transient_cache_error_retried()
+    test_usage_and_compaction()
@@ -0,0 +1,97 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Test per-step model routing, fallback ordering and route stats.
+"""
+
+import time
+from types import SimpleNamespace
+
+from meta_agent.config import Config, ModelTier
+from meta_agent.routing import ModelRouter, LATENCY_MAX_AGE_SECONDS, MIN_SLO_SAMPLES
+
+
+def _router(clock=None) -> ModelRouter:
+    config = Config(
+        MODEL_TIERS={
+            "fast": ModelTier(models=["small", "medium"], latency_slo_ms=1000),
+            "strong": ModelTier(models=["large", "medium"]),
+        },
+        STEP_ROUTES={"architecture": "fast", "tool_code": "strong", "other": "fast"},
+        MODEL_PRICES={"medium": (1.0, 2.0)},
+    )
+    return ModelRouter(config, clock=clock or time.monotonic)
+
+
+def test_steps_route_to_tiers():
+    router = _router()
+    assert router.candidates("architecture") == ["small", "medium"]
+    assert router.candidates("tool_code") == ["large", "medium"]
+    assert router.candidates("unknown_step") == ["small", "medium"]
+    print("✓ Steps routed to their tiers")
+
+
+def test_errors_and_slo_demote_models():
+    """A failing model cools down; a model over its latency SLO goes behind the others."""
+    router = _router()
+
+    router.record_error("tool_code", "large")
+    assert router.candidates("tool_code") == ["medium", "large"]
+
+    for _ in range(MIN_SLO_SAMPLES):
+        router.record_success("architecture", "small", latency_ms=5000)
+    assert router.candidates("architecture") == ["medium", "small"]
+    assert router.stats()["architecture/small"]["slo_misses"] == MIN_SLO_SAMPLES
+    print("✓ Errors and SLO misses demote models")
+
+
+def test_demoted_model_recovers():
+    """Slow samples age out, so a demoted model gets tried first again and stays there if it is fast."""
+    now = [0.0]
+    router = _router(clock=lambda: now[0])
+    for _ in range(MIN_SLO_SAMPLES):
+        router.record_success("architecture", "small", latency_ms=5000)
+    assert router.candidates("architecture") == ["medium", "small"]
+
+    # Only "medium" is called while "small" is demoted
+    now[0] += LATENCY_MAX_AGE_SECONDS / 2
+    router.record_success("architecture", "medium", latency_ms=300)
+    assert router.candidates("architecture") == ["medium", "small"]
+
+    now[0] += LATENCY_MAX_AGE_SECONDS
+    assert router.candidates("architecture") == ["small", "medium"]
+    for _ in range(MIN_SLO_SAMPLES):
+        router.record_success("architecture", "small", latency_ms=200)
+    assert router.candidates("architecture") == ["small", "medium"]
+    print("✓ Demoted model promoted again once it recovers")
+
+
+def test_cost_and_fallback_stats():
+    router = _router()
+    usage = SimpleNamespace(prompt_token_count=1_000_000, candidates_token_count=500_000, thoughts_token_count=None)
+    router.record_success("tool_code", "medium", latency_ms=200, usage_metadata=usage, fallback=True)
+
+    stats = router.stats()["tool_code/medium"]
+    assert stats["fallbacks"] == 1
+    assert stats["cost_usd"] == 2.0
+    assert stats["latency_p95_ms"] == 200
+    print("✓ Cost and fallback stats recorded")
+
+
+if __name__ == "__main__":
+    test_steps_route_to_tiers()
+    test_errors_and_slo_demote_models()
+    test_demoted_model_recovers()
+    test_cost_and_fallback_stats()
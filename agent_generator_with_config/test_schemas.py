@@ -0,0 +1,65 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Test the structured-output schemas for the meta-agent steps.
+"""
+
+from meta_agent.schemas import RequirementsAnalysis, parse_model, parse_plan
+
+
+def test_valid_plan():
+    """A sound plan parses with no problems."""
+    plan, problems = parse_plan(
+        '{"main_agent_name": "flow", "agents": ['
+        '{"name": "flow", "type": "sequential_agent", "sub_agents": ["worker"]},'
+        '{"name": "worker", "type": "llm_agent", "tools_needed": ["search"]}]}'
+    )
+    assert problems == []
+    assert plan.agents[1].tools_needed == ["search"]
+    print("✓ Valid plan accepted")
+
+
+def test_plan_problems_reported_together():
+    """Unknown types, dangling sub-agents and duplicates are all reported up front."""
+    plan, problems = parse_plan(
+        '{"main_agent_name": "flow", "agents": ['
+        '{"name": "flow", "type": "sequential_agent", "sub_agents": ["worker", "ghost"]},'
+        '{"name": "worker", "type": "llm_agent"},'
+        '{"name": "worker", "type": "robot_agent"}]}'
+    )
+    assert plan is None
+    assert any(problem.startswith("agents.2.type") for problem in problems)
+    assert "Sub-agent 'ghost' referenced by 'flow' is not in the plan" in problems
+    assert "Duplicate agent name 'worker'" in problems
+    print(f"✓ {len(problems)} plan problems reported")
+
+
+def test_parse_model_falls_back_to_extraction():
+    """Non-JSON wrapping is tolerated before validation."""
+    analysis = parse_model(RequirementsAnalysis, 'Analysis:\n```json\n{"purpose": "p", "complexity": "medium"}\n```')
+    assert analysis.purpose == "p" and analysis.complexity == "medium"
+
+    # A truncated response is repaired rather than replaced by a nested object
+    truncated = parse_model(RequirementsAnalysis, '{"purpose": "p", "main_capabilities": ["a", "b"], "complex')
+    assert truncated.main_capabilities == ["a", "b"] and truncated.complexity == "simple"
+    plan, problems = parse_plan('{"agents": [{"name": "a", "type": "llm_agent"}], "main_agent_name": "a", "desc')
+    assert problems == [] and plan.main_agent_name == "a" and plan.agents[0].name == "a"
+    print("✓ Wrapped JSON validated")
+
+
+if __name__ == "__main__":
+    test_valid_plan()
+    test_plan_problems_reported_together()
+    test_parse_model_falls_back_to_extraction()
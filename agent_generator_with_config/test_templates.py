@@ -0,0 +1,169 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Test the domain template library: registry matching and plan instantiation.
+"""
+
+import asyncio
+import json
+import uuid
+
+from meta_agent.orchestrator import MetaAgentOrchestrator
+from meta_agent.schemas import plan_problems
+from meta_agent.templates import TemplateLibrary, get_template_library, template_problems, tokenize
+
+DOMAINS = [
+    {
+        "id": "travel_tourism",
+        "displayName": "Travel & Tourism",
+        "description": "Trip planning and travel assistance",
+        "keywords": ["travel", "trip", "flight", "hotel", "itinerary"],
+        "nodes": [{"id": "trip_planner", "label": "Trip Planner", "description": "Plans trips and itineraries"}],
+        "defaultTools": ["google_search", "load_memory"],
+    },
+    {
+        "id": "medical_health",
+        "displayName": "Medical & Health",
+        "description": "Health information and wellness tracking",
+        "keywords": ["health", "medical", "symptom", "diet"],
+        "nodes": [{"id": "symptom_checker", "label": "Symptom Checker", "description": "Explains symptoms"}],
+        "defaultTools": ["google_search"],
+        "metadata": {"disclaimer": "Not medical advice."},
+    },
+    {
+        "id": "generic_custom",
+        "displayName": "Custom",
+        "description": "General purpose assistant",
+        "keywords": ["general", "assistant", "trip"],
+        "nodes": [],
+        "defaultTools": ["google_search", "load_memory", "some_frontend_only_tool"],
+    },
+]
+
+
+def test_tokenize():
+    assert tokenize("Create an agent that plans Trips and Flights") == ["plan", "trip", "flight"]
+    print("✓ Tokenizer drops stopwords and stems plurals")
+
+
+def test_match_threshold_and_margin():
+    library = TemplateLibrary(DOMAINS)
+    match = library.match("An agent that books flights and hotels for my trip", 0.3, 0.05)
+    assert match and match.template.id == "travel_tourism"
+    assert match.score > match.runner_up
+
+    assert library.match("Write poems about the sea", 0.3, 0.05) is None
+    # Catch-all domains never match, however well they score
+    assert library.match("general assistant", 0.0, 0.0) is None
+    print(f"✓ Strong request matched (score {match.score:.2f}), vague ones fall back to the LLM")
+
+
+def test_instantiate_plan():
+    library = TemplateLibrary(DOMAINS)
+    travel = library.templates[0]
+    requirements, plan = travel.instantiate("Plan my holidays")
+    assert not plan_problems(plan)
+    assert plan["main_agent_name"] == "travel_tourism_agent"
+    main, search = plan["agents"]
+    # Google Search can't share an agent with other tools
+    assert main["tools_needed"] == ["load_memory"] and main["sub_agents"] == [search["name"]]
+    assert search["tools_needed"] == ["google_search"]
+    assert requirements["suggested_tools"] == ["google_search", "load_memory"]
+    assert requirements["purpose"] == "Plan my holidays"
+    assert "\n" not in main["purpose"]  # Emitted as a one-line comment
+
+    requirements, plan = library.templates[1].instantiate("Check my symptoms")
+    assert len(plan["agents"]) == 1 and plan["agents"][0]["tools_needed"] == ["google_search"]
+    assert "Not medical advice." in plan["agents"][0]["purpose"]
+
+    # Tools that aren't ADK builtins are left out
+    assert library.templates[2].default_tools == ["google_search", "load_memory"]
+    print("✓ Templates instantiate valid plans with builtin tools")
+
+
+def test_registry_loads():
+    library = get_template_library()
+    assert library is not None and len(library.templates) > 5
+    match = library.match("Monitor my servers and alert me when uptime drops", 0.3, 0.05)
+    assert match and match.template.id == "monitoring_observability"
+    print(f"✓ Frontend registry loaded ({len(library.templates)} domains)")
+
+
+def test_template_problems():
+    library = TemplateLibrary(DOMAINS)
+    _, template_plan = library.templates[0].instantiate("Plan my holidays")
+    assert template_problems(template_plan, template_plan) == []
+
+    extended = json.loads(json.dumps(template_plan))
+    extended["agents"][0]["tools_needed"].append("convert_currency")
+    extended["agents"].append({"name": "extra", "type": "llm_agent", "purpose": "x", "tools_needed": [], "sub_agents": []})
+    assert template_problems(template_plan, extended) == []
+
+    extended["agents"] = extended["agents"][:1]
+    extended["agents"][0]["tools_needed"] = ["convert_currency"]
+    problems = template_problems(template_plan, extended)
+    assert any("travel_tourism_search_agent' is missing" in problem for problem in problems)
+    assert any("dropped template tool 'load_memory'" in problem for problem in problems)
+    print("✓ Plans that drop template parts are flagged")
+
+
+def test_request_capabilities_survive_template():
+    """A matched template seeds planning; the planner's additions reach the generated agent."""
+    request = "travel planner agent that converts currency and checks the weather at my destination"
+    orchestrator = MetaAgentOrchestrator(api_key="test-key", validate_generated_code=False,
+                                         use_templates=True, use_tool_library=True)
+    orchestrator.templates = TemplateLibrary(DOMAINS)
+    plans = []
+
+    async def call_gemini(prompt, system_prompt, max_retries=3, json_output=False, response_schema=None, step="other"):
+        if step == "requirements":
+            raise AssertionError("requirements are taken from the template")
+        if step != "architecture":
+            return "Help the user."
+        plans.append(prompt)
+        start = prompt.index("{", prompt.index("Start from this domain template plan"))
+        plan, _ = json.JSONDecoder().raw_decode(prompt, start)
+        if len(plans) == 1:
+            return json.dumps({"main_agent_name": "travel_agent", "agents": [{
+                "name": "travel_agent", "type": "llm_agent", "purpose": "Travel",
+                "tools_needed": ["convert_currency", "get_weather"], "sub_agents": []
+            }]})
+        plan["agents"][0]["tools_needed"] += ["convert_currency", "get_weather"]
+        return json.dumps(plan)
+
+    orchestrator._call_gemini = call_gemini
+    result = asyncio.run(orchestrator.create_agent(request, "./generated_test_agents", write_to_disk=False))
+
+    # The first plan dropped the template and was sent back with the problems
+    assert len(plans) == 2 and "Template agent 'travel_tourism_agent' is missing" in plans[1]
+    agent_code = result["file_contents"]["agent.py"]
+    for name in ("def convert_currency", "def get_weather", "FunctionTool(convert_currency)", "FunctionTool(get_weather)"):
+        assert name in agent_code, name
+    # The search agent is called as a tool, not a transfer sub-agent
+    assert "tools=[load_memory, FunctionTool(convert_currency), FunctionTool(get_weather), AgentTool(agent=travel_tourism_search_agent)]" in agent_code
+    assert "sub_agents=" not in agent_code
+    assert "from google.adk.tools.agent_tool import AgentTool" in agent_code
+    print("✓ Request-specific tools added on top of the template")
+
+
+if __name__ == "__main__":
+    print("Testing domain templates...\n")
+    test_tokenize()
+    test_match_threshold_and_margin()
+    test_instantiate_plan()
+    test_template_problems()
+    test_request_capabilities_survive_template()
+    test_registry_loads()
+    print("\n✅ All template tests passed!")
@@ -0,0 +1,91 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Test the vetted tool library: lookup by name, alias and tags.
+"""
+
+import json
+
+from meta_agent.tool_library import LIBRARY_DIR, LibraryTool, ToolLibrary, get_tool_library, name_words
+from meta_agent.tools.code_checker import check_tool_code
+
+
+def test_name_words():
+    assert name_words("get_weather_forecast") == ["weather", "forecast"]
+    assert name_words("fetchStockPrice") == ["stock", "price"]
+    print("✓ Tool names split into meaningful words")
+
+
+def test_lookup():
+    library = get_tool_library()
+    assert library.find("get_weather").name == "get_weather"
+    assert library.find("fetch_weather").name == "get_weather"           # Alias
+    assert library.find("get_weather_forecast").name == "get_weather"    # Tags
+    assert library.find("fetchData").name == "fetch_data"
+    assert library.find("getCurrentTime").name == "get_current_time"
+    for name in ("analyze_sentiment", "calculate_bmi", "send_email"):
+        assert library.find(name) is None, name
+    print("✓ Library tools found by name, alias and tags; others left to the LLM")
+
+
+def test_renamed_tool_passes_checks():
+    """A tool matched under another name is renamed so the agent can reference it."""
+    tool = get_tool_library().find("get_weather_forecast").as_tool("get_weather_forecast")
+    assert "def get_weather_forecast(" in tool.function_code
+    assert "def get_weather(" not in tool.function_code
+    assert not check_tool_code("get_weather_forecast", tool.function_code, tool.imports)
+    assert tool.dependencies == ["requests>=2.31.0"]
+    print("✓ Matched tools are renamed and still pass checks")
+
+
+def test_entries_are_vetted():
+    """Every entry file is complete; broken or clashing entries are rejected on load."""
+    for path in LIBRARY_DIR.glob("*.json"):
+        data = json.loads(path.read_text(encoding="utf-8"))
+        assert data["name"] == path.stem and data["version"] and data["tags"], path.name
+
+    broken = LibraryTool(name="broken", version="1", description="", function_code="def broken(:\n    pass")
+    try:
+        ToolLibrary([broken])
+        assert False, "broken entry accepted"
+    except ValueError:
+        pass
+
+    tool = get_tool_library().tools["calculate"]
+    try:
+        ToolLibrary([tool, LibraryTool(**{**tool.__dict__, "name": "other", "aliases": ["calculator"]})])
+        assert False, "clashing alias accepted"
+    except ValueError:
+        pass
+    print(f"✓ {len(get_tool_library().tools)} library entries vetted")
+
+
+def test_calculate_is_safe():
+    namespace = {}
+    tool = get_tool_library().tools["calculate"]
+    exec("\n".join(tool.imports + [tool.function_code]), namespace)
+    assert namespace["calculate"]("2 * (3 + 4) ** 2") == "2 * (3 + 4) ** 2 = 98"
+    assert namespace["calculate"]("__import__('os')").startswith("Error")
+    print("✓ Calculator evaluates arithmetic only")
+
+
+if __name__ == "__main__":
+    print("Testing tool library...\n")
+    test_name_words()
+    test_lookup()
+    test_renamed_tool_passes_checks()
+    test_entries_are_vetted()
+    test_calculate_is_safe()
+    print("\n✅ All tool library tests passed!")
@@ -0,0 +1,71 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Test that re-generating an unchanged project does not touch any files.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+from config_schema import AgentProjectConfig
+from code_generator import AgentCodeGenerator, write_file_if_changed
+from test_configs import CUSTOM_TOOL_CONFIG
+
+
+def _snapshot(output_dir: str) -> dict:
+    """Map filename -> (inode, mtime_ns) for every file in a directory."""
+    return {
+        path.name: (path.stat().st_ino, path.stat().st_mtime_ns)
+        for path in Path(output_dir).iterdir()
+    }
+
+
+def test_write_file_if_changed():
+    """Unchanged content is skipped, changed content is replaced atomically."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "agent.py"
+
+        assert write_file_if_changed(path, "x = 1\n")
+        assert not write_file_if_changed(path, "x = 1\n")
+        assert write_file_if_changed(path, "x = 2\n", fsync="full")
+        assert path.read_text() == "x = 2\n"
+
+        # No temp files are left behind
+        assert [p.name for p in Path(tmp).iterdir()] == ["agent.py"]
+        print("✓ write_file_if_changed skips identical content")
+
+
+def test_regeneration_touches_zero_files():
+    """A second generation of the same config leaves every file untouched."""
+    config = AgentProjectConfig(**CUSTOM_TOOL_CONFIG)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output_dir = os.path.join(tmp, config.project_name)
+
+        generator = AgentCodeGenerator()
+        generator.generate_from_config(config, output_dir)
+        assert generator.last_written_files
+        before = _snapshot(output_dir)
+
+        generator.generate_from_config(config, output_dir)
+        assert generator.last_written_files == []
+        assert _snapshot(output_dir) == before
+        print(f"✓ Re-generation touched 0 of {len(before)} files")
+
+
+if __name__ == "__main__":
+    test_write_file_if_changed()
+    test_regeneration_touches_zero_files()